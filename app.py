@@ -5,17 +5,36 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
-from backend.audit_engine import PedagogicalAuditEngine
+from backend.job_queue import JobQueue, QUEUED, DONE, FAILED, create_audit_engine, start_worker_process
 
 from backend.encryption_manager import EncryptionManager
+from backend.atomic_io import atomic_write_json
+from backend.upload_store import UploadStore
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from reportlab.lib.units import inch
 import io
+import time
+import uuid
 from dotenv import load_dotenv
 
+# Historique : options de tri (colonne, ordre décroissant), évolution affichée et borne du décompte filtré
+HISTORY_SORT_OPTIONS = {
+    "📅 Plus récents": ('audit_date', True),
+    "📅 Plus anciens": ('audit_date', False),
+    "⬆️ Meilleurs scores": ('final_score', True),
+    "⬇️ Scores les plus bas": ('final_score', False),
+    "🔤 Nom de fichier": ('filename', False)
+}
+HISTORY_TREND_DAYS = 90
+HISTORY_COUNT_LIMIT = 10000
+
+# Prévisualisation : pages affichées à la fois, et pages voisines préparées en arrière-plan
+PREVIEW_PAGE_WINDOW = 3
+PREVIEW_PREFETCH_PAGES = 3
+
 # Charger les variables d'environnement
 load_dotenv()
 
@@ -27,10 +46,6 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialisation du gestionnaire de chiffrement
-if 'encryption_manager' not in st.session_state:
-    st.session_state.encryption_manager = EncryptionManager()
-
 # Clé API Groq sécurisée
 GROQ_API_KEY = os.getenv('GROQ_API_KEY')
 if not GROQ_API_KEY:
@@ -41,14 +56,38 @@ if not GROQ_API_KEY:
 for directory in ["data/uploads", "data/audits", "config"]:
     os.makedirs(directory, exist_ok=True)
 
-# Initialisation de l'état de session
-if 'audit_engine' not in st.session_state:
-    try:
-        st.session_state.audit_engine = PedagogicalAuditEngine(GROQ_API_KEY)
-    except Exception as e:
-        st.error(f"Erreur d'initialisation du moteur d'audit: {str(e)}")
-        st.session_state.audit_engine = None
+# Ressources partagées par toutes les sessions du processus : construites une
+# seule fois (dérivation de clé, client API, lecture de la configuration), puis
+# réutilisées. Le moteur ne conserve aucun état propre à une session (la matière
+# est transmise à chaque audit) et recharge sa configuration si elle change sur disque.
+@st.cache_resource
+def get_encryption_manager():
+    return EncryptionManager()
+
+@st.cache_resource
+def get_audit_engine(groq_api_key):
+    return create_audit_engine(groq_api_key)
+
+@st.cache_resource
+def get_upload_store():
+    return UploadStore()
 
+@st.cache_resource
+def get_job_queue():
+    return JobQueue()
+
+encryption_manager = get_encryption_manager()
+upload_store = get_upload_store()
+job_queue = get_job_queue()
+
+try:
+    audit_engine = get_audit_engine(GROQ_API_KEY)
+    audit_engine.reload_config_if_changed()
+except Exception as e:
+    st.error(f"Erreur d'initialisation du moteur d'audit: {str(e)}")
+    audit_engine = None
+
+# Initialisation de l'état de session
 if 'current_audit' not in st.session_state:
     st.session_state.current_audit = None
 
@@ -74,6 +113,37 @@ if 'module_file_path' not in st.session_state:
 if 'support_file_path' not in st.session_state:
     st.session_state.support_file_path = None
 
+# Empreintes des fichiers sélectionnés (retrouvent un audit existant du même contenu)
+if 'module_content_hash' not in st.session_state:
+    st.session_state.module_content_hash = None
+
+if 'support_content_hash' not in st.session_state:
+    st.session_state.support_content_hash = None
+
+# Uploads déjà enregistrés dans cette session
+if 'stored_uploads' not in st.session_state:
+    st.session_state.stored_uploads = {}
+
+# Identifiant de la session pour les préchargements de prévisualisation (moteur partagé)
+if 'preview_session_id' not in st.session_state:
+    st.session_state.preview_session_id = uuid.uuid4().hex
+
+# Suivi de l'audit en file : exécuté par des workers, il survit à la fermeture de la page
+if 'audit_job_id' not in st.session_state:
+    st.session_state.audit_job_id = None
+    # Reprise du suivi d'un audit après un rechargement de la page (?job=<id>)
+    restored_job = job_queue.get(st.query_params.get("job", ""))
+    if restored_job:
+        st.session_state.audit_job_id = restored_job['id']
+        st.session_state.audit_type = restored_job['audit_type']
+        st.session_state.module_file = restored_job['params']['filename']
+        st.session_state.module_file_path = restored_job['params']['module_path']
+        st.session_state.support_file_path = restored_job['params'].get('support_path')
+        st.session_state.support_file = restored_job['params'].get('support_filename')
+        st.session_state.selected_subject = restored_job['params'].get('subject')
+        st.session_state.current_step = 3
+        st.session_state.audit_in_progress = True
+
 def create_gauge_chart(score, title):
     """Crée un graphique en jauge pour afficher un score."""
     fig = go.Figure(go.Indicator(
@@ -110,8 +180,8 @@ def create_criteria_chart(criteria_scores):
     
     for key, data in criteria_scores.items():
         # Récupération du nom du critère depuis la grille
-        if st.session_state.audit_engine:
-            criterion_name = st.session_state.audit_engine.grille['criteria'][key]['name']
+        if audit_engine:
+            criterion_name = audit_engine.grille['criteria'][key]['name']
         else:
             criterion_name = key.replace('_', ' ').title()
         
@@ -174,8 +244,8 @@ def export_to_pdf(audit_report):
     
     criteria_data = [['Critère', 'Score', 'Commentaire']]
     for key, data in audit_report['scores']['criteria_scores'].items():
-        if st.session_state.audit_engine:
-            criterion_name = st.session_state.audit_engine.grille['criteria'][key]['name']
+        if audit_engine:
+            criterion_name = audit_engine.grille['criteria'][key]['name']
         else:
             criterion_name = key.replace('_', ' ').title()
         
@@ -212,7 +282,7 @@ def export_to_pdf(audit_report):
 def show_new_audit_workflow():
     """Nouveau workflow d'audit en 4 étapes (avec sélection de matière)."""
     
-    if not st.session_state.audit_engine:
+    if not audit_engine:
         st.error("❌ Moteur d'audit non disponible. Vérifiez la configuration.")
         return
     
@@ -232,7 +302,7 @@ def show_step0_subject_selection():
     st.write("Choisissez la matière pour laquelle l'IA se comportera comme un expert pédagogique spécialisé.")
     
     # Récupération des matières disponibles
-    available_subjects = st.session_state.audit_engine.get_available_subjects()
+    available_subjects = audit_engine.get_available_subjects()
     
     if not available_subjects:
         st.error("❌ Aucune matière d'expertise disponible. Vérifiez le fichier de configuration.")
@@ -248,7 +318,7 @@ def show_step0_subject_selection():
     
     # Affichage des informations sur l'expert sélectionné
     if selected_subject:
-        expert_info = st.session_state.audit_engine.get_subject_expert_info(selected_subject)
+        expert_info = audit_engine.get_subject_expert_info(selected_subject)
         
         if expert_info:
             st.info(f"🧠 **Expert sélectionné :** {selected_subject}")
@@ -273,7 +343,6 @@ def show_step0_subject_selection():
         if st.button("✅ Confirmer la Matière", type="primary"):
             # Sauvegarde de la matière sélectionnée
             st.session_state.selected_subject = selected_subject
-            st.session_state.audit_engine.set_subject_context(selected_subject)
             
             st.success(f"✅ Matière '{selected_subject}' sélectionnée avec succès!")
             st.session_state.current_step = 1
@@ -288,7 +357,6 @@ def show_step0_subject_selection():
         with col1:
             if st.button("🔄 Changer de Matière"):
                 st.session_state.selected_subject = None
-                st.session_state.audit_engine.set_subject_context(None)
                 st.rerun()
         
         with col2:
@@ -296,6 +364,120 @@ def show_step0_subject_selection():
                 st.session_state.current_step = 1
                 st.rerun()
 
+def store_uploaded_file(uploaded_file, name):
+    """
+    Enregistre un fichier téléchargé dans le stockage par contenu.
+
+    Streamlit réexécute la page à chaque interaction : un même fichier téléchargé
+    n'est enregistré (et haché) qu'une fois par session.
+    """
+    key = (uploaded_file.file_id, name)
+    if key not in st.session_state.stored_uploads:
+        stored = upload_store.put(uploaded_file, name)
+        # Autre version déjà enregistrée sous ce nom : elle reste utilisée tant que
+        # l'utilisateur n'a pas choisi de la remplacer (voir select_stored_version)
+        stored['selected_hash'] = stored['content_hash'] if stored['bound'] else stored['previous_hash']
+        st.session_state.stored_uploads[key] = stored
+    return st.session_state.stored_uploads[key]
+
+def select_stored_version(stored, content_hash):
+    """Associe de nouveau le nom d'un upload à la version choisie (nouvelle ou existante)."""
+    upload_store.bind(stored['name'], content_hash)
+    stored['selected_hash'] = content_hash
+
+def show_pdf_preview(title, pdf_path, content_hash, key):
+    """
+    Prévisualisation à la demande d'un PDF.
+    
+    Les métadonnées s'affichent immédiatement; les pages ne sont rendues (puis mises
+    en cache) qu'une fois demandées, par fenêtre de PREVIEW_PAGE_WINDOW pages, et les
+    pages voisines sont préparées en arrière-plan.
+    """
+    engine = audit_engine
+    # Les préchargements de cet aperçu sont remplacés (ceux en attente annulés) à chaque changement de page
+    prefetch_owner = (st.session_state.preview_session_id, key)
+    with st.expander(title, expanded=False):
+        metadata = engine.get_pdf_metadata(pdf_path, content_hash=content_hash)
+        if 'error' in metadata:
+            st.error(f"Erreur lors de la prévisualisation: {metadata['error']}")
+            return
+        
+        # Métadonnées du document
+        col1, col2 = st.columns(2)
+        with col1:
+            st.write(f"**Titre:** {metadata['title']}")
+            st.write(f"**Pages:** {metadata['page_count']}")
+        with col2:
+            st.write(f"**Auteur:** {metadata['author']}")
+            st.write(f"**Taille:** {metadata['file_size']:,} bytes")
+        
+        page_count = metadata['page_count']
+        if not page_count:
+            return
+        
+        first_window = range(1, min(PREVIEW_PAGE_WINDOW, page_count) + 1)
+        if not st.toggle("📄 Afficher les pages", key=f"preview_pages_{key}"):
+            # Les premières pages sont préparées d'avance pour un affichage immédiat
+            engine.prefetch_preview_pages(pdf_path, first_window, content_hash=content_hash, owner=prefetch_owner)
+            return
+        
+        # Curseur de navigation pour les documents de plus d'une fenêtre
+        first_page = 1
+        if page_count > PREVIEW_PAGE_WINDOW:
+            first_page = st.slider(
+                "Première page affichée",
+                min_value=1,
+                max_value=page_count - PREVIEW_PAGE_WINDOW + 1,
+                value=1,
+                key=f"preview_first_page_{key}"
+            )
+        last_page = min(first_page + PREVIEW_PAGE_WINDOW - 1, page_count)
+        
+        pages = [engine.render_preview_page(pdf_path, page, content_hash=content_hash)
+                 for page in range(first_page, last_page + 1)]
+        
+        # Pages voisines de la fenêtre, dans le sens de lecture d'abord
+        neighbours = list(range(last_page + 1, min(last_page + PREVIEW_PREFETCH_PAGES, page_count) + 1))
+        neighbours += list(range(max(first_page - PREVIEW_PREFETCH_PAGES, 1), first_page))
+        engine.prefetch_preview_pages(pdf_path, neighbours, content_hash=content_hash, owner=prefetch_owner)
+        
+        # Miniatures (fichiers du cache de prévisualisation)
+        columns = st.columns(PREVIEW_PAGE_WINDOW)
+        for column, page in zip(columns, pages):
+            with column:
+                if page.get('image_path'):
+                    st.image(page['image_path'], caption=f"Page {page['page']}", width=200)
+                elif 'error' in page:
+                    st.error(page['error'])
+        
+        st.divider()
+        
+        # Extraits de texte des pages affichées
+        st.subheader("📝 Extraits de contenu")
+        for page in pages:
+            if page.get('text', '').strip():
+                st.write(f"**Page {page['page']}:**")
+                st.write(page['text'])
+                st.write("---")
+
+def show_existing_audit(content_hash, support_content_hash=None, key="module"):
+    """Propose le dernier audit d'un contenu identique, s'il existe, plutôt qu'un nouvel audit."""
+    if not audit_engine:
+        return
+    existing_audit = audit_engine.audit_store.latest_for_content(content_hash, support_content_hash)
+    if not existing_audit:
+        return
+    
+    st.info(f"📋 Ce contenu a déjà été audité le {existing_audit['audit_date'][:10]} "
+            f"({existing_audit['filename']}) : {existing_audit['final_score']}/100 ({existing_audit['grade']})")
+    if st.button("📖 Afficher l'audit existant", key=f"existing_audit_{key}"):
+        try:
+            st.session_state.current_audit = audit_engine.load_audit_report(existing_audit['json_file'])
+            st.session_state.current_step = 3
+            st.rerun()
+        except Exception as e:
+            st.error(f"Erreur de chargement: {str(e)}")
+
 def show_step1_module_upload():
     """Étape 1: Upload du fichier module PDF."""
     st.header("📄 Étape 1: Téléchargement du Module")
@@ -328,77 +510,42 @@ def show_step1_module_upload():
     )
     
     if uploaded_file is not None:
-        # Vérification si le fichier existe déjà
-        upload_path = os.path.join("data/uploads", f"module_{uploaded_file.name}")
+        # Enregistrement par contenu : un fichier identique n'est ni réécrit ni retraité
+        stored = store_uploaded_file(uploaded_file, f"module_{uploaded_file.name}")
         
-        if os.path.exists(upload_path):
-            st.warning(f"⚠️ Le fichier '{uploaded_file.name}' existe déjà dans le dossier uploads.")
+        if stored['previous_hash'] and stored['previous_hash'] != stored['content_hash']:
+            st.warning(f"⚠️ Une autre version de '{uploaded_file.name}' a déjà été téléchargée.")
             
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("🔄 Remplacer le fichier", key="replace_module"):
-                    with open(upload_path, "wb") as f:
-                        f.write(uploaded_file.getbuffer())
-                    st.success(f"✅ Fichier '{uploaded_file.name}' remplacé avec succès!")
-                    st.session_state.file_replaced = True
+                    select_stored_version(stored, stored['content_hash'])
             
             with col2:
                 if st.button("📂 Utiliser le fichier existant", key="use_existing_module"):
-                    st.info(f"📋 Utilisation du fichier existant '{uploaded_file.name}'")
-                    st.session_state.file_replaced = False
-        else:
-            # Sauvegarde du nouveau fichier
-            with open(upload_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            st.session_state.file_replaced = False
+                    select_stored_version(stored, stored['previous_hash'])
         
         # Mise à jour de l'état de session
         st.session_state.module_file = uploaded_file.name
-        st.session_state.module_file_path = upload_path
-        
-        # Affichage des informations si le fichier a été traité
-        if os.path.exists(upload_path) and (st.session_state.get('file_replaced') is not False):
-            if st.session_state.get('file_replaced') == True:
-                st.success(f"✅ Module '{uploaded_file.name}' remplacé avec succès!")
-            elif st.session_state.get('file_replaced') == False:
-                st.info(f"📋 Utilisation du fichier existant '{uploaded_file.name}'")
-            else:
-                st.success(f"✅ Module '{uploaded_file.name}' téléchargé avec succès!")
-            
-            # Informations sur le fichier
-            file_size = os.path.getsize(upload_path)
-            st.info(f"📊 Taille: {file_size:,} bytes | Type: PDF")
+        st.session_state.module_file_path = upload_store.blob_path(stored['selected_hash'])
+        st.session_state.module_content_hash = stored['selected_hash']
         
-        # Prévisualisation du PDF
-        if st.session_state.audit_engine:
-            with st.expander("👁️ Prévisualisation du document", expanded=False):
-                try:
-                    preview_data = st.session_state.audit_engine.generate_pdf_preview(upload_path)
-                    
-                    if 'error' not in preview_data:
-                        # Métadonnées du document
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            st.write(f"**Titre:** {preview_data['metadata']['title']}")
-                            st.write(f"**Pages:** {preview_data['metadata']['page_count']}")
-                        with col2:
-                            st.write(f"**Auteur:** {preview_data['metadata']['author']}")
-                            st.write(f"**Taille:** {preview_data['metadata']['file_size']:,} bytes")
-                        
-                        st.divider()
-                        
-                        # Extraits de texte des premières pages
-                        st.subheader("📝 Extraits de contenu")
-                        for excerpt in preview_data['text_excerpts']:
-                            if excerpt['text'].strip():
-                                st.write(f"**Page {excerpt['page']}:**")
-                                st.write(excerpt['text'])
-                                st.write("---")
-                    else:
-                        st.error(f"Erreur lors de la prévisualisation: {preview_data['error']}")
-                        
-                except Exception as e:
-                    st.error(f"Erreur lors de la génération de la prévisualisation: {str(e)}")
+        if stored['selected_hash'] != stored['content_hash']:
+            st.info(f"📋 Utilisation du fichier existant '{uploaded_file.name}'")
+        elif stored['new_content']:
+            st.success(f"✅ Module '{uploaded_file.name}' téléchargé avec succès!")
+        else:
+            st.success(f"♻️ Module '{uploaded_file.name}' déjà connu : extraction et analyses en cache réutilisées")
+        
+        # Informations sur le fichier
+        file_size = os.path.getsize(st.session_state.module_file_path)
+        st.info(f"📊 Taille: {file_size:,} bytes | Type: PDF")
+        show_existing_audit(st.session_state.module_content_hash, key="module")
+        
+        # Prévisualisation du PDF (pages rendues à la demande)
+        if audit_engine:
+            show_pdf_preview("👁️ Prévisualisation du document", st.session_state.module_file_path,
+                             st.session_state.module_content_hash, key="module")
         
         # Boutons de navigation
         col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
@@ -433,6 +580,7 @@ def show_step1_module_upload():
             if st.button("🔄 Changer Module"):
                 st.session_state.module_file = None
                 st.session_state.module_file_path = None
+                st.session_state.module_content_hash = None
                 st.rerun()
         
         with col3:
@@ -463,77 +611,43 @@ def show_step2_support_upload():
     )
     
     if uploaded_file is not None:
-        # Vérification si le fichier existe déjà
-        upload_path = os.path.join("data/uploads", f"support_{uploaded_file.name}")
+        # Enregistrement par contenu : un fichier identique n'est ni réécrit ni retraité
+        stored = store_uploaded_file(uploaded_file, f"support_{uploaded_file.name}")
         
-        if os.path.exists(upload_path):
-            st.warning(f"⚠️ Le fichier '{uploaded_file.name}' existe déjà dans le dossier uploads.")
+        if stored['previous_hash'] and stored['previous_hash'] != stored['content_hash']:
+            st.warning(f"⚠️ Une autre version de '{uploaded_file.name}' a déjà été téléchargée.")
             
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("🔄 Remplacer le fichier", key="replace_support"):
-                    with open(upload_path, "wb") as f:
-                        f.write(uploaded_file.getbuffer())
-                    st.success(f"✅ Fichier '{uploaded_file.name}' remplacé avec succès!")
-                    st.session_state.support_file_replaced = True
+                    select_stored_version(stored, stored['content_hash'])
             
             with col2:
                 if st.button("📂 Utiliser le fichier existant", key="use_existing_support"):
-                    st.info(f"📋 Utilisation du fichier existant '{uploaded_file.name}'")
-                    st.session_state.support_file_replaced = False
-        else:
-            # Sauvegarde du nouveau fichier
-            with open(upload_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            st.session_state.support_file_replaced = False
+                    select_stored_version(stored, stored['previous_hash'])
         
         # Mise à jour de l'état de session
         st.session_state.support_file = uploaded_file.name
-        st.session_state.support_file_path = upload_path
-        
-        # Affichage des informations si le fichier a été traité
-        if os.path.exists(upload_path) and (st.session_state.get('support_file_replaced') is not False):
-            if st.session_state.get('support_file_replaced') == True:
-                st.success(f"✅ Document support '{uploaded_file.name}' remplacé avec succès!")
-            elif st.session_state.get('support_file_replaced') == False:
-                st.info(f"📋 Utilisation du fichier existant '{uploaded_file.name}'")
-            else:
-                st.success(f"✅ Document support '{uploaded_file.name}' téléchargé avec succès!")
-            
-            # Informations sur le fichier
-            file_size = os.path.getsize(upload_path)
-            st.info(f"📊 Taille: {file_size:,} bytes | Type: PDF")
+        st.session_state.support_file_path = upload_store.blob_path(stored['selected_hash'])
+        st.session_state.support_content_hash = stored['selected_hash']
         
-        # Prévisualisation du PDF support
-        if st.session_state.audit_engine:
-            with st.expander("👁️ Prévisualisation du document support", expanded=False):
-                try:
-                    preview_data = st.session_state.audit_engine.generate_pdf_preview(upload_path)
-                    
-                    if 'error' not in preview_data:
-                        # Métadonnées du document
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            st.write(f"**Titre:** {preview_data['metadata']['title']}")
-                            st.write(f"**Pages:** {preview_data['metadata']['page_count']}")
-                        with col2:
-                            st.write(f"**Auteur:** {preview_data['metadata']['author']}")
-                            st.write(f"**Taille:** {preview_data['metadata']['file_size']:,} bytes")
-                        
-                        st.divider()
-                        
-                        # Extraits de texte des premières pages
-                        st.subheader("📝 Extraits de contenu")
-                        for excerpt in preview_data['text_excerpts']:
-                            if excerpt['text'].strip():
-                                st.write(f"**Page {excerpt['page']}:**")
-                                st.write(excerpt['text'])
-                                st.write("---")
-                    else:
-                        st.error(f"Erreur lors de la prévisualisation: {preview_data['error']}")
-                        
-                except Exception as e:
-                    st.error(f"Erreur lors de la génération de la prévisualisation: {str(e)}")
+        if stored['selected_hash'] != stored['content_hash']:
+            st.info(f"📋 Utilisation du fichier existant '{uploaded_file.name}'")
+        elif stored['new_content']:
+            st.success(f"✅ Document support '{uploaded_file.name}' téléchargé avec succès!")
+        else:
+            st.success(f"♻️ Document support '{uploaded_file.name}' déjà connu : extraction et analyses en cache réutilisées")
+        
+        # Informations sur le fichier
+        file_size = os.path.getsize(st.session_state.support_file_path)
+        st.info(f"📊 Taille: {file_size:,} bytes | Type: PDF")
+        if st.session_state.module_content_hash:
+            show_existing_audit(st.session_state.module_content_hash, st.session_state.support_content_hash, key="support")
+        
+        # Prévisualisation du PDF support (pages rendues à la demande)
+        if audit_engine:
+            show_pdf_preview("👁️ Prévisualisation du document support", st.session_state.support_file_path,
+                             st.session_state.support_content_hash, key="support")
     
     # Boutons de navigation
     col1, col2, col3 = st.columns([1, 1, 2])
@@ -555,6 +669,7 @@ def show_step2_support_upload():
         if st.button("🔄 Changer Document Support"):
             st.session_state.support_file = None
             st.session_state.support_file_path = None
+            st.session_state.support_content_hash = None
             st.rerun()
 
 def show_step3_analysis_dashboard():
@@ -597,8 +712,12 @@ def show_step3_analysis_dashboard():
             st.session_state.support_file = None
             st.session_state.module_file_path = None
             st.session_state.support_file_path = None
+            st.session_state.module_content_hash = None
+            st.session_state.support_content_hash = None
             st.session_state.current_audit = None
             st.session_state.audit_in_progress = False
+            st.session_state.audit_job_id = None
+            st.query_params.clear()
             st.rerun()
     
     # Options d'audit
@@ -625,73 +744,88 @@ def show_step3_analysis_dashboard():
         # Stockage du type d'audit choisi
         st.session_state.audit_type = audit_type
         
+        # Ré-audit forcé : ignore les réponses IA déjà en cache pour ce document
+        st.session_state.force_refresh = st.checkbox(
+            "♻️ Forcer une nouvelle analyse IA",
+            value=False,
+            help="Par défaut, un document inchangé réutilise les analyses IA déjà effectuées"
+        )
+        
         if st.button("🚀 Lancer l'Audit", type="primary"):
+            # L'audit est confié à un worker : la page se contente d'en suivre l'avancement
+            job_id = job_queue.enqueue(audit_type, {
+                'module_path': st.session_state.module_file_path,
+                'filename': st.session_state.module_file,
+                'support_path': st.session_state.support_file_path,
+                'support_filename': st.session_state.support_file,
+                'force_refresh': st.session_state.force_refresh,
+                'subject': st.session_state.selected_subject
+            })
+            ensure_audit_worker()
+            st.session_state.audit_job_id = job_id
             st.session_state.audit_in_progress = True
+            st.query_params["job"] = job_id
             st.rerun()
     
     # Audit en cours
     if st.session_state.audit_in_progress:
-        st.warning("⏳ Audit en cours... Veuillez patienter.")
-        
-        try:
-            with st.spinner("Analyse en cours par l'IA..."):
-                # Barre de progression
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                
-                status_text.text("Extraction du contenu PDF...")
-                progress_bar.progress(20)
-                
-                # Lancement de l'audit selon le type choisi
-                audit_type = st.session_state.get('audit_type', 'standard')
-                
-                if audit_type == "chapter_by_chapter":
-                    # Audit chapitre par chapitre
-                    audit_result = st.session_state.audit_engine.audit_pdf_chapter_by_chapter(
-                        st.session_state.module_file_path, 
-                        st.session_state.module_file
-                    )
-                elif st.session_state.support_file_path:
-                    # Audit standard avec module et support
-                    audit_result = st.session_state.audit_engine.audit_pdf_with_support(
-                        st.session_state.module_file_path, 
-                        st.session_state.support_file_path,
-                        st.session_state.module_file
-                    )
-                else:
-                    # Audit standard du module seul
-                    audit_result = st.session_state.audit_engine.audit_pdf(
-                        st.session_state.module_file_path, 
-                        st.session_state.module_file
-                    )
-                
-                status_text.text("Analyse des critères pédagogiques...")
-                progress_bar.progress(60)
-                
-                # Sauvegarde du rapport
-                json_path = st.session_state.audit_engine.save_audit_report(audit_result)
-                
-                status_text.text("Génération du rapport final...")
-                progress_bar.progress(100)
-                
-                # Stockage du résultat
-                st.session_state.current_audit = audit_result
-                st.session_state.audit_in_progress = False
-                
-                status_text.text("✅ Audit terminé avec succès!")
-                st.success(f"📄 Rapport sauvegardé: {os.path.basename(json_path)}")
-                
-                st.rerun()
-                
-        except Exception as e:
-            st.error(f"❌ Erreur lors de l'audit: {str(e)}")
-            st.session_state.audit_in_progress = False
-            st.session_state.current_audit = None
+        show_audit_job_progress()
     
     # Affichage des résultats
     if st.session_state.current_audit and not st.session_state.audit_in_progress:
         show_audit_results(st.session_state.current_audit)
 
+def ensure_audit_worker():
+    """Démarre un worker d'audit en arrière-plan si aucun n'est actif (AUDIT_AUTOSTART_WORKERS)."""
+    if os.getenv('AUDIT_AUTOSTART_WORKERS', '1') != '1':
+        return
+    if job_queue.active_workers():
+        return
+    # Un worker lancé il y a peu peut ne pas s'être encore enregistré
+    last_start = st.session_state.get('worker_started_at', 0)
+    if time.time() - last_start < 30:
+        return
+    start_worker_process(int(os.getenv('AUDIT_WORKERS', '1')))
+    st.session_state.worker_started_at = time.time()
+
+def show_audit_job_progress():
+    """Suit l'audit en cours d'exécution par un worker (rafraîchissement chaque seconde)."""
+    job = job_queue.get(st.session_state.audit_job_id) if st.session_state.audit_job_id else None
+    if job is None:
+        st.error("❌ Audit introuvable dans la file d'attente.")
+        st.session_state.audit_in_progress = False
+        st.session_state.audit_job_id = None
+        st.query_params.clear()
+        return
+    
+    if job['status'] == DONE:
+        try:
+            st.session_state.current_audit = audit_engine.load_audit_report(job['report_path'])
+            st.success(f"📄 Rapport sauvegardé: {os.path.basename(job['report_path'])}")
+        except Exception as e:
+            st.error(f"❌ Erreur de chargement du rapport: {str(e)}")
+        st.session_state.audit_in_progress = False
+        return
+    
+    if job['status'] == FAILED:
+        st.error(f"❌ Erreur lors de l'audit: {job['error']}")
+        st.session_state.audit_in_progress = False
+        st.session_state.audit_job_id = None
+        st.query_params.clear()
+        return
+    
+    st.warning("⏳ Audit en cours... Vous pouvez fermer cette page, l'audit se poursuit en arrière-plan.")
+    st.progress(min(100, int(job['progress'] * 100)))
+    if job['status'] == QUEUED:
+        position = job_queue.queue_position(job['id'])
+        st.text(f"{job['message']} ({position} audit(s) avant celui-ci)" if position else job['message'])
+        ensure_audit_worker()
+    else:
+        st.text(job['message'])
+    
+    time.sleep(1)
+    st.rerun()
+
 def show_audit_results(audit_report):
     """Affiche les résultats de l'audit selon le type."""
     st.divider()
@@ -769,6 +903,8 @@ def show_chapter_by_chapter_results(audit_report):
                 with col1:
                     st.write(f"**Conformité:** {conformity.replace('_', ' ').title()}")
                     st.write(f"**Mots:** {chapter_info.get('word_count', 0)}")
+                    if chapter_info.get('pages'):
+                        st.write(f"**Pages:** {chapter_info['pages'][0]} à {chapter_info['pages'][1]}")
                     
                     if chapter.get('recommandations'):
                         st.write("**Recommandations:**")
@@ -935,8 +1071,8 @@ def show_standard_audit_results(audit_report):
         st.subheader("Analyse Détaillée")
         
         for criterion_key, result in audit_report['scores']['criteria_scores'].items():
-            if st.session_state.audit_engine:
-                criterion_data = st.session_state.audit_engine.grille['criteria'][criterion_key]
+            if audit_engine:
+                criterion_data = audit_engine.grille['criteria'][criterion_key]
                 criterion_name = criterion_data['name']
                 weight = criterion_data['weight']
             else:
@@ -950,6 +1086,13 @@ def show_standard_audit_results(audit_report):
                     st.write("**Commentaire:**")
                     st.write(result['commentaire'])
                     
+                    if result.get('couverture'):
+                        coverage = result['couverture']
+                        st.caption(
+                            f"Analyse par extraits : {coverage['extraits_analyses']}/{coverage['extraits_total']} extraits "
+                            f"({coverage['taux']}% du texte), {coverage['extraits_pertinents']} pertinents pour ce critère"
+                        )
+                    
                     if result.get('preuves'):
                         st.write("**Preuves (extraits):**")
                         for i, preuve in enumerate(result['preuves'][:3], 1):
@@ -1043,7 +1186,7 @@ def show_history_page():
     """Page d'historique des audits."""
     st.header("📚 Historique des Audits")
     
-    if not st.session_state.audit_engine:
+    if not audit_engine:
         st.error("❌ Moteur d'audit non disponible.")
         return
     
@@ -1058,56 +1201,112 @@ def show_history_page():
         show_audit_results(st.session_state.current_audit)
         return
     
-    # Chargement de l'historique
-    history = st.session_state.audit_engine.get_audit_history()
+    audit_store = audit_engine.audit_store
     
-    if history['metadata']['total_audits'] == 0:
+    # Statistiques globales, lues dans les agrégats de l'historique
+    stats = audit_store.stats()
+    if stats['total_audits'] == 0:
         st.info("📭 Aucun audit effectué pour le moment.")
         return
     
-    # Statistiques globales
     st.subheader("📊 Statistiques Globales")
     
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Total Audits", history['metadata']['total_audits'])
+        st.metric("Total Audits", stats['total_audits'])
     
     with col2:
-        if history['audits']:
-            avg_score = sum(audit['final_score'] for audit in history['audits']) / len(history['audits'])
-            st.metric("Score Moyen", f"{avg_score:.1f}/100")
+        st.metric("Score Moyen", f"{stats['average_score']:.1f}/100")
     
     with col3:
-        if history['audits']:
-            grades = [audit['grade'] for audit in history['audits']]
-            most_common_grade = max(set(grades), key=grades.count)
-            st.metric("Grade le Plus Fréquent", most_common_grade)
+        grade_distribution = stats['grade_distribution']
+        st.metric("Grade le Plus Fréquent", max(grade_distribution, key=grade_distribution.get))
     
     with col4:
-        st.metric("Dernière Mise à Jour", history['metadata']['last_updated'][:10])
+        st.metric("Dernière Mise à Jour", (stats['last_updated'] or '')[:10])
     
-    # Graphique de l'évolution des scores
-    if len(history['audits']) > 1:
-        st.subheader("📈 Évolution des Scores")
-        
-        df = pd.DataFrame(history['audits'])
-        df['audit_date'] = pd.to_datetime(df['audit_date'])
-        
-        fig = px.line(
-            df, 
-            x='audit_date', 
-            y='final_score',
-            title="Évolution des Scores d'Audit",
-            markers=True
+    # Évolution du score moyen par jour et répartition des grades
+    trend = audit_store.daily_trend(days=HISTORY_TREND_DAYS)
+    col1, col2 = st.columns([2, 1])
+    
+    with col1:
+        if len(trend) > 1:
+            st.subheader("📈 Évolution des Scores")
+            df = pd.DataFrame(trend)
+            df['day'] = pd.to_datetime(df['day'])
+            fig = px.line(
+                df,
+                x='day',
+                y='average_score',
+                title=f"Score moyen par jour ({HISTORY_TREND_DAYS} derniers jours d'activité)",
+                markers=True,
+                hover_data=['audits']
+            )
+            fig.update_layout(height=400)
+            st.plotly_chart(fig, use_container_width=True)
+    
+    with col2:
+        st.subheader("🎓 Répartition des Grades")
+        fig = px.bar(
+            x=list(grade_distribution.keys()),
+            y=list(grade_distribution.values()),
+            labels={'x': 'Grade', 'y': "Nombre d'audits"}
         )
         fig.update_layout(height=400)
         st.plotly_chart(fig, use_container_width=True)
     
-    # Liste des audits
+    # Liste des audits : une page à la fois, filtrée et triée par la base
     st.subheader("📋 Liste des Audits")
     
-    for audit in reversed(history['audits']):
+    col1, col2, col3, col4 = st.columns([2, 1, 2, 1])
+    with col1:
+        filename_filter = st.text_input("🔎 Fichier", value="", placeholder="Nom du fichier...")
+    with col2:
+        grade_filter = st.multiselect("Grade", ['A', 'B', 'C', 'D', 'E'])
+    with col3:
+        date_range = st.date_input("Période", value=(), format="DD/MM/YYYY")
+    with col4:
+        subjects = audit_engine.get_available_subjects()
+        subject_filter = st.selectbox("Matière", [None] + subjects, format_func=lambda x: "Toutes" if x is None else x)
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        sort_choice = st.selectbox("Trier par", list(HISTORY_SORT_OPTIONS.keys()))
+    with col2:
+        page_size = st.selectbox("Audits par page", [10, 25, 50], index=1)
+    
+    filters = {
+        'filename': filename_filter.strip() or None,
+        'grades': grade_filter or None,
+        'date_from': date_range[0].isoformat() if len(date_range) > 0 else None,
+        'date_to': date_range[1].isoformat() if len(date_range) > 1 else (date_range[0].isoformat() if date_range else None),
+        'subject': subject_filter
+    }
+    order_by, descending = HISTORY_SORT_OPTIONS[sort_choice]
+    
+    # Changement de filtre, de tri ou de taille de page : retour à la première page
+    view = (tuple(sorted((key, str(value)) for key, value in filters.items())), sort_choice, page_size)
+    if st.session_state.get('history_view') != view:
+        st.session_state.history_view = view
+        st.session_state.history_cursors = [None]
+    cursors = st.session_state.history_cursors
+    
+    # Pagination par clé de tri : une page coûte le même temps quelle que soit sa position
+    rows = audit_store.query(limit=page_size + 1, order_by=order_by, descending=descending,
+                             after=cursors[-1], **filters)
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+    matching = audit_store.count(limit=HISTORY_COUNT_LIMIT, **filters)
+    
+    page_number = len(cursors)
+    matching_label = f"{HISTORY_COUNT_LIMIT:,}+" if matching >= HISTORY_COUNT_LIMIT else f"{matching:,}"
+    st.caption(f"{matching_label} audit(s) correspondant(s) - page {page_number}")
+    
+    if not rows:
+        st.info("Aucun audit ne correspond à ces critères.")
+    
+    for audit in rows:
         with st.expander(f"📄 {audit['filename']} - Score: {audit['final_score']}/100 ({audit['grade']}) - {audit['audit_date'][:10]}"):
             col1, col2, col3 = st.columns([2, 1, 1])
             
@@ -1115,6 +1314,8 @@ def show_history_page():
                 st.write(f"**Fichier:** {audit['filename']}")
                 st.write(f"**Date:** {audit['audit_date'][:19]}")
                 st.write(f"**Mots:** {audit['word_count']:,}")
+                if audit['subject']:
+                    st.write(f"**Matière:** {audit['subject']}")
             
             with col2:
                 st.metric("Score", f"{audit['final_score']}/100")
@@ -1124,11 +1325,21 @@ def show_history_page():
             with col3:
                 if st.button(f"📖 Voir Détails", key=f"view_{audit['id']}"):
                     try:
-                        detailed_report = st.session_state.audit_engine.load_audit_report(audit['json_file'])
+                        detailed_report = audit_engine.load_audit_report(audit['json_file'])
                         st.session_state.current_audit = detailed_report
                         st.rerun()
                     except Exception as e:
                         st.error(f"Erreur de chargement: {str(e)}")
+    
+    col1, col2, col3 = st.columns([1, 1, 3])
+    with col1:
+        if st.button("⬅️ Page précédente", disabled=page_number == 1):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if st.button("Page suivante ➡️", disabled=not has_next):
+            cursors.append(audit_store.page_cursor(rows[-1], order_by))
+            st.rerun()
 
 def main():
     """Fonction principale de l'application."""
@@ -1244,10 +1455,8 @@ def show_pdf_comparison_page():
         )
         
         if uploaded_file1 is not None:
-            # Sauvegarde du fichier
-            file_path1 = os.path.join("data/uploads", uploaded_file1.name)
-            with open(file_path1, "wb") as f:
-                f.write(uploaded_file1.getbuffer())
+            # Sauvegarde du fichier (une seule fois par contenu), lu ensuite depuis son blob
+            file_path1 = store_uploaded_file(uploaded_file1, uploaded_file1.name)['blob_path']
             
             st.session_state.comparison_file1 = uploaded_file1.name
             st.success(f"✅ Fichier 1 téléchargé: {uploaded_file1.name}")
@@ -1256,8 +1465,8 @@ def show_pdf_comparison_page():
             if st.button("🔍 Analyser Fichier 1", key="analyze1"):
                 with st.spinner("Extraction des données du fichier 1..."):
                     try:
-                        if st.session_state.audit_engine:
-                            data1 = st.session_state.audit_engine.pdf_processor.process_pdf_file(file_path1)
+                        if audit_engine:
+                            data1 = audit_engine.pdf_processor.process_pdf_file(file_path1, filename=uploaded_file1.name)
                             st.session_state.comparison_data1 = data1
                             st.success("✅ Données extraites du fichier 1")
                         else:
@@ -1275,10 +1484,8 @@ def show_pdf_comparison_page():
         )
         
         if uploaded_file2 is not None:
-            # Sauvegarde du fichier
-            file_path2 = os.path.join("data/uploads", uploaded_file2.name)
-            with open(file_path2, "wb") as f:
-                f.write(uploaded_file2.getbuffer())
+            # Sauvegarde du fichier (une seule fois par contenu), lu ensuite depuis son blob
+            file_path2 = store_uploaded_file(uploaded_file2, uploaded_file2.name)['blob_path']
             
             st.session_state.comparison_file2 = uploaded_file2.name
             st.success(f"✅ Fichier 2 téléchargé: {uploaded_file2.name}")
@@ -1287,8 +1494,8 @@ def show_pdf_comparison_page():
             if st.button("🔍 Analyser Fichier 2", key="analyze2"):
                 with st.spinner("Extraction des données du fichier 2..."):
                     try:
-                        if st.session_state.audit_engine:
-                            data2 = st.session_state.audit_engine.pdf_processor.process_pdf_file(file_path2)
+                        if audit_engine:
+                            data2 = audit_engine.pdf_processor.process_pdf_file(file_path2, filename=uploaded_file2.name)
                             st.session_state.comparison_data2 = data2
                             st.success("✅ Données extraites du fichier 2")
                         else:
@@ -1343,6 +1550,14 @@ def show_pdf_data_summary(data, title):
         keywords_df = pd.DataFrame(data['top_keywords'], columns=['Mot-clé', 'Fréquence'])
         st.dataframe(keywords_df, use_container_width=True)
     
+    # Détail par page
+    if data.get('page_statistics'):
+        with st.expander(f"📄 Statistiques par page ({len(data['page_statistics'])} pages)"):
+            pages_df = pd.DataFrame(data['page_statistics']).rename(columns={
+                'page': 'Page', 'word_count': 'Mots', 'character_count': 'Caractères', 'line_count': 'Lignes'
+            })
+            st.dataframe(pages_df, use_container_width=True, hide_index=True)
+    
     # Aperçu du contenu
     if 'content_preview' in data:
         with st.expander("📖 Aperçu du contenu"):
@@ -1565,13 +1780,13 @@ def show_existing_files_comparison():
         if st.button("🔍 Analyser et Comparer", type="primary", use_container_width=True):
             with st.spinner("Extraction et analyse des données..."):
                 try:
-                    if st.session_state.audit_engine:
+                    if audit_engine:
                         # Extraction des données des deux fichiers
                         file_path1 = os.path.join(uploads_dir, selected_file1)
                         file_path2 = os.path.join(uploads_dir, selected_file2)
                         
-                        data1 = st.session_state.audit_engine.pdf_processor.process_pdf_file(file_path1)
-                        data2 = st.session_state.audit_engine.pdf_processor.process_pdf_file(file_path2)
+                        data1 = audit_engine.pdf_processor.process_pdf_file(file_path1)
+                        data2 = audit_engine.pdf_processor.process_pdf_file(file_path2)
                         
                         if data1 and data2:
                             # Mise à jour des variables de session
@@ -1617,8 +1832,7 @@ def export_comparison_results(data1, data2):
     filepath = os.path.join("data/audits", filename)
     
     try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(comparison_results, f, indent=2, ensure_ascii=False)
+        atomic_write_json(filepath, comparison_results, indent=2)
         
         st.success(f"✅ Comparaison exportée: {filename}")
         
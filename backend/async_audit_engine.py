@@ -0,0 +1,496 @@
+import asyncio
+import threading
+import weakref
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+from openai import AsyncOpenAI  # Utilisé pour l'API Groq via le SDK OpenAI (client asynchrone)
+from backend.audit_engine import PedagogicalAuditEngine
+from backend.audit_progress import AuditProgress
+from backend.map_reduce import TokenBudget
+from backend.rate_limiter import estimate_tokens, is_rate_limit_error, retry_after_from_error
+
+
+class AsyncPedagogicalAuditEngine(PedagogicalAuditEngine):
+    """
+    Variante asynchrone du moteur d'audit pédagogique (client `AsyncOpenAI`).
+
+    Les appels IA d'un audit sont lancés ensemble (`asyncio.gather`) et bornés par
+    un sémaphore de `max_concurrent_requests` places : un seul thread suffit à
+    maintenir des dizaines de requêtes en vol, le débit restant régulé par le
+    limiteur partagé. Les prompts, le cache de réponses, le découpage et la
+    construction des rapports sont ceux de PedagogicalAuditEngine.
+
+    Les méthodes `audit_pdf`, `audit_pdf_with_support` et
+    `audit_pdf_chapter_by_chapter` restent disponibles en version synchrone :
+    elles exécutent leur variante `*_async` sur une boucle d'événements dédiée
+    au moteur (un thread d'arrière-plan), ce qui conserve les connexions HTTP
+    d'un audit à l'autre.
+    """
+
+    def __init__(self, groq_api_key: str, config_path: str = "config/grille_pedagogique.json",
+                 max_concurrent_requests: int = 16, **options):
+        """
+        Initialise le moteur d'audit asynchrone.
+
+        Args:
+            groq_api_key (str): Clé API Groq
+            config_path (str): Chemin vers la grille pédagogique JSON
+            max_concurrent_requests (int): Nombre maximal de requêtes IA en vol par boucle d'événements
+            **options: Autres options de PedagogicalAuditEngine (modèle, quotas, mode d'évaluation...)
+        """
+        super().__init__(groq_api_key, config_path, max_concurrent_requests=max_concurrent_requests, **options)
+        self._groq_api_key = groq_api_key
+        # Client et sémaphore propres à chaque boucle d'événements (un client asynchrone est lié à sa boucle)
+        self._loop_resources = weakref.WeakKeyDictionary()
+        self._loop_lock = threading.Lock()
+        self._loop = None
+        self._loop_thread = None
+
+    def _create_async_client(self) -> AsyncOpenAI:
+        """Crée le client Groq asynchrone (les relances sont gérées par le limiteur de débit partagé)."""
+        return AsyncOpenAI(
+            api_key=self._groq_api_key,
+            base_url="https://api.groq.com/openai/v1",
+            max_retries=0
+        )
+
+    def _get_loop_resources(self) -> Dict:
+        """Retourne le client asynchrone et le sémaphore de requêtes de la boucle d'événements courante."""
+        loop = asyncio.get_running_loop()
+        with self._loop_lock:
+            resources = self._loop_resources.get(loop)
+            if resources is None:
+                resources = {
+                    'client': self._create_async_client(),
+                    'slots': asyncio.Semaphore(self.max_concurrent_requests)
+                }
+                self._loop_resources[loop] = resources
+            return resources
+
+    def _run_sync(self, coroutine):
+        """Exécute une coroutine sur la boucle d'événements du moteur et attend son résultat."""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(target=self._loop.run_forever, name="audit-event-loop",
+                                                     daemon=True)
+                self._loop_thread.start()
+            loop = self._loop
+
+        if threading.current_thread() is self._loop_thread:
+            coroutine.close()
+            raise RuntimeError("Appel synchrone depuis la boucle d'événements du moteur : utiliser la variante async")
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+    def close(self):
+        """Ferme le client asynchrone des appels synchrones et arrête leur boucle d'événements."""
+        with self._loop_lock:
+            loop, thread = self._loop, self._loop_thread
+            self._loop = self._loop_thread = None
+            resources = self._loop_resources.pop(loop, None) if loop is not None else None
+        if loop is None:
+            return
+
+        if resources is not None:
+            asyncio.run_coroutine_threadsafe(resources['client'].close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    @staticmethod
+    async def _gather(coroutines, on_result=None) -> List:
+        """
+        Attend un ensemble de coroutines lancées ensemble (ordre des résultats conservé).
+
+        `on_result`, s'il est fourni, reçoit chaque résultat dès qu'il est obtenu (suivi de progression).
+        """
+        if on_result is None:
+            return await asyncio.gather(*coroutines)
+
+        async def run(coroutine):
+            result = await coroutine
+            on_result(result)
+            return result
+
+        return await asyncio.gather(*(run(coroutine) for coroutine in coroutines))
+
+    async def _chat_completion_async(self, messages: List[Dict], temperature: float, max_tokens: int,
+                                     max_retries: int = 5):
+        """
+        Variante asynchrone de _chat_completion.
+
+        La place dans le sémaphore et la réservation auprès du limiteur de débit
+        sont attendues sans bloquer la boucle; une erreur 429 suspend le modèle pour
+        tous les appels (threads et coroutines) avant de relancer la requête.
+        """
+        estimated_tokens = sum(estimate_tokens(message['content']) for message in messages) + max_tokens
+        resources = self._get_loop_resources()
+
+        for attempt in range(max_retries):
+            try:
+                async with resources['slots']:
+                    await self.rate_limiter.acquire_async(self.model, estimated_tokens)
+                    response = await resources['client'].chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens
+                    )
+            except Exception as api_error:
+                if is_rate_limit_error(api_error) and attempt < max_retries - 1:
+                    retry_delay = retry_after_from_error(api_error) or 2 ** (attempt + 1)
+                    print(f"Limite de taux atteinte, attente de {retry_delay:.1f} secondes...")
+                    self.rate_limiter.record_rate_limit(self.model, retry_delay)
+                    continue
+                raise api_error  # Re-lancer l'erreur si tous les essais échouent
+
+            usage = getattr(response, 'usage', None)
+            if usage is not None and getattr(usage, 'total_tokens', None):
+                self.rate_limiter.record_usage(self.model, estimated_tokens, usage.total_tokens)
+            return response
+
+    async def _complete_json_async(self, system_prompt: str, user_prompt: str, temperature: float, max_tokens: int,
+                                   force_refresh: bool = False, validate=None) -> Dict:
+        """Variante asynchrone de _complete_json (même cache de réponses, même validation)."""
+        cache_key, cached = self._lookup_response_cache(system_prompt, user_prompt, temperature, force_refresh)
+        if cached is not None:
+            return cached
+
+        response = await self._chat_completion_async(
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        return self._decode_json_completion(response, validate, cache_key)
+
+    async def _request_criterion_async(self, criterion_key: str, criterion_data: Dict, excerpt: str,
+                                       force_refresh: bool = False, part: Dict = None, subject: str = None) -> Dict:
+        """Variante asynchrone de _request_criterion (les erreurs sont propagées)."""
+        return await self._complete_json_async(force_refresh=force_refresh,
+                                               **self._criterion_query(criterion_key, criterion_data, excerpt, part,
+                                                                       subject))
+
+    async def _request_criteria_batch_async(self, criteria: List[Tuple[str, Dict]], excerpt: str,
+                                            force_refresh: bool = False, part: Dict = None,
+                                            subject: str = None) -> Dict[str, Dict]:
+        """Variante asynchrone de _request_criteria_batch (les erreurs sont propagées)."""
+        if len(criteria) == 1:
+            criterion_key, criterion_data = criteria[0]
+            return {criterion_key: await self._request_criterion_async(criterion_key, criterion_data, excerpt,
+                                                                       force_refresh, part, subject)}
+
+        return await self._complete_json_async(force_refresh=force_refresh,
+                                               **self._criteria_batch_query(criteria, excerpt, part, subject))
+
+    async def _request_chapter_conformity_async(self, title: str, excerpt: str, force_refresh: bool = False,
+                                                part: Dict = None) -> Dict:
+        """Variante asynchrone de _request_chapter_conformity (les erreurs sont propagées)."""
+        return await self._complete_json_async(force_refresh=force_refresh, **self._chapter_query(title, excerpt, part))
+
+    async def _analyze_criterion_async(self, criterion_key: str, criterion_data: Dict, text_content: str,
+                                       force_refresh: bool = False, subject: str = None) -> Dict:
+        """Variante asynchrone de _analyze_criterion."""
+        # Les erreurs d'API sont propagées, seules les réponses inexploitables sont absorbées
+        try:
+            # Limite pour éviter les tokens excessifs
+            return await self._request_criterion_async(criterion_key, criterion_data, text_content[:4000], force_refresh,
+                                                       subject=subject)
+
+        except (ValueError, TypeError, AttributeError, KeyError) as e:
+            print(f"Erreur lors de l'analyse du critère {criterion_key}: {str(e)}")
+            return self._criterion_error_result(e)
+
+    async def _analyze_criteria_batch_async(self, batch: List[Tuple[str, Dict]], excerpt: str,
+                                            force_refresh: bool = False, part: Dict = None,
+                                            subject: str = None) -> Dict[str, Dict]:
+        """Variante asynchrone de _analyze_criteria_batch."""
+        try:
+            return await self._request_criteria_batch_async(batch, excerpt, force_refresh, part, subject)
+        except (ValueError, TypeError, AttributeError, KeyError) as e:
+            location = f" (extrait {part['index']})" if part else ""
+            print(f"Erreur lors de l'analyse de {len(batch)} critère(s){location}: {str(e)}")
+            return {}
+
+    async def _analyze_criteria_async(self, text_content: str, label: str = "", force_refresh: bool = False,
+                                      progress: AuditProgress = None, subject: str = None,
+                                      budget: TokenBudget = None) -> Dict:
+        """
+        Variante asynchrone de _analyze_criteria : tous les appels sont lancés
+        ensemble, le sémaphore limitant le nombre de requêtes en vol.
+
+        Returns:
+            Dict: Résultats par critère, dans l'ordre de la grille
+        """
+        criteria = list(self.grille['criteria'].items())
+        progress = progress or AuditProgress()
+
+        if self.evaluation_mode == "map_reduce":
+            return await self._analyze_criteria_map_reduce_async(text_content, criteria, label, force_refresh, progress,
+                                                                 subject, budget)
+
+        progress.add_work('criteria', len(criteria), f"Analyse des critères pédagogiques{label}...")
+
+        if self.criteria_batch_size and len(criteria) > 1:
+            return await self._analyze_criteria_batched_async(text_content, criteria, label, force_refresh, progress,
+                                                              subject)
+
+        print(f"Analyse de {len(criteria)} critères ({self.max_concurrent_requests} en parallèle){label}")
+        results = await self._gather(
+            (self._analyze_criterion_async(criterion_key, criterion_data, text_content, force_refresh, subject)
+             for criterion_key, criterion_data in criteria),
+            on_result=lambda _: progress.advance('criteria', message=f"Critère évalué{label}")
+        )
+        return {criterion_key: result for (criterion_key, _), result in zip(criteria, results)}
+
+    async def _analyze_criteria_batched_async(self, text_content: str, criteria: List[Tuple[str, Dict]],
+                                              label: str = "", force_refresh: bool = False,
+                                              progress: AuditProgress = None, subject: str = None) -> Dict:
+        """Variante asynchrone de _analyze_criteria_batched."""
+        progress = progress or AuditProgress()
+        batches = self._criteria_batches(criteria)
+        print(f"Analyse de {len(criteria)} critères en {len(batches)} requête(s) groupée(s){label}")
+        excerpt = text_content[:4000]  # Limite pour éviter les tokens excessifs
+
+        criterion_scores = {}
+        batch_results_list = await self._gather(
+            (self._analyze_criteria_batch_async(batch, excerpt, force_refresh, subject=subject) for batch in batches),
+            on_result=lambda batch_results: progress.advance('criteria', len(batch_results),
+                                                             f"{len(batch_results)} critère(s) évalué(s){label}")
+        )
+        for batch_results in batch_results_list:
+            criterion_scores.update(batch_results)
+
+        missing = [(criterion_key, criterion_data) for criterion_key, criterion_data in criteria
+                   if criterion_key not in criterion_scores]
+        if missing:
+            print(f"{len(missing)} critère(s) à évaluer individuellement{label}")
+            results = await self._gather(
+                (self._analyze_criterion_async(criterion_key, criterion_data, text_content, force_refresh, subject)
+                 for criterion_key, criterion_data in missing),
+                on_result=lambda _: progress.advance('criteria', message=f"Critère évalué individuellement{label}")
+            )
+            for (criterion_key, _), result in zip(missing, results):
+                criterion_scores[criterion_key] = result
+
+        return {criterion_key: criterion_scores[criterion_key] for criterion_key, _ in criteria}
+
+    async def _analyze_criteria_map_reduce_async(self, text_content: str, criteria: List[Tuple[str, Dict]],
+                                                 label: str = "", force_refresh: bool = False,
+                                                 progress: AuditProgress = None, subject: str = None,
+                                                 budget: TokenBudget = None) -> Dict:
+        """Variante asynchrone de _analyze_criteria_map_reduce."""
+        progress = progress or AuditProgress()
+        budget = budget or TokenBudget(self.token_budget)
+        batches, parts = self._plan_criteria_map_reduce(text_content, criteria, label, subject, budget)
+
+        def advance(_):
+            progress.advance('criteria', message=f"Extrait analysé{label}")
+
+        progress.add_work('criteria', len(batches) * len(parts), f"Analyse des critères sur {len(parts)} extrait(s){label}...")
+        results = await self._gather(
+            (self._analyze_criteria_batch_async(batch, part['text'], force_refresh, part, subject)
+             for batch in batches for part in parts),
+            on_result=advance
+        )
+        part_results = self._collect_part_results(parts, batches, results)
+
+        # Critères absents des réponses groupées : un appel individuel par extrait
+        missing = self._affordable_retries(self._missing_criterion_parts(criteria, part_results), parts, budget,
+                                           label, subject)
+        if missing:
+            progress.add_work('criteria', len(missing))
+            retries = await self._gather(
+                (self._analyze_criteria_batch_async([(criterion_key, criterion_data)], parts[part_index]['text'],
+                                                    force_refresh, parts[part_index], subject)
+                 for criterion_key, criterion_data, part_index in missing),
+                on_result=advance
+            )
+            for (_, _, part_index), results in zip(missing, retries):
+                part_results[part_index].update(results)
+
+        return self._reduce_criterion_parts(text_content, criteria, parts, part_results)
+
+    async def _analyze_chapter_conformity_async(self, chapter: Dict, force_refresh: bool = False) -> Dict:
+        """Variante asynchrone de _analyze_chapter_conformity."""
+        try:
+            return await self._request_chapter_conformity_async(chapter['title'], chapter['content'][:3000], force_refresh)
+        except Exception as e:
+            return self._chapter_error_result(e)
+
+    async def _analyze_chapter_part_async(self, chapters: List[Dict], chapter_index: int, part: Dict,
+                                          force_refresh: bool = False) -> Dict:
+        """Variante asynchrone de _analyze_chapter_part."""
+        try:
+            return await self._request_chapter_conformity_async(chapters[chapter_index]['title'], part['text'],
+                                                                force_refresh, part)
+        except Exception as e:
+            print(f"Erreur lors de l'analyse du chapitre {chapter_index + 1} (extrait {part['index']}): {str(e)}")
+            return None
+
+    async def _analyze_chapters_async(self, chapters: List[Dict], force_refresh: bool = False,
+                                      progress: AuditProgress = None, budget: TokenBudget = None) -> List[Dict]:
+        """Variante asynchrone de _analyze_chapters (analyses dans l'ordre des chapitres)."""
+        progress = progress or AuditProgress()
+        if self.evaluation_mode == "map_reduce":
+            plans = self._plan_chapters_map_reduce(chapters, budget)
+            tasks = [(chapter_index, part) for chapter_index, parts in enumerate(plans) for part in parts]
+            progress.add_work('chapters', len(tasks),
+                              f"Analyse de {len(chapters)} chapitre(s) sur {len(tasks)} extrait(s)...")
+            results = await self._gather(
+                (self._analyze_chapter_part_async(chapters, chapter_index, part, force_refresh)
+                 for chapter_index, part in tasks),
+                on_result=lambda _: progress.advance('chapters', message="Extrait de chapitre analysé")
+            )
+            chapter_analyses = self._reduce_chapter_parts(plans, results)
+        else:
+            print(f"Analyse de {len(chapters)} chapitres ({self.max_concurrent_requests} en parallèle)")
+            progress.add_work('chapters', len(chapters), f"Analyse de {len(chapters)} chapitre(s)...")
+            chapter_analyses = await self._gather(
+                (self._analyze_chapter_conformity_async(chapter, force_refresh) for chapter in chapters),
+                on_result=lambda _: progress.advance('chapters', message="Chapitre analysé")
+            )
+
+        return [self._add_chapter_info(i, chapter, chapter_analysis)
+                for i, (chapter, chapter_analysis) in enumerate(zip(chapters, chapter_analyses))]
+
+    async def audit_pdf_async(self, pdf_path: str, filename: str, force_refresh: bool = False,
+                              progress_callback: Callable[[Dict], None] = None, subject: str = None) -> Dict:
+        """
+        Effectue un audit complet d'un fichier PDF (variante asynchrone d'audit_pdf).
+
+        L'extraction du PDF est menée dans un thread pour ne pas bloquer la boucle.
+
+        Returns:
+            Dict: Rapport d'audit complet
+        """
+        print(f"Début de l'audit de {filename}...")
+        subject = self._begin_audit(subject)
+        progress = AuditProgress(progress_callback)
+
+        # 1. Extraction du contenu
+        progress.stage('extraction', "Extraction du contenu PDF...")
+        try:
+            pdf_data = await asyncio.to_thread(self._extract_text_content, pdf_path, filename)
+        except Exception as e:
+            return {
+                'error': f"Erreur d'extraction PDF: {str(e)}",
+                'filename': filename,
+                'audit_date': datetime.now().isoformat()
+            }
+
+        audit_report = await self._run_global_analysis_async(pdf_data, filename, force_refresh, progress, subject)
+        progress.finish()
+        return audit_report
+
+    async def _run_global_analysis_async(self, pdf_data: Dict, filename: str, force_refresh: bool = False,
+                                         progress: AuditProgress = None, subject: str = None,
+                                         budget: TokenBudget = None) -> Dict:
+        """Variante asynchrone de _run_global_analysis."""
+        # 2. Analyse par critère
+        criterion_scores = await self._analyze_criteria_async(pdf_data.get('content', ''), force_refresh=force_refresh,
+                                                              progress=progress, subject=subject, budget=budget)
+        return self._build_global_report(pdf_data, filename, criterion_scores, subject)
+
+    async def audit_pdf_chapter_by_chapter_async(self, pdf_path: str, filename: str, force_refresh: bool = False,
+                                                 progress_callback: Callable[[Dict], None] = None,
+                                                 subject: str = None) -> Dict:
+        """
+        Effectue un audit chapitre par chapitre (variante asynchrone d'audit_pdf_chapter_by_chapter).
+
+        L'analyse globale et celle des chapitres partagent le même sémaphore : leurs
+        requêtes sont en vol simultanément.
+
+        Returns:
+            Dict: Rapport d'audit détaillé avec analyse chapitre par chapitre
+        """
+        print(f"Début de l'audit chapitre par chapitre de {filename}...")
+        subject = self._begin_audit(subject)
+        progress = AuditProgress(progress_callback)
+
+        # 1. Extraction du contenu
+        progress.stage('extraction', "Extraction du contenu PDF...")
+        try:
+            pdf_data = await asyncio.to_thread(self._extract_text_content, pdf_path, filename)
+        except Exception as e:
+            return {
+                'error': f"Erreur d'extraction PDF: {str(e)}",
+                'filename': filename,
+                'audit_date': datetime.now().isoformat()
+            }
+
+        # 2. Extraction des chapitres
+        chapters, chapter_detection = await asyncio.to_thread(self._detect_chapters, pdf_data)
+        print(f"Chapitres détectés: {len(chapters)} (méthode: {chapter_detection})")
+
+        # 3. Analyse globale menée en même temps que l'analyse de conformité des chapitres,
+        #    sur le même budget de tokens
+        print("Analyse globale du document...")
+        budget = TokenBudget(self.token_budget, stages=2)
+        global_audit, chapter_analyses = await asyncio.gather(
+            self._run_global_analysis_async(pdf_data, filename, force_refresh, progress, subject, budget),
+            self._analyze_chapters_async(chapters, force_refresh, progress, budget)
+        )
+
+        progress.stage('report', "Génération du rapport...")
+        audit_report = self._build_chapter_report(pdf_data, filename, chapters, chapter_detection, chapter_analyses,
+                                                  global_audit, subject)
+        progress.finish()
+        return audit_report
+
+    async def audit_pdf_with_support_async(self, module_path: str, support_path: str, filename: str,
+                                           force_refresh: bool = False,
+                                           progress_callback: Callable[[Dict], None] = None,
+                                           subject: str = None, support_filename: str = None) -> Dict:
+        """
+        Effectue un audit d'un module avec document support (variante asynchrone d'audit_pdf_with_support).
+
+        Returns:
+            Dict: Rapport d'audit complet
+        """
+        print(f"Début de l'audit de {filename} avec document support...")
+        subject = self._begin_audit(subject)
+        progress = AuditProgress(progress_callback)
+
+        # 1. Extraction du contenu des deux fichiers
+        progress.stage('extraction', "Extraction du contenu des deux PDF...")
+        try:
+            module_data, support_data, combined_content = await asyncio.to_thread(
+                self._extract_module_with_support, module_path, support_path, filename, support_filename
+            )
+        except Exception as e:
+            return {
+                'error': f"Erreur d'extraction PDF: {str(e)}",
+                'filename': filename,
+                'audit_date': datetime.now().isoformat()
+            }
+
+        # 2. Analyse par critère avec le contenu combiné
+        criterion_scores = await self._analyze_criteria_async(combined_content, label=" (avec support)",
+                                                              force_refresh=force_refresh, progress=progress,
+                                                              subject=subject)
+        progress.stage('report', "Génération du rapport...")
+        audit_report = self._build_support_report(filename, module_data, support_data, combined_content, criterion_scores,
+                                                  subject)
+        progress.finish()
+        return audit_report
+
+    def audit_pdf(self, pdf_path: str, filename: str, force_refresh: bool = False,
+                  progress_callback: Callable[[Dict], None] = None, subject: str = None) -> Dict:
+        """Version synchrone d'audit_pdf_async."""
+        return self._run_sync(self.audit_pdf_async(pdf_path, filename, force_refresh, progress_callback, subject))
+
+    def audit_pdf_chapter_by_chapter(self, pdf_path: str, filename: str, force_refresh: bool = False,
+                                     progress_callback: Callable[[Dict], None] = None, subject: str = None) -> Dict:
+        """Version synchrone d'audit_pdf_chapter_by_chapter_async."""
+        return self._run_sync(self.audit_pdf_chapter_by_chapter_async(pdf_path, filename, force_refresh,
+                                                                      progress_callback, subject))
+
+    def audit_pdf_with_support(self, module_path: str, support_path: str, filename: str,
+                               force_refresh: bool = False, progress_callback: Callable[[Dict], None] = None,
+                               subject: str = None, support_filename: str = None) -> Dict:
+        """Version synchrone d'audit_pdf_with_support_async."""
+        return self._run_sync(self.audit_pdf_with_support_async(module_path, support_path, filename, force_refresh,
+                                                                progress_callback, subject, support_filename))
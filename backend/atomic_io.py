@@ -0,0 +1,199 @@
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Iterable
+
+try:
+    import fcntl  # POSIX
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt  # Windows
+except ImportError:
+    msvcrt = None
+
+
+def _fsync_directory(directory: str):
+    """Rend durable le renommage d'un fichier (sans effet là où un dossier ne peut être ouvert)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _create_temp_file(directory: str, name: str, mode: int):
+    """
+    Crée, de façon exclusive, un fichier temporaire `.<name>.*.tmp` dans `directory`.
+
+    Le fichier est créé avec `mode` filtré par le masque de création du processus,
+    comme le serait un fichier ordinaire : 0o666 donne les droits par défaut sans
+    avoir à lire le masque (os.umask le modifierait pour tout le processus).
+
+    Returns:
+        Tuple: (descripteur, chemin du fichier temporaire)
+    """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+    while True:
+        temp_path = os.path.join(directory, f".{name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            return os.open(temp_path, flags, mode), temp_path
+        except FileExistsError:
+            continue
+
+
+def _publish_exclusive(temp_path: str, path: str):
+    """
+    Publie `temp_path` sous `path` sans jamais remplacer un fichier existant.
+
+    Avec un lien physique, `path` apparaît directement avec son contenu complet. Sans
+    liens physiques, la publication n'est pas atomique pour les lecteurs : `path`
+    existe d'abord vide (nom réservé) jusqu'au renommage. Un lecteur doit donc traiter
+    un fichier vide comme pas encore écrit (voir report_storage.read_report).
+
+    Raises:
+        FileExistsError: Si `path` existe déjà
+    """
+    try:
+        # Un lien physique échoue si la cible existe déjà, contrairement au renommage
+        os.link(temp_path, path)
+    except FileExistsError:
+        raise
+    except OSError:
+        # Système de fichiers sans liens physiques (EPERM, ENOTSUP...) : le nom est réservé
+        # par une création exclusive, puis ce fichier vide est remplacé par le contenu complet
+        os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600))
+        try:
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(path)
+            raise
+    else:
+        os.remove(temp_path)
+
+
+def atomic_write_chunks(path: str, chunks: Iterable[bytes], fsync: bool = True, overwrite: bool = True,
+                        mode: int = None):
+    """
+    Écrit un fichier de façon atomique : fichier temporaire dans le même dossier,
+    fsync, puis renommage sur la cible.
+
+    Un lecteur voit toujours soit l'ancien contenu complet, soit le nouveau; un
+    arrêt brutal pendant l'écriture ne laisse jamais de fichier tronqué. Deux
+    écrivains simultanés ne se bloquent pas : le dernier renommage l'emporte.
+
+    Args:
+        path (str): Fichier cible
+        chunks (Iterable[bytes]): Contenu, par blocs (un gros fichier n'est jamais entièrement en mémoire)
+        fsync (bool): Force l'écriture sur disque avant le renommage (désactivable pour un cache)
+        overwrite (bool): Remplace la cible si elle existe; sinon lève FileExistsError
+                          (création exclusive, sûre entre processus; la cible peut alors
+                          apparaître vide un court instant, voir _publish_exclusive)
+        mode (int): Droits du fichier écrit (ex. 0o600 pour un secret); par défaut ceux de
+                    la cible si elle existe, sinon ceux de création du processus
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    # Droits : ceux demandés, sinon ceux de la cible si elle existe, sinon ceux de
+    # création du processus (appliqués par le système à la création du fichier temporaire)
+    if mode is None:
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            pass
+    fd, temp_path = _create_temp_file(directory, os.path.basename(path), 0o666 if mode is None else 0o600)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        if mode is not None:
+            os.chmod(temp_path, mode)
+        if overwrite:
+            os.replace(temp_path, path)
+        else:
+            _publish_exclusive(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    if fsync:
+        _fsync_directory(directory)
+
+
+def atomic_write_bytes(path: str, data: bytes, fsync: bool = True, overwrite: bool = True, mode: int = None):
+    """Écrit un contenu complet de façon atomique (voir atomic_write_chunks)."""
+    atomic_write_chunks(path, (data,), fsync=fsync, overwrite=overwrite, mode=mode)
+
+
+def atomic_write_text(path: str, text: str, encoding: str = 'utf-8', fsync: bool = True):
+    """Écrit un fichier texte de façon atomique (voir atomic_write_chunks)."""
+    atomic_write_bytes(path, text.encode(encoding), fsync=fsync)
+
+
+def atomic_write_json(path: str, data: Any, fsync: bool = True, **dump_options):
+    """
+    Écrit un JSON de façon atomique (voir atomic_write_chunks).
+
+    Les options de json.dumps (indent, separators, ...) sont transmises telles
+    quelles; ensure_ascii vaut False par défaut, comme partout dans le projet.
+    """
+    dump_options.setdefault('ensure_ascii', False)
+    atomic_write_text(path, json.dumps(data, **dump_options), fsync=fsync)
+
+
+def _try_lock(lock_file) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        elif msvcrt is not None:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(lock_file):
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(path: str, timeout: float = 30, poll_interval: float = 0.05):
+    """
+    Verrou consultatif exclusif sur `path`, partagé entre threads et processus.
+
+    À réserver aux lectures-modifications-écritures d'un même fichier : une
+    simple écriture atomique n'en a pas besoin. Le verrou porte sur un fichier
+    voisin `<path>.lock`, conservé après usage (le supprimer ouvrirait une course).
+
+    Raises:
+        TimeoutError: Si le verrou n'est pas obtenu dans le délai imparti
+    """
+    lock_path = f"{path}.lock"
+    os.makedirs(os.path.dirname(os.path.abspath(lock_path)), exist_ok=True)
+    with open(lock_path, 'a+b') as lock_file:
+        deadline = time.monotonic() + timeout
+        while not _try_lock(lock_file):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Verrou indisponible: {lock_path}")
+            time.sleep(poll_interval)
+        try:
+            yield
+        finally:
+            _unlock(lock_file)
@@ -1,14 +1,30 @@
 import json
 import os
 import re
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Tuple, Any
+from itertools import chain
+from typing import Dict, List, Tuple, Any, Iterable, Iterator, Callable
 from openai import OpenAI  # Utilisé pour l'API Groq via le SDK OpenAI
-from backend.pdf_processor import PDFProcessor
+from backend.pdf_processor import PDFProcessor, iter_text_pages
+from backend.extraction_cache import compute_file_hash
+from backend.preview_cache import PreviewCache
+from backend.audit_progress import AuditProgress
+from backend.audit_store import AuditStore
+from backend.atomic_io import atomic_write_bytes
+from backend.report_storage import dumps_report, read_report, report_extension
+from backend.chapter_segmenter import detect_chapters
+from backend.map_reduce import (
+    CRITERION_LIST_FIELDS, TokenBudget, allocate_chunks, reduce_chapter_results, reduce_criterion_results,
+    sample_chunks, split_into_chunks
+)
+from backend.llm_cache import LLMResponseCache
+from backend.rate_limiter import (
+    get_rate_limiter, estimate_tokens, is_rate_limit_error, retry_after_from_error
+)
 import fitz  # PyMuPDF
-import base64
-from io import BytesIO
 
 class PedagogicalAuditEngine:
     """
@@ -16,24 +32,88 @@ class PedagogicalAuditEngine:
     selon une grille de critères prédéfinie.
     """
     
-    def __init__(self, groq_api_key: str, config_path: str = "config/grille_pedagogique.json"):
+    # Tokens de sortie maximaux par analyse de critère et de chapitre
+    CRITERION_MAX_TOKENS = 1000
+    CHAPTER_MAX_TOKENS = 1500
+    # Tokens de sortie réservés par critère d'une requête groupée
+    BATCH_MAX_TOKENS_PER_CRITERION = 400
+    
+    def __init__(self, groq_api_key: str, config_path: str = "config/grille_pedagogique.json",
+                 max_concurrent_requests: int = 4, model: str = "llama-3.3-70b-versatile",
+                 rate_limits: Dict = None, use_response_cache: bool = True,
+                 chapter_detection: str = "auto", evaluation_mode: str = "excerpt",
+                 chunk_tokens: int = 2500, token_budget: int = 250000, criteria_batch_size: int = 0,
+                 audit_store_path: str = "data/audits.db", preview_image_format: str = None,
+                 preview_quality: int = 80, subject_experts_path: str = "config/subject_experts.json"):
         """
         Initialise le moteur d'audit avec la clé API Groq et la grille d'évaluation.
         
         Args:
             groq_api_key (str): Clé API Groq
             config_path (str): Chemin vers la grille pédagogique JSON
+            max_concurrent_requests (int): Nombre maximal d'analyses IA simultanées (1 = mode séquentiel)
+            model (str): Modèle Groq utilisé pour les analyses
+            rate_limits (Dict): Quotas par modèle, ex. {"modele": {"requests_per_minute": 30, "tokens_per_minute": 12000}}
+            use_response_cache (bool): Réutilise les réponses IA déjà obtenues pour des requêtes identiques
+            chapter_detection (str): "auto" (signet du PDF, puis polices, sinon document entier)
+                                     ou "regex" (titres reconnus par expressions régulières)
+            evaluation_mode (str): "excerpt" (début du contenu : 4 000 caractères par critère,
+                                   3 000 par chapitre) ou "map_reduce" (tout le contenu, par extraits)
+            chunk_tokens (int): Taille des extraits du mode "map_reduce", en tokens estimés
+            token_budget (int): Plafond de tokens d'entrée estimés d'un audit "map_reduce", toutes étapes
+                                et reprises comprises; au-delà, les extraits (puis les chapitres)
+                                sont échantillonnés (0 = sans plafond)
+            criteria_batch_size (int): Nombre de critères évalués par requête IA groupée
+                                       (0 = une requête par critère)
+            audit_store_path (str): Base SQLite de l'historique des audits
+            preview_image_format (str): Format des miniatures de prévisualisation ("webp" ou "jpeg",
+                                        webp par défaut si Pillow est installé)
+            preview_quality (int): Qualité de compression des miniatures (1-100)
+            subject_experts_path (str): Chemin vers les profils d'experts par matière
         """
         # Client Groq utilisant le SDK OpenAI avec l'endpoint Groq
+        # Les relances sont gérées par le limiteur de débit partagé (voir _chat_completion)
         self.groq_client = OpenAI(
             api_key=groq_api_key,
-            base_url="https://api.groq.com/openai/v1"
+            base_url="https://api.groq.com/openai/v1",
+            max_retries=0
         )
+        self.model = model
+        self.rate_limiter = get_rate_limiter()
+        for limited_model, limits in (rate_limits or {}).items():
+            self.rate_limiter.configure(limited_model, **limits)
+        self.response_cache = LLMResponseCache() if use_response_cache else None
         self.pdf_processor = PDFProcessor()
         self.config_path = config_path
-        self.grille = self._load_grille()
-        self.subject_experts = self._load_subject_experts()
-        self.current_subject = None
+        self.subject_experts_path = subject_experts_path
+        # Grille et experts rechargés quand leurs fichiers changent (voir reload_config_if_changed)
+        self._config_lock = threading.Lock()
+        self._config_mtimes = None
+        self.reload_config_if_changed()
+        self.chapter_detection = chapter_detection
+        self.evaluation_mode = evaluation_mode
+        self.chunk_tokens = max(1, int(chunk_tokens))
+        self.token_budget = int(token_budget or 0)
+        self.criteria_batch_size = max(0, int(criteria_batch_size or 0))
+        self.max_concurrent_requests = max(1, int(max_concurrent_requests))
+        # Borne globale des appels IA en vol, toutes étapes confondues (critères, chapitres)
+        self._request_slots = threading.BoundedSemaphore(self.max_concurrent_requests)
+        # Historique des audits (reprend une seule fois l'ancien data/index.json)
+        self.audit_store = AuditStore(audit_store_path)
+        self.audit_store.import_legacy_once()
+        # Miniatures et extraits des prévisualisations, en cache disque par contenu
+        self.preview_cache = PreviewCache(image_format=preview_image_format, quality=preview_quality)
+        # Rendus en cours, un verrou par document (empreinte) : les sessions qui
+        # prévisualisent des documents différents ne s'attendent pas
+        self._document_locks = {}
+        self._document_locks_guard = threading.Lock()
+        # Pages de prévisualisation préparées en arrière-plan (thread créé au premier préchargement)
+        # Réentrant : un préchargement annulé ou déjà terminé rappelle _prefetch_done sur place
+        self._prefetch_lock = threading.RLock()
+        self._preview_executor = None
+        self._prefetching = set()
+        # Préchargements en attente par demandeur (session et aperçu), annulés à sa demande suivante
+        self._prefetch_futures = {}
         
     def _load_grille(self) -> Dict:
         """Charge la grille pédagogique depuis le fichier JSON."""
@@ -46,20 +126,73 @@ class PedagogicalAuditEngine:
     def _load_subject_experts(self) -> Dict:
         """Charge les profils d'experts par matière."""
         try:
-            with open("config/subject_experts.json", 'r', encoding='utf-8') as f:
+            with open(self.subject_experts_path, 'r', encoding='utf-8') as f:
                 return json.load(f)
         except FileNotFoundError:
             print("Fichier des experts par matière non trouvé, utilisation du mode générique")
             return {"subjects": {}}
     
-    def set_subject_context(self, subject_key: str):
-        """Définit le contexte de matière pour l'audit."""
+    def _config_mtimes_on_disk(self) -> Tuple:
+        mtimes = []
+        for path in (self.config_path, self.subject_experts_path):
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+    
+    def reload_config_if_changed(self) -> bool:
+        """
+        Recharge la grille et les experts par matière si leurs fichiers ont changé sur disque.
+        
+        Vérifiée au début de chaque audit (un simple stat) : un moteur partagé par
+        toutes les sessions ou un worker de longue durée suit les modifications de
+        la configuration sans redémarrage. Un fichier illisible lors d'un
+        rechargement est ignoré (jusqu'à sa prochaine modification) et la
+        configuration précédente est conservée.
+        
+        Returns:
+            bool: True si la configuration a été rechargée
+        """
+        mtimes = self._config_mtimes_on_disk()
+        if mtimes == self._config_mtimes:
+            return False
+        with self._config_lock:
+            if mtimes == self._config_mtimes:
+                return False
+            try:
+                grille = self._load_grille()
+                subject_experts = self._load_subject_experts()
+            except (OSError, ValueError) as e:
+                if self._config_mtimes is None:
+                    raise
+                # Nouvel essai seulement à la prochaine modification des fichiers
+                self._config_mtimes = mtimes
+                print(f"Configuration modifiée illisible, configuration précédente conservée: {str(e)}")
+                return False
+            self.grille, self.subject_experts = grille, subject_experts
+            reloaded = self._config_mtimes is not None
+            self._config_mtimes = mtimes
+        if reloaded:
+            print("Configuration d'audit rechargée (grille pédagogique, experts par matière)")
+        return True
+    
+    def _begin_audit(self, subject_key: str = None) -> str:
+        """
+        Prépare un audit : recharge la configuration modifiée puis valide la matière.
+        
+        La matière est un paramètre de chaque audit et non un état du moteur : un même
+        moteur peut mener simultanément des audits de matières différentes.
+        
+        Returns:
+            str: Matière retenue, ou None (contexte générique)
+        """
+        self.reload_config_if_changed()
         if subject_key in self.subject_experts.get("subjects", {}):
-            self.current_subject = subject_key
             print(f"Contexte expert défini pour: {self.subject_experts['subjects'][subject_key]['name']}")
-        else:
-            self.current_subject = None
-            print("Contexte générique utilisé")
+            return subject_key
+        print("Contexte générique utilisé")
+        return None
     
     def get_available_subjects(self) -> List[str]:
         """Retourne la liste des matières disponibles."""
@@ -69,112 +202,173 @@ class PedagogicalAuditEngine:
         """Retourne les informations détaillées d'un expert pour une matière donnée."""
         return self.subject_experts.get("subjects", {}).get(subject, {})
 
-    def _extract_text_content(self, pdf_path: str) -> Dict:
-        """Extrait le contenu textuel du PDF."""
-        result = self.pdf_processor.process_pdf_file(pdf_path)
+    def _chat_completion(self, messages: List[Dict], temperature: float, max_tokens: int, max_retries: int = 5):
+        """
+        Point de passage unique des appels à `groq_client.chat.completions.create`.
+        
+        Chaque appel réserve sa place auprès du limiteur de débit partagé
+        (requêtes et tokens par minute); une erreur 429 suspend le modèle pour
+        la durée indiquée par `Retry-After` avant de relancer l'appel.
+        
+        Args:
+            messages (List[Dict]): Messages de la conversation
+            temperature (float): Température d'échantillonnage
+            max_tokens (int): Nombre maximal de tokens en sortie
+            max_retries (int): Nombre maximal de tentatives
+            
+        Returns:
+            Réponse de l'API
+        """
+        estimated_tokens = sum(estimate_tokens(message['content']) for message in messages) + max_tokens
+        
+        for attempt in range(max_retries):
+            try:
+                with self._request_slots:
+                    self.rate_limiter.acquire(self.model, estimated_tokens)
+                    response = self.groq_client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens
+                    )
+            except Exception as api_error:
+                if is_rate_limit_error(api_error) and attempt < max_retries - 1:
+                    retry_delay = retry_after_from_error(api_error) or 2 ** (attempt + 1)
+                    print(f"Limite de taux atteinte, attente de {retry_delay:.1f} secondes...")
+                    self.rate_limiter.record_rate_limit(self.model, retry_delay)
+                    continue
+                raise api_error  # Re-lancer l'erreur si tous les essais échouent
+            
+            usage = getattr(response, 'usage', None)
+            if usage is not None and getattr(usage, 'total_tokens', None):
+                self.rate_limiter.record_usage(self.model, estimated_tokens, usage.total_tokens)
+            return response
+    
+    @staticmethod
+    def _parse_json_response(result_text: str) -> Dict:
+        """Décode une réponse JSON de l'IA en retirant les éventuelles balises markdown."""
+        result_text = result_text.strip()
+        if result_text.startswith('```json'):
+            result_text = result_text[7:-3]
+        elif result_text.startswith('```'):
+            result_text = result_text[3:-3]
+        return json.loads(result_text)
+    
+    def _complete_json(self, system_prompt: str, user_prompt: str, temperature: float, max_tokens: int,
+                       force_refresh: bool = False, validate=None) -> Dict:
+        """
+        Obtient une réponse JSON de l'IA en passant par le cache de réponses.
+        
+        Seules les réponses décodées (et validées par `validate` si fourni) sont
+        mises en cache. Les erreurs d'API sont propagées; une réponse
+        inexploitable lève ValueError.
+        
+        Args:
+            system_prompt (str): Prompt système
+            user_prompt (str): Prompt utilisateur
+            temperature (float): Température d'échantillonnage
+            max_tokens (int): Nombre maximal de tokens en sortie
+            force_refresh (bool): Ignore le cache et remplace l'entrée existante
+            validate (callable): Normalise le résultat décodé ou lève une exception
+            
+        Returns:
+            Dict: Réponse décodée
+        """
+        cache_key, cached = self._lookup_response_cache(system_prompt, user_prompt, temperature, force_refresh)
+        if cached is not None:
+            return cached
+        
+        response = self._chat_completion(
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        return self._decode_json_completion(response, validate, cache_key)
+    
+    def _lookup_response_cache(self, system_prompt: str, user_prompt: str, temperature: float,
+                               force_refresh: bool = False) -> Tuple[str, Dict]:
+        """
+        Consulte le cache de réponses IA pour une requête.
+        
+        Returns:
+            Tuple[str, Dict]: Clé de cache (None sans cache) et réponse en cache (None si absente ou ignorée)
+        """
+        if self.response_cache is None:
+            return None, None
+        cache_key = self.response_cache.make_key(self.model, temperature, system_prompt, user_prompt)
+        if not force_refresh:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cache_key, json.loads(cached)
+        return cache_key, None
+    
+    def _decode_json_completion(self, response, validate=None, cache_key: str = None) -> Dict:
+        """Décode et valide la réponse JSON d'un appel IA, puis la met en cache."""
+        content = response.choices[0].message.content
+        if content is None:
+            raise ValueError("Réponse vide de l'IA")
+        result = self._parse_json_response(content)
+        if validate is not None:
+            result = validate(result)
+        
+        if cache_key is not None:
+            self.response_cache.set(cache_key, json.dumps(result, ensure_ascii=False))
+        return result
+    
+    def _extract_text_content(self, pdf_path: str, filename: str = None) -> Dict:
+        """
+        Extrait le contenu textuel du PDF.
+        
+        Le dictionnaire retourné est le document en mémoire partagé par les
+        étapes d'audit (analyse globale, chapitres) : le PDF n'est lu qu'une fois.
+        `filename` est le nom affiché du document, enregistré avec l'extraction
+        (le chemin d'un PDF du stockage par contenu ne contient que son empreinte).
+        """
+        result = self.pdf_processor.process_pdf_file(pdf_path, filename=filename)
         if result is None:
-            return {'content': '', 'statistics': {'page_count': 0, 'word_count': 0}}
+            return {'content': '', 'statistics': {'page_count': 0, 'word_count': 0}, 'pdf_path': pdf_path}
         
         # Adapter la structure pour correspondre à ce qui est attendu
         return {
+            'pdf_path': pdf_path,
+            'content_hash': result.get('content_hash'),
             'content': result.get('full_content', ''),
+            'page_offsets': result.get('page_offsets', []),
+            'outline': result.get('outline'),
             'statistics': {
-                'page_count': 1,  # PyPDF2 ne donne pas facilement le nombre de pages
+                'page_count': result.get('statistics', {}).get('page_count', 1),
                 'word_count': result.get('statistics', {}).get('word_count', 0)
             }
         }
     
-    def _extract_chapters(self, text_content: str) -> List[Dict]:
-        """
-        Extrait et identifie les chapitres du document.
-        
-        Returns:
-            List[Dict]: Liste des chapitres avec titre et contenu
+    def _detect_chapters(self, pdf_data: Dict) -> Tuple[List[Dict], str]:
         """
-        chapters = []
-        
-        # Patterns pour identifier les chapitres
-        chapter_patterns = [
-            r'(?i)chapitre\s+(\d+|[ivx]+)\s*[:.\-]?\s*(.+?)(?=\n)',
-            r'(?i)partie\s+(\d+|[ivx]+)\s*[:.\-]?\s*(.+?)(?=\n)',
-            r'(?i)section\s+(\d+(?:\.\d+)*)\s*[:.\-]?\s*(.+?)(?=\n)',
-            r'(?i)^(\d+(?:\.\d+)*)\s*[:.\-]\s*(.+?)(?=\n)',
-            r'(?i)^([A-Z][^\n]{10,80})(?=\n\n)'
-        ]
+        Découpe le document en chapitres, d'après sa structure.
         
-        text_lines = text_content.split('\n')
-        current_chapter = None
-        chapter_content = []
+        En mode "auto", les titres du signet du PDF ou, à défaut, ceux repérés par
+        leur police délimitent des plages de pages; sans structure exploitable, le
+        document est analysé comme un seul chapitre. Le mode "regex" recherche les
+        titres dans le texte (voir chapter_segmenter.CHAPTER_TITLE_PATTERN).
         
-        for i, line in enumerate(text_lines):
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Vérifier si la ligne correspond à un titre de chapitre
-            is_chapter_title = False
-            chapter_title = ""
-            
-            for pattern in chapter_patterns:
-                match = re.match(pattern, line)
-                if match:
-                    is_chapter_title = True
-                    if len(match.groups()) >= 2:
-                        chapter_title = f"{match.group(1)} - {match.group(2)}"
-                    else:
-                        chapter_title = match.group(1) if match.group(1) else line
-                    break
-            
-            if is_chapter_title:
-                # Sauvegarder le chapitre précédent
-                if current_chapter and chapter_content:
-                    chapters.append({
-                        'title': current_chapter,
-                        'content': '\n'.join(chapter_content),
-                        'word_count': len(' '.join(chapter_content).split())
-                    })
-                
-                # Commencer un nouveau chapitre
-                current_chapter = chapter_title
-                chapter_content = []
-            else:
-                if current_chapter:
-                    chapter_content.append(line)
-        
-        # Ajouter le dernier chapitre
-        if current_chapter and chapter_content:
-            chapters.append({
-                'title': current_chapter,
-                'content': '\n'.join(chapter_content),
-                'word_count': len(' '.join(chapter_content).split())
-            })
-        
-        # Si aucun chapitre n'est détecté, traiter tout le contenu comme un seul chapitre
-        if not chapters:
-            chapters.append({
-                'title': 'Document complet',
-                'content': text_content,
-                'word_count': len(text_content.split())
-            })
-        
-        return chapters
-    
-    def _analyze_chapter_conformity(self, chapter: Dict) -> Dict:
-        """
-        Analyse la conformité d'un chapitre selon les critères pédagogiques.
-        
-        Args:
-            chapter (Dict): Chapitre à analyser
-            
         Returns:
-            Dict: Analyse de conformité du chapitre
+            Tuple[List[Dict], str]: Chapitres et méthode de détection ('toc', 'fonts', 'regex' ou 'document')
         """
+        # Structure lue une fois à l'extraction et conservée avec elle : le PDF n'est pas rouvert
+        return detect_chapters(pdf_data.get('content', ''), self.chapter_detection,
+                               pdf_data.get('page_offsets'), pdf_data.get('outline'))
+    
+    def _build_chapter_prompt(self, title: str, excerpt: str, part: Dict = None) -> str:
+        """Construit le prompt d'analyse de conformité d'un chapitre (ou d'un extrait de chapitre)."""
+        part_label = f" (extrait {part['index']}/{part['count']} du chapitre)" if part and part['count'] > 1 else ""
         prompt = f"""
         Tu es un expert en pédagogie. Analyse ce chapitre de cours pour vérifier sa conformité pédagogique.
         
-        CHAPITRE : {chapter['title']}
-        CONTENU :
-        {chapter['content'][:3000]}
+        CHAPITRE : {title}
+        CONTENU{part_label} :
+        {excerpt}
         
         CRITÈRES À VÉRIFIER :
         1. OBJECTIFS : Le chapitre définit-il clairement ses objectifs d'apprentissage ?
@@ -221,58 +415,58 @@ class PedagogicalAuditEngine:
             "recommandations": ["recommandation1", "recommandation2"]
         }}
         """
-        
-        try:
-            response = self.groq_client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": "Tu es un expert en évaluation pédagogique. Réponds uniquement en JSON valide."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=1500
-            )
-            
-            result_text = response.choices[0].message.content.strip()
-            
-            # Nettoyage du JSON
-            if result_text.startswith('```json'):
-                result_text = result_text[7:-3]
-            elif result_text.startswith('```'):
-                result_text = result_text[3:-3]
-                
-            result = json.loads(result_text)
-            return result
-            
-        except Exception as e:
-            return {
-                "objectifs": {"present": False, "clairs": False, "score": 0, "commentaire": f"Erreur d'analyse: {str(e)}"},
-                "competences": {"definies": False, "explicites": False, "score": 0, "commentaire": f"Erreur d'analyse: {str(e)}"},
-                "contenu": {"structure": False, "progression": False, "adapte": False, "score": 0, "commentaire": f"Erreur d'analyse: {str(e)}"},
-                "references": {"presentes": False, "pertinentes": False, "score": 0, "commentaire": f"Erreur d'analyse: {str(e)}"},
-                "volume": {"approprie": False, "equilibre_cours_td_tp": False, "score": 0, "commentaire": f"Erreur d'analyse: {str(e)}"},
-                "score_global": 0,
-                "conformite": "non_conforme",
-                "recommandations": ["Relancer l'analyse après vérification du contenu"]
-            }
+        return prompt
+    
+    def _request_chapter_conformity(self, title: str, excerpt: str, force_refresh: bool = False,
+                                    part: Dict = None) -> Dict:
+        """Interroge l'IA sur la conformité d'un chapitre ou d'un extrait (les erreurs sont propagées)."""
+        return self._complete_json(force_refresh=force_refresh, **self._chapter_query(title, excerpt, part))
     
-    def _analyze_criterion(self, criterion_key: str, criterion_data: Dict, text_content: str) -> Dict:
+    def _chapter_query(self, title: str, excerpt: str, part: Dict = None) -> Dict:
+        """Paramètres de _complete_json pour l'analyse de conformité d'un chapitre ou d'un extrait."""
+        return {
+            'system_prompt': "Tu es un expert en évaluation pédagogique. Réponds uniquement en JSON valide.",
+            'user_prompt': self._build_chapter_prompt(title, excerpt, part),
+            'temperature': 0.3,
+            'max_tokens': self.CHAPTER_MAX_TOKENS
+        }
+    
+    def _analyze_chapter_conformity(self, chapter: Dict, force_refresh: bool = False) -> Dict:
         """
-        Analyse un critère spécifique en utilisant l'IA.
+        Analyse la conformité d'un chapitre selon les critères pédagogiques.
         
         Args:
-            criterion_key (str): Clé du critère
-            criterion_data (Dict): Données du critère
-            text_content (str): Contenu textuel à analyser
+            chapter (Dict): Chapitre à analyser
+            force_refresh (bool): Ignore le cache de réponses IA
             
         Returns:
-            Dict: Résultat de l'analyse avec score, commentaires et preuves
+            Dict: Analyse de conformité du chapitre
         """
-        
-        # Ajout du contexte expert si une matière est sélectionnée
+        try:
+            return self._request_chapter_conformity(chapter['title'], chapter['content'][:3000], force_refresh)
+        except Exception as e:
+            return self._chapter_error_result(e)
+    
+    @staticmethod
+    def _chapter_error_result(error: Exception) -> Dict:
+        """Analyse de conformité par défaut lorsque l'IA n'a pas pu répondre."""
+        message = f"Erreur d'analyse: {str(error)}"
+        return {
+            "objectifs": {"present": False, "clairs": False, "score": 0, "commentaire": message},
+            "competences": {"definies": False, "explicites": False, "score": 0, "commentaire": message},
+            "contenu": {"structure": False, "progression": False, "adapte": False, "score": 0, "commentaire": message},
+            "references": {"presentes": False, "pertinentes": False, "score": 0, "commentaire": message},
+            "volume": {"approprie": False, "equilibre_cours_td_tp": False, "score": 0, "commentaire": message},
+            "score_global": 0,
+            "conformite": "non_conforme",
+            "recommandations": ["Relancer l'analyse après vérification du contenu"]
+        }
+    
+    def _expert_context(self, subject: str = None) -> str:
+        """Contexte expert ajouté aux prompts d'évaluation si une matière est sélectionnée."""
         expert_context = ""
-        if self.current_subject and self.current_subject in self.subject_experts.get("subjects", {}):
-            subject_data = self.subject_experts["subjects"][self.current_subject]
+        if subject and subject in self.subject_experts.get("subjects", {}):
+            subject_data = self.subject_experts["subjects"][subject]
             expertise = subject_data.get('expertise', {})
             expert_context = f"""
             
@@ -288,10 +482,38 @@ CRITÈRES D'ÉVALUATION SPÉCIALISÉS :
 FOCUS PÉDAGOGIQUE :
 {chr(10).join([f"- {focus}" for focus in expertise.get('pedagogical_focus', [])])}
             """
+        return expert_context
+    
+    def _build_criterion_prompt(self, criterion_key: str, criterion_data: Dict, excerpt: str,
+                                part: Dict = None, subject: str = None) -> Tuple[str, str]:
+        """
+        Construit les prompts (système, utilisateur) d'évaluation d'un critère.
+        
+        Pour un extrait du mode "map_reduce" (`part`), le prompt situe l'extrait dans
+        le document et demande en plus si l'extrait permet d'évaluer le critère.
+        
+        Returns:
+            Tuple[str, str]: Prompt système et prompt utilisateur
+        """
+        
+        expert_context = self._expert_context(subject)
+        
+        # Extrait d'un document évalué par parties (mode "map_reduce")
+        part_label = ""
+        pertinence_instruction = ""
+        pertinence_field = ""
+        if part:
+            if part['count'] > 1:
+                part_label = f" (extrait {part['index']}/{part['count']} du document)"
+            pertinence_instruction = (
+                "\n        7. Indique si cet extrait contient des éléments permettant d'évaluer ce critère "
+                "(\"pertinent\": false si l'extrait n'en dit rien)"
+            )
+            pertinence_field = ',\n            "pertinent": true/false'
         
         # Construction du prompt pour l'IA
         prompt = f"""
-        Tu es un expert en pédagogie{f" spécialisé en {self.subject_experts['subjects'][self.current_subject]['name']}" if self.current_subject else ""} chargé d'évaluer un contenu éducatif selon le critère suivant :
+        Tu es un expert en pédagogie{f" spécialisé en {self.subject_experts['subjects'][subject]['name']}" if subject else ""} chargé d'évaluer un contenu éducatif selon le critère suivant :
         
         CRITÈRE : {criterion_data['name']}
         DESCRIPTION : {criterion_data['description']}
@@ -302,16 +524,16 @@ FOCUS PÉDAGOGIQUE :
         {', '.join(self.grille['keywords'].get(criterion_key, []))}
         {expert_context}
         
-        CONTENU À ANALYSER :
-        {text_content[:4000]}  # Limite pour éviter les tokens excessifs
+        CONTENU À ANALYSER{part_label} :
+        {excerpt}
         
         INSTRUCTIONS :
-        1. Évalue ce contenu selon les indicateurs listés{" et le contexte expert spécialisé" if self.current_subject else ""}
+        1. Évalue ce contenu selon les indicateurs listés{" et le contexte expert spécialisé" if subject else ""}
         2. Attribue une note de 0 à 5 (5 = excellent, 0 = absent/très insuffisant)
         3. Fournis un commentaire détaillé justifiant ta note
         4. Identifie des extraits du texte comme preuves (citations courtes)
         5. Liste les forces et faiblesses identifiées
-        6. Propose des recommandations d'amélioration{f" adaptées à l'enseignement de {self.subject_experts['subjects'][self.current_subject]['name']}" if self.current_subject else ""}
+        6. Propose des recommandations d'amélioration{f" adaptées à l'enseignement de {self.subject_experts['subjects'][subject]['name']}" if subject else ""}{pertinence_instruction}
         
         RÉPONSE ATTENDUE (FORMAT JSON) :
         {{
@@ -320,83 +542,548 @@ FOCUS PÉDAGOGIQUE :
             "preuves": ["extrait1", "extrait2"],
             "forces": ["force1", "force2"],
             "faiblesses": ["faiblesse1", "faiblesse2"],
-            "recommandations": ["recommandation1", "recommandation2"]
+            "recommandations": ["recommandation1", "recommandation2"]{pertinence_field}
         }}
         """
         
-        # Retry avec délai pour gérer les limites de taux
-        max_retries = 3
-        retry_delay = 2  # secondes
+        return self._evaluator_system_prompt(subject), prompt
+    
+    def _evaluator_system_prompt(self, subject: str = None) -> str:
+        """Prompt système des évaluations de critères."""
+        return f"Tu es un expert en évaluation pédagogique{(' spécialisé en ' + self.subject_experts['subjects'][subject]['name']) if subject else ''}. Réponds uniquement en JSON valide."
+    
+    def _build_criteria_batch_prompt(self, criteria: List[Tuple[str, Dict]], excerpt: str,
+                                     part: Dict = None, subject: str = None) -> Tuple[str, str]:
+        """
+        Construit les prompts (système, utilisateur) d'évaluation groupée de plusieurs critères.
+        
+        Le contenu, le contexte expert et les instructions ne sont envoyés qu'une fois;
+        la réponse attendue est un objet JSON indexé par identifiant de critère.
         
-        for attempt in range(max_retries):
+        Returns:
+            Tuple[str, str]: Prompt système et prompt utilisateur
+        """
+        expert_context = self._expert_context(subject)
+        
+        part_label = ""
+        pertinence_instruction = ""
+        pertinence_field = ""
+        if part:
+            if part['count'] > 1:
+                part_label = f" (extrait {part['index']}/{part['count']} du document)"
+            pertinence_instruction = (
+                "\n        7. Indique si cet extrait contient des éléments permettant d'évaluer le critère "
+                "(\"pertinent\": false si l'extrait n'en dit rien)"
+            )
+            pertinence_field = ',\n                "pertinent": true/false'
+        
+        criteria_description = "\n\n".join(
+            f"""        [{criterion_key}] {criterion_data['name']}
+        DESCRIPTION : {criterion_data['description']}
+        INDICATEURS À ÉVALUER :
+        {chr(10).join([f"- {indicator}" for indicator in criterion_data['indicators']])}
+        MOTS-CLÉS À RECHERCHER : {', '.join(self.grille['keywords'].get(criterion_key, []))}"""
+            for criterion_key, criterion_data in criteria
+        )
+        
+        prompt = f"""
+        Tu es un expert en pédagogie{f" spécialisé en {self.subject_experts['subjects'][subject]['name']}" if subject else ""} chargé d'évaluer un contenu éducatif selon les {len(criteria)} critères suivants :
+        
+        CRITÈRES À ÉVALUER :
+{criteria_description}
+        {expert_context}
+        
+        CONTENU À ANALYSER{part_label} :
+        {excerpt}
+        
+        INSTRUCTIONS (pour chaque critère, indépendamment des autres) :
+        1. Évalue ce contenu selon les indicateurs du critère{" et le contexte expert spécialisé" if subject else ""}
+        2. Attribue une note de 0 à 5 (5 = excellent, 0 = absent/très insuffisant)
+        3. Fournis un commentaire détaillé justifiant ta note
+        4. Identifie des extraits du texte comme preuves (citations courtes)
+        5. Liste les forces et faiblesses identifiées
+        6. Propose des recommandations d'amélioration{f" adaptées à l'enseignement de {self.subject_experts['subjects'][subject]['name']}" if subject else ""}{pertinence_instruction}
+        
+        RÉPONSE ATTENDUE (FORMAT JSON) : un objet dont les clés sont exactement les identifiants
+        entre crochets ({', '.join(criterion_key for criterion_key, _ in criteria)}) :
+        {{
+            "identifiant_du_critere": {{
+                "score": [note de 0 à 5],
+                "commentaire": "[analyse détaillée]",
+                "preuves": ["extrait1", "extrait2"],
+                "forces": ["force1", "force2"],
+                "faiblesses": ["faiblesse1", "faiblesse2"],
+                "recommandations": ["recommandation1", "recommandation2"]{pertinence_field}
+            }}
+        }}
+        """
+        
+        return self._evaluator_system_prompt(subject), prompt
+    
+    def _request_criterion(self, criterion_key: str, criterion_data: Dict, excerpt: str,
+                           force_refresh: bool = False, part: Dict = None, subject: str = None) -> Dict:
+        """
+        Interroge l'IA sur un critère (via le cache et le limiteur de débit partagé, relances sur 429 incluses).
+        
+        Les erreurs d'API et les réponses inexploitables sont propagées.
+        """
+        return self._complete_json(force_refresh=force_refresh,
+                                   **self._criterion_query(criterion_key, criterion_data, excerpt, part, subject))
+    
+    def _criterion_query(self, criterion_key: str, criterion_data: Dict, excerpt: str, part: Dict = None,
+                         subject: str = None) -> Dict:
+        """Paramètres de _complete_json pour l'évaluation d'un critère."""
+        system_prompt, prompt = self._build_criterion_prompt(criterion_key, criterion_data, excerpt, part, subject)
+        return {
+            'system_prompt': system_prompt,
+            'user_prompt': prompt,
+            'temperature': 0.3,
+            'max_tokens': self.CRITERION_MAX_TOKENS,
+            'validate': self._normalize_criterion_result
+        }
+    
+    def _request_criteria_batch(self, criteria: List[Tuple[str, Dict]], excerpt: str,
+                                force_refresh: bool = False, part: Dict = None, subject: str = None) -> Dict[str, Dict]:
+        """
+        Interroge l'IA sur plusieurs critères en une seule requête.
+        
+        Chaque critère de la réponse est validé séparément : seuls les critères
+        exploitables sont retournés (et mis en cache), aux appelants de relancer
+        les autres individuellement. Une réponse sans aucun critère exploitable
+        lève ValueError; les erreurs d'API sont propagées.
+        
+        Returns:
+            Dict[str, Dict]: Analyses validées, par clé de critère
+        """
+        if len(criteria) == 1:
+            criterion_key, criterion_data = criteria[0]
+            return {criterion_key: self._request_criterion(criterion_key, criterion_data, excerpt, force_refresh, part,
+                                                           subject)}
+        
+        return self._complete_json(force_refresh=force_refresh,
+                                   **self._criteria_batch_query(criteria, excerpt, part, subject))
+    
+    def _criteria_batch_query(self, criteria: List[Tuple[str, Dict]], excerpt: str, part: Dict = None,
+                              subject: str = None) -> Dict:
+        """Paramètres de _complete_json pour l'évaluation groupée de plusieurs critères."""
+        criterion_keys = [criterion_key for criterion_key, _ in criteria]
+        system_prompt, prompt = self._build_criteria_batch_prompt(criteria, excerpt, part, subject)
+        return {
+            'system_prompt': system_prompt,
+            'user_prompt': prompt,
+            'temperature': 0.3,
+            'max_tokens': self.BATCH_MAX_TOKENS_PER_CRITERION * len(criteria),
+            'validate': lambda result: self._validate_criteria_batch(result, criterion_keys)
+        }
+    
+    def _validate_criteria_batch(self, result: Dict, criterion_keys: List[str]) -> Dict[str, Dict]:
+        """Valide une réponse groupée critère par critère et écarte les critères absents ou invalides."""
+        if not isinstance(result, dict):
+            raise ValueError("La réponse groupée n'est pas un objet JSON")
+        
+        # Réponse enveloppée dans un objet unique (ex. {"criteres": {...}})
+        if len(result) == 1 and not any(criterion_key in result for criterion_key in criterion_keys):
+            inner = next(iter(result.values()))
+            if isinstance(inner, dict):
+                result = inner
+        
+        validated = {}
+        for criterion_key in criterion_keys:
             try:
-                response = self.groq_client.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=[
-                        {"role": "system", "content": f"Tu es un expert en évaluation pédagogique{(' spécialisé en ' + self.subject_experts['subjects'][self.current_subject]['name']) if self.current_subject else ''}. Réponds uniquement en JSON valide."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.3,
-                    max_tokens=1000
-                )
-                break  # Succès, sortir de la boucle
-            except Exception as api_error:
-                if "429" in str(api_error) or "rate_limit" in str(api_error).lower():
-                    if attempt < max_retries - 1:
-                        print(f"Limite de taux atteinte, attente de {retry_delay} secondes...")
-                        time.sleep(retry_delay)
-                        retry_delay *= 2  # Augmenter le délai exponentiellement
-                        continue
-                raise api_error  # Re-lancer l'erreur si tous les essais échouent
+                validated[criterion_key] = self._validate_criterion_entry(result.get(criterion_key))
+            except (TypeError, ValueError) as e:
+                print(f"Critère {criterion_key} absent ou invalide dans la réponse groupée: {str(e)}")
         
-        try:
-            
-            # Parse de la réponse JSON
-            result_text = response.choices[0].message.content.strip()
+        if not validated:
+            raise ValueError("Aucun critère exploitable dans la réponse groupée")
+        return validated
+    
+    def _validate_criterion_entry(self, entry: Dict) -> Dict:
+        """Vérifie le schéma de l'analyse d'un critère (note obligatoire, listes) puis la normalise."""
+        if not isinstance(entry, dict):
+            raise TypeError("analyse absente")
+        if 'score' not in entry:
+            raise ValueError("note absente")
+        
+        entry['commentaire'] = str(entry.get('commentaire', ''))
+        for field in CRITERION_LIST_FIELDS:
+            value = entry.get(field, [])
+            entry[field] = value if isinstance(value, list) else [value] if value else []
+        return self._normalize_criterion_result(entry)
+    
+    def _analyze_criterion(self, criterion_key: str, criterion_data: Dict, text_content: str,
+                           force_refresh: bool = False, subject: str = None) -> Dict:
+        """
+        Analyse un critère spécifique en utilisant l'IA.
+        
+        Args:
+            criterion_key (str): Clé du critère
+            criterion_data (Dict): Données du critère
+            text_content (str): Contenu textuel à analyser
+            force_refresh (bool): Ignore le cache de réponses IA
+            subject (str): Matière dont le contexte expert est ajouté au prompt (None = générique)
             
-            # Nettoyage du JSON (suppression des balises markdown si présentes)
-            if result_text.startswith('```json'):
-                result_text = result_text[7:-3]
-            elif result_text.startswith('```'):
-                result_text = result_text[3:-3]
-                
-            result = json.loads(result_text)
+        Returns:
+            Dict: Résultat de l'analyse avec score, commentaires et preuves
+        """
+        # Les erreurs d'API sont propagées, seules les réponses inexploitables sont absorbées
+        try:
+            # Limite pour éviter les tokens excessifs
+            return self._request_criterion(criterion_key, criterion_data, text_content[:4000], force_refresh,
+                                           subject=subject)
             
-            # Validation et normalisation du score
-            result['score'] = max(0, min(5, float(result.get('score', 0))))
+        except (ValueError, TypeError, AttributeError, KeyError) as e:
+            print(f"Erreur lors de l'analyse du critère {criterion_key}: {str(e)}")
+            return self._criterion_error_result(e)
+    
+    @staticmethod
+    def _criterion_error_result(error: Exception) -> Dict:
+        """Résultat par défaut d'un critère dont l'analyse a échoué."""
+        return {
+            "score": 0,
+            "commentaire": f"Erreur d'analyse: {str(error)}",
+            "preuves": [],
+            "forces": [],
+            "faiblesses": ["Analyse impossible"],
+            "recommandations": ["Vérifier le contenu et relancer l'analyse"]
+        }
+    
+    @staticmethod
+    def _normalize_criterion_result(result: Dict) -> Dict:
+        """Valide et normalise le score (0 à 5) d'une analyse de critère."""
+        result['score'] = max(0, min(5, float(result.get('score', 0))))
+        return result
+    
+    def _analyze_criteria(self, text_content: str, label: str = "", force_refresh: bool = False,
+                          progress: AuditProgress = None, subject: str = None, budget: TokenBudget = None) -> Dict:
+        """
+        Analyse tous les critères de la grille sur un même contenu.
+        
+        Les critères sont répartis sur un pool de threads borné par
+        `max_concurrent_requests`; les résultats sont réassemblés dans l'ordre
+        de la grille pour que le calcul de la note et le rapport restent inchangés.
+        
+        Args:
+            text_content (str): Contenu textuel à analyser
+            label (str): Suffixe ajouté aux messages de progression
+            force_refresh (bool): Ignore le cache de réponses IA
+            progress (AuditProgress): Suivi de l'avancement (une unité par critère ou par extrait)
+            subject (str): Matière dont le contexte expert est ajouté aux prompts (None = générique)
+            budget (TokenBudget): Budget de tokens de l'audit (mode "map_reduce")
             
+        Returns:
+            Dict: Résultats par critère, dans l'ordre de la grille
+        """
+        criteria = list(self.grille['criteria'].items())
+        progress = progress or AuditProgress()
+        
+        if self.evaluation_mode == "map_reduce":
+            return self._analyze_criteria_map_reduce(text_content, criteria, label, force_refresh, progress, subject,
+                                                     budget)
+        
+        progress.add_work('criteria', len(criteria), f"Analyse des critères pédagogiques{label}...")
+        
+        if self.criteria_batch_size and len(criteria) > 1:
+            return self._analyze_criteria_batched(text_content, criteria, label, force_refresh, progress, subject)
+        
+        def analyze(criterion_key: str, criterion_data: Dict) -> Dict:
+            result = self._analyze_criterion(criterion_key, criterion_data, text_content, force_refresh, subject)
+            progress.advance('criteria', message=f"Critère évalué : {criterion_data['name']}{label}")
             return result
-            
-        except Exception as e:
-            print(f"Erreur lors de l'analyse du critère {criterion_key}: {str(e)}")
-            return {
-                "score": 0,
-                "commentaire": f"Erreur d'analyse: {str(e)}",
-                "preuves": [],
-                "forces": [],
-                "faiblesses": ["Analyse impossible"],
-                "recommandations": ["Vérifier le contenu et relancer l'analyse"]
+        
+        # Mode séquentiel (le débit est régulé par le limiteur partagé)
+        if self.max_concurrent_requests <= 1 or len(criteria) <= 1:
+            criterion_scores = {}
+            for criterion_key, criterion_data in criteria:
+                print(f"Analyse du critère: {criterion_data['name']}{label}")
+                criterion_scores[criterion_key] = analyze(criterion_key, criterion_data)
+            return criterion_scores
+        
+        # Mode concurrent : un appel IA par critère, au plus max_concurrent_requests à la fois
+        print(f"Analyse de {len(criteria)} critères ({self.max_concurrent_requests} en parallèle){label}")
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrent_requests, len(criteria))) as executor:
+            futures = {
+                criterion_key: executor.submit(analyze, criterion_key, criterion_data)
+                for criterion_key, criterion_data in criteria
             }
+            return {criterion_key: futures[criterion_key].result() for criterion_key, _ in criteria}
+    
+    def _criteria_batches(self, criteria: List[Tuple[str, Dict]]) -> List[List[Tuple[str, Dict]]]:
+        """Regroupe les critères par requête (un critère par requête si le regroupement est désactivé)."""
+        batch_size = self.criteria_batch_size or 1
+        return [criteria[start:start + batch_size] for start in range(0, len(criteria), batch_size)]
+    
+    def _analyze_criteria_batched(self, text_content: str, criteria: List[Tuple[str, Dict]], label: str = "",
+                                  force_refresh: bool = False, progress: AuditProgress = None,
+                                  subject: str = None) -> Dict:
+        """
+        Évalue les critères par requêtes groupées (`criteria_batch_size` critères par requête).
+        
+        Les critères absents ou invalides dans une réponse groupée sont ensuite
+        évalués individuellement par _analyze_criterion.
+        """
+        progress = progress or AuditProgress()
+        batches = self._criteria_batches(criteria)
+        print(f"Analyse de {len(criteria)} critères en {len(batches)} requête(s) groupée(s){label}")
+        excerpt = text_content[:4000]  # Limite pour éviter les tokens excessifs
+        
+        criterion_scores = {}
+        batch_results_list = self._run_concurrently(
+            self._analyze_criteria_batch, [(batch, excerpt, force_refresh, None, subject) for batch in batches],
+            on_result=lambda batch_results: progress.advance('criteria', len(batch_results),
+                                                             f"{len(batch_results)} critère(s) évalué(s){label}")
+        )
+        for batch_results in batch_results_list:
+            criterion_scores.update(batch_results)
+        
+        missing = [(criterion_key, criterion_data) for criterion_key, criterion_data in criteria
+                   if criterion_key not in criterion_scores]
+        if missing:
+            print(f"{len(missing)} critère(s) à évaluer individuellement{label}")
+            results = self._run_concurrently(
+                self._analyze_criterion,
+                [(criterion_key, criterion_data, text_content, force_refresh, subject)
+                 for criterion_key, criterion_data in missing],
+                on_result=lambda _: progress.advance('criteria', message=f"Critère évalué individuellement{label}")
+            )
+            for (criterion_key, _), result in zip(missing, results):
+                criterion_scores[criterion_key] = result
+        
+        return {criterion_key: criterion_scores[criterion_key] for criterion_key, _ in criteria}
+    
+    def _analyze_criteria_batch(self, batch: List[Tuple[str, Dict]], excerpt: str, force_refresh: bool = False,
+                                part: Dict = None, subject: str = None) -> Dict[str, Dict]:
+        """
+        Évalue un groupe de critères sur un contenu ou un extrait.
+        
+        Les réponses inexploitables sont absorbées (dictionnaire vide, à compléter
+        par des appels individuels); les erreurs d'API sont propagées.
+        """
+        try:
+            return self._request_criteria_batch(batch, excerpt, force_refresh, part, subject)
+        except (ValueError, TypeError, AttributeError, KeyError) as e:
+            location = f" (extrait {part['index']})" if part else ""
+            print(f"Erreur lors de l'analyse de {len(batch)} critère(s){location}: {str(e)}")
+            return {}
     
-    def _check_mandatory_sections(self, text_content: str) -> Dict:
-        """Vérifie la présence des sections obligatoires."""
+    def _run_concurrently(self, function, arguments: List[Tuple], on_result=None) -> List:
+        """
+        Applique `function` à chaque tuple d'arguments, en parallèle si la concurrence le permet (ordre conservé).
+        
+        `on_result`, s'il est fourni, reçoit chaque résultat dès qu'il est obtenu (suivi de progression).
+        """
+        if on_result is not None:
+            def run(*args):
+                result = function(*args)
+                on_result(result)
+                return result
+        else:
+            run = function
+        
+        if self.max_concurrent_requests <= 1 or len(arguments) <= 1:
+            return [run(*args) for args in arguments]
+        
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrent_requests, len(arguments))) as executor:
+            futures = [executor.submit(run, *args) for args in arguments]
+            return [future.result() for future in futures]
+    
+    def _plan_parts(self, texts: List[str], overhead_tokens: int, calls_per_part: int = 1,
+                    budget: TokenBudget = None) -> List[List[Dict]]:
+        """
+        Découpe chaque texte en extraits pour le mode "map_reduce" en respectant le budget de tokens de l'audit.
+        
+        Le coût d'un extrait est le nombre de tokens d'entrée estimés de chacun des
+        `calls_per_part` appels qu'il génère. Si le total dépasse la part du budget
+        disponible pour l'étape, les extraits sont échantillonnés régulièrement dans
+        chaque texte (au moins un par texte, puis un texte sur plusieurs si cela ne
+        suffit pas). Le coût des extraits retenus est réservé sur le budget.
+        
+        Args:
+            texts (List[str]): Textes à découper
+            overhead_tokens (int): Coût d'un extrait hors texte (prompts de tous ses appels)
+            calls_per_part (int): Nombre d'appels IA par extrait
+            budget (TokenBudget): Budget de l'audit (par défaut, un budget propre à l'étape)
+            
+        Returns:
+            List[List[Dict]]: Extraits retenus pour chaque texte (voir sample_chunks; liste vide si aucun)
+        """
+        budget = budget or TokenBudget(self.token_budget)
+        chunk_lists = [split_into_chunks(text, self.chunk_tokens) for text in texts]
+        
+        def part_cost(part: Dict) -> float:
+            return overhead_tokens + estimate_tokens(part['text']) * calls_per_part
+        
+        def plan(counts: List[int]) -> Tuple[List[List[Dict]], float]:
+            plans = [sample_chunks(chunks, count) for chunks, count in zip(chunk_lists, counts)]
+            return plans, sum(part_cost(part) for parts in plans for part in parts)
+        
+        counts = [len(chunks) for chunks in chunk_lists]
+        plans, cost = plan(counts)
+        allowance = budget.allowance()
+        if cost > allowance:
+            # Nombre d'extraits de coût moyen couverts par l'enveloppe, réduit tant que
+            # les extraits échantillonnés la dépassent
+            max_parts = int(allowance // (cost / sum(counts)))
+            while True:
+                plans, cost = plan(allocate_chunks(counts, max_parts))
+                if cost <= allowance or max_parts <= 0:
+                    break
+                max_parts -= 1
+        budget.reserve(cost)
+        return plans
+    
+    def _analyze_criteria_map_reduce(self, text_content: str, criteria: List[Tuple[str, Dict]], label: str = "",
+                                     force_refresh: bool = False, progress: AuditProgress = None,
+                                     subject: str = None, budget: TokenBudget = None) -> Dict:
+        """
+        Évalue les critères sur l'ensemble du document, extrait par extrait (mode "map_reduce").
+        
+        Chaque couple (groupe de critères, extrait) fait l'objet d'un appel IA, tous
+        les appels étant menés en parallèle; les analyses d'un critère sont ensuite
+        fusionnées (reduce_criterion_results). Un critère absent d'une réponse groupée
+        est réévalué seul sur l'extrait concerné si le budget de tokens le permet, et un
+        extrait dont la réponse reste inexploitable est ignoré; les erreurs d'API sont
+        propagées comme en mode "excerpt".
+        """
+        progress = progress or AuditProgress()
+        budget = budget or TokenBudget(self.token_budget)
+        batches, parts = self._plan_criteria_map_reduce(text_content, criteria, label, subject, budget)
+        
+        def advance(_):
+            progress.advance('criteria', message=f"Extrait analysé{label}")
+        
+        tasks = [(batch, part['text'], force_refresh, part, subject) for batch in batches for part in parts]
+        progress.add_work('criteria', len(tasks), f"Analyse des critères sur {len(parts)} extrait(s){label}...")
+        part_results = self._collect_part_results(
+            parts, batches, self._run_concurrently(self._analyze_criteria_batch, tasks, on_result=advance)
+        )
+        
+        # Critères absents des réponses groupées : un appel individuel par extrait
+        missing = self._affordable_retries(self._missing_criterion_parts(criteria, part_results), parts, budget,
+                                           label, subject)
+        if missing:
+            progress.add_work('criteria', len(missing))
+            retries = self._run_concurrently(
+                self._analyze_criteria_batch,
+                [([(criterion_key, criterion_data)], parts[part_index]['text'], force_refresh, parts[part_index], subject)
+                 for criterion_key, criterion_data, part_index in missing],
+                on_result=advance
+            )
+            for (_, _, part_index), results in zip(missing, retries):
+                part_results[part_index].update(results)
+        
+        return self._reduce_criterion_parts(text_content, criteria, parts, part_results)
+    
+    def _plan_criteria_map_reduce(self, text_content: str, criteria: List[Tuple[str, Dict]], label: str = "",
+                                  subject: str = None,
+                                  budget: TokenBudget = None) -> Tuple[List[List[Tuple[str, Dict]]], List[Dict]]:
+        """
+        Prépare l'évaluation "map_reduce" des critères.
+        
+        Returns:
+            Tuple: Groupes de critères (un appel IA par groupe et par extrait) et extraits retenus
+        """
+        batches = self._criteria_batches(criteria)
+        example_part = {'index': 1, 'count': 2, 'text': ''}
+        overhead_tokens = 0
+        for batch in batches:
+            if len(batch) == 1:
+                system_prompt, prompt = self._build_criterion_prompt(batch[0][0], batch[0][1], "", example_part, subject)
+            else:
+                system_prompt, prompt = self._build_criteria_batch_prompt(batch, "", example_part, subject)
+            overhead_tokens += estimate_tokens(system_prompt) + estimate_tokens(prompt)
+        parts = self._plan_parts([text_content], overhead_tokens, calls_per_part=len(batches), budget=budget)[0]
+        chunks_total = parts[0]['count'] if parts else 0
+        print(f"Analyse de {len(criteria)} critères ({len(batches)} requête(s) par extrait) "
+              f"sur {len(parts)}/{chunks_total} extraits (map-reduce){label}")
+        return batches, parts
+    
+    @staticmethod
+    def _collect_part_results(parts: List[Dict], batches: List, results: List[Dict]) -> List[Dict]:
+        """Regroupe par extrait les résultats des tâches (groupe, extrait), énumérées groupe par groupe."""
+        part_results = [{} for _ in parts]
+        task_indices = [part_index for _ in batches for part_index in range(len(parts))]
+        for part_index, batch_results in zip(task_indices, results):
+            part_results[part_index].update(batch_results)
+        return part_results
+    
+    def _affordable_retries(self, missing: List[Tuple], parts: List[Dict], budget: TokenBudget, label: str = "",
+                            subject: str = None) -> List[Tuple]:
+        """Reprises (critère, extrait) couvertes par le budget de tokens de l'audit; les autres sont abandonnées."""
+        affordable = []
+        for criterion_key, criterion_data, part_index in missing:
+            part = parts[part_index]
+            system_prompt, prompt = self._build_criterion_prompt(criterion_key, criterion_data, part['text'], part, subject)
+            if budget.try_spend(estimate_tokens(system_prompt) + estimate_tokens(prompt)):
+                affordable.append((criterion_key, criterion_data, part_index))
+        if missing:
+            print(f"{len(missing)} analyse(s) (critère, extrait) à reprendre individuellement{label}"
+                  + (f", dont {len(missing) - len(affordable)} abandonnée(s) (budget de tokens atteint)"
+                     if len(affordable) < len(missing) else ""))
+        return affordable
+    
+    def _missing_criterion_parts(self, criteria: List[Tuple[str, Dict]], part_results: List[Dict]) -> List[Tuple]:
+        """Couples (critère, extrait) absents des réponses groupées, à réévaluer individuellement."""
+        if not self.criteria_batch_size:
+            return []
+        return [(criterion_key, criterion_data, part_index)
+                for criterion_key, criterion_data in criteria
+                for part_index in range(len(part_results)) if criterion_key not in part_results[part_index]]
+    
+    def _reduce_criterion_parts(self, text_content: str, criteria: List[Tuple[str, Dict]], parts: List[Dict],
+                                part_results: List[Dict]) -> Dict:
+        """Fusionne, critère par critère, les analyses obtenues sur chaque extrait."""
+        chunks_total = parts[0]['count'] if parts else 0
+        criterion_scores = {}
+        for criterion_key, _ in criteria:
+            analysed = [(results[criterion_key], part) for part, results in zip(parts, part_results)
+                        if criterion_key in results]
+            if not analysed:
+                reason = "aucun extrait exploitable" if parts else "budget de tokens de l'audit atteint"
+                criterion_scores[criterion_key] = self._criterion_error_result(ValueError(reason))
+                continue
+            criterion_scores[criterion_key] = reduce_criterion_results(
+                [result for result, _ in analysed], [part for _, part in analysed], chunks_total, len(text_content)
+            )
+        return criterion_scores
+    
+    @staticmethod
+    def _document_pages(pdf_data: Dict) -> Iterator[Tuple[int, str, int, int]]:
+        """Pages d'un document en mémoire (voir _extract_text_content), comme PDFProcessor.iter_pages."""
+        return iter_text_pages(pdf_data.get('content', ''), pdf_data.get('page_offsets'))
+    
+    def _check_mandatory_sections(self, pages: Iterable[Tuple[int, str, int, int]]) -> Dict:
+        """
+        Vérifie la présence des sections obligatoires.
+        
+        Les pages (enregistrements de PDFProcessor.iter_pages) sont parcourues une à
+        une; le parcours s'arrête dès que toutes les sections ont été trouvées.
+        """
         mandatory_sections = self.grille['mandatory_sections']
         found_sections = []
         missing_sections = []
         
-        text_lower = text_content.lower()
+        # Recherche de mots-clés liés à chaque section
+        section_keywords = {
+            'introduction': ['introduction', 'présentation', 'avant-propos'],
+            'objectifs': ['objectif', 'but', 'finalité', 'compétence'],
+            'contenu principal': ['chapitre', 'section', 'partie', 'cours'],
+            'conclusion': ['conclusion', 'synthèse', 'bilan', 'résumé']
+        }
+        pending = {section: section_keywords.get(section, [section]) for section in mandatory_sections}
+        detected = set()
+        
+        for _, page_text, _, _ in pages:
+            if not pending:
+                break
+            page_lower = page_text.lower()
+            for section, keywords in list(pending.items()):
+                if any(keyword in page_lower for keyword in keywords):
+                    detected.add(section)
+                    del pending[section]
         
         for section in mandatory_sections:
-            # Recherche de mots-clés liés à chaque section
-            section_keywords = {
-                'introduction': ['introduction', 'présentation', 'avant-propos'],
-                'objectifs': ['objectif', 'but', 'finalité', 'compétence'],
-                'contenu principal': ['chapitre', 'section', 'partie', 'cours'],
-                'conclusion': ['conclusion', 'synthèse', 'bilan', 'résumé']
-            }
-            
-            keywords = section_keywords.get(section, [section])
-            if any(keyword in text_lower for keyword in keywords):
+            if section in detected:
                 found_sections.append(section)
             else:
                 missing_sections.append(section)
@@ -407,10 +1094,13 @@ FOCUS PÉDAGOGIQUE :
             'completion_rate': len(found_sections) / len(mandatory_sections) * 100
         }
     
-    def _count_elements(self, text_content: str) -> Dict:
-        """Compte automatiquement les exemples et exercices."""
-        text_lower = text_content.lower()
+    def _count_elements(self, pages: Iterable[Tuple[int, str, int, int]]) -> Dict:
+        """
+        Compte automatiquement les exemples et exercices.
         
+        Les occurrences sont comptées page par page (enregistrements de
+        PDFProcessor.iter_pages) : une page forme une coupure.
+        """
         # Patterns pour détecter les exemples
         example_patterns = [
             r'exemple\s*\d*\s*:',
@@ -428,8 +1118,12 @@ FOCUS PÉDAGOGIQUE :
             r'question\s*\d*'
         ]
         
-        examples_count = sum(len(re.findall(pattern, text_lower)) for pattern in example_patterns)
-        exercises_count = sum(len(re.findall(pattern, text_lower)) for pattern in exercise_patterns)
+        examples_count = 0
+        exercises_count = 0
+        for _, page_text, _, _ in pages:
+            text_lower = page_text.lower()
+            examples_count += sum(len(re.findall(pattern, text_lower)) for pattern in example_patterns)
+            exercises_count += sum(len(re.findall(pattern, text_lower)) for pattern in exercise_patterns)
         
         return {
             'examples_count': examples_count,
@@ -505,24 +1199,30 @@ FOCUS PÉDAGOGIQUE :
             'recommandations_detaillees': list(set(all_recommendations))[:10]
         }
     
-    def audit_pdf(self, pdf_path: str, filename: str) -> Dict:
+    def audit_pdf(self, pdf_path: str, filename: str, force_refresh: bool = False,
+                  progress_callback: Callable[[Dict], None] = None, subject: str = None) -> Dict:
         """
         Effectue un audit complet d'un fichier PDF.
         
         Args:
             pdf_path (str): Chemin vers le fichier PDF
             filename (str): Nom du fichier
+            force_refresh (bool): Ignore le cache de réponses IA (ré-audit forcé)
+            progress_callback (Callable): Reçoit les événements de progression (voir AuditProgress)
+            subject (str): Matière d'expertise (clé de config/subject_experts.json; None = générique)
             
         Returns:
             Dict: Rapport d'audit complet
         """
         
         print(f"Début de l'audit de {filename}...")
+        subject = self._begin_audit(subject)
+        progress = AuditProgress(progress_callback)
         
         # 1. Extraction du contenu
+        progress.stage('extraction', "Extraction du contenu PDF...")
         try:
-            pdf_data = self._extract_text_content(pdf_path)
-            text_content = pdf_data.get('content', '')
+            pdf_data = self._extract_text_content(pdf_path, filename)
         except Exception as e:
             return {
                 'error': f"Erreur d'extraction PDF: {str(e)}",
@@ -530,22 +1230,40 @@ FOCUS PÉDAGOGIQUE :
                 'audit_date': datetime.now().isoformat()
             }
         
+        audit_report = self._run_global_analysis(pdf_data, filename, force_refresh, progress, subject)
+        progress.finish()
+        return audit_report
+    
+    def _run_global_analysis(self, pdf_data: Dict, filename: str, force_refresh: bool = False,
+                             progress: AuditProgress = None, subject: str = None, budget: TokenBudget = None) -> Dict:
+        """
+        Étape d'analyse globale d'un document déjà extrait (critères de la grille).
+        
+        Args:
+            pdf_data (Dict): Document en mémoire produit par _extract_text_content
+            filename (str): Nom du fichier
+            force_refresh (bool): Ignore le cache de réponses IA
+            progress (AuditProgress): Suivi de l'avancement
+            subject (str): Matière d'expertise retenue (None = générique)
+            budget (TokenBudget): Budget de tokens de l'audit (mode "map_reduce")
+            
+        Returns:
+            Dict: Rapport d'audit standard
+        """
         # 2. Analyse par critère
-        criterion_scores = {}
-        for i, (criterion_key, criterion_data) in enumerate(self.grille['criteria'].items()):
-            print(f"Analyse du critère: {criterion_data['name']}")
-            criterion_scores[criterion_key] = self._analyze_criterion(
-                criterion_key, criterion_data, text_content
-            )
-            # Délai entre les critères pour éviter les limites de taux
-            if i < len(self.grille['criteria']) - 1:  # Pas de délai après le dernier critère
-                time.sleep(1)  # 1 seconde entre chaque critère
+        criterion_scores = self._analyze_criteria(pdf_data.get('content', ''), force_refresh=force_refresh,
+                                                  progress=progress, subject=subject, budget=budget)
+        return self._build_global_report(pdf_data, filename, criterion_scores, subject)
+    
+    def _build_global_report(self, pdf_data: Dict, filename: str, criterion_scores: Dict, subject: str = None) -> Dict:
+        """Construit le rapport d'audit standard à partir des analyses par critère."""
+        text_content = pdf_data.get('content', '')
         
         # 3. Vérification des sections obligatoires
-        sections_check = self._check_mandatory_sections(text_content)
+        sections_check = self._check_mandatory_sections(self._document_pages(pdf_data))
         
         # 4. Comptage des éléments
-        elements_count = self._count_elements(text_content)
+        elements_count = self._count_elements(self._document_pages(pdf_data))
         
         # 5. Calcul de la note finale
         final_score, grade = self._calculate_final_grade(criterion_scores)
@@ -560,7 +1278,10 @@ FOCUS PÉDAGOGIQUE :
                 'audit_date': datetime.now().isoformat(),
                 'grille_version': self.grille['metadata']['version'],
                 'total_pages': pdf_data.get('statistics', {}).get('page_count', 0),
-                'word_count': pdf_data.get('statistics', {}).get('word_count', 0)
+                'word_count': pdf_data.get('statistics', {}).get('word_count', 0),
+                'evaluation_mode': self.evaluation_mode,
+                'subject': subject,
+                'content_hash': pdf_data.get('content_hash')
             },
             'scores': {
                 'final_score': final_score,
@@ -583,7 +1304,8 @@ FOCUS PÉDAGOGIQUE :
         
         return audit_report
     
-    def audit_pdf_chapter_by_chapter(self, pdf_path: str, filename: str) -> Dict:
+    def audit_pdf_chapter_by_chapter(self, pdf_path: str, filename: str, force_refresh: bool = False,
+                                     progress_callback: Callable[[Dict], None] = None, subject: str = None) -> Dict:
         """
         Effectue un audit détaillé chapitre par chapitre d'un fichier PDF.
         Vérifie la conformité de chaque chapitre selon les critères pédagogiques.
@@ -591,17 +1313,22 @@ FOCUS PÉDAGOGIQUE :
         Args:
             pdf_path (str): Chemin vers le fichier PDF
             filename (str): Nom du fichier
+            force_refresh (bool): Ignore le cache de réponses IA (ré-audit forcé)
+            progress_callback (Callable): Reçoit les événements de progression (voir AuditProgress)
+            subject (str): Matière d'expertise (clé de config/subject_experts.json; None = générique)
             
         Returns:
             Dict: Rapport d'audit détaillé avec analyse chapitre par chapitre
         """
         
         print(f"Début de l'audit chapitre par chapitre de {filename}...")
+        subject = self._begin_audit(subject)
+        progress = AuditProgress(progress_callback)
         
         # 1. Extraction du contenu
+        progress.stage('extraction', "Extraction du contenu PDF...")
         try:
-            pdf_data = self._extract_text_content(pdf_path)
-            text_content = pdf_data.get('content', '')
+            pdf_data = self._extract_text_content(pdf_path, filename)
         except Exception as e:
             return {
                 'error': f"Erreur d'extraction PDF: {str(e)}",
@@ -610,41 +1337,42 @@ FOCUS PÉDAGOGIQUE :
             }
         
         # 2. Extraction des chapitres
-        chapters = self._extract_chapters(text_content)
-        print(f"Chapitres détectés: {len(chapters)}")
+        chapters, chapter_detection = self._detect_chapters(pdf_data)
+        print(f"Chapitres détectés: {len(chapters)} (méthode: {chapter_detection})")
+        
+        # 3. Analyse globale (sur le même document en mémoire) menée en parallèle
+        #    de l'analyse de conformité de chaque chapitre; les deux étapes se
+        #    partagent le budget de tokens de l'audit
+        budget = TokenBudget(self.token_budget, stages=2)
+        with ThreadPoolExecutor(max_workers=1) as stage_executor:
+            print("Analyse globale du document...")
+            global_future = stage_executor.submit(self._run_global_analysis, pdf_data, filename, force_refresh, progress,
+                                                  subject, budget)
+            chapter_analyses = self._analyze_chapters(chapters, force_refresh, progress, budget)
+            
+            # 4. Fin de l'analyse globale du document
+            global_audit = global_future.result()
         
-        # 3. Analyse de conformité pour chaque chapitre
-        chapter_analyses = []
+        progress.stage('report', "Génération du rapport...")
+        audit_report = self._build_chapter_report(pdf_data, filename, chapters, chapter_detection, chapter_analyses,
+                                                  global_audit, subject)
+        progress.finish()
+        return audit_report
+    
+    def _build_chapter_report(self, pdf_data: Dict, filename: str, chapters: List[Dict], chapter_detection: str,
+                              chapter_analyses: List[Dict], global_audit: Dict, subject: str = None) -> Dict:
+        """Construit le rapport d'audit chapitre par chapitre à partir des analyses des chapitres et de l'analyse globale."""
         conformity_summary = {
             'conforme': 0,
             'partiellement_conforme': 0,
             'non_conforme': 0
         }
         
-        for i, chapter in enumerate(chapters):
-            print(f"Analyse du chapitre {i+1}/{len(chapters)}: {chapter['title'][:50]}...")
-            
-            chapter_analysis = self._analyze_chapter_conformity(chapter)
-            chapter_analysis['chapter_info'] = {
-                'title': chapter['title'],
-                'word_count': chapter['word_count'],
-                'chapter_number': i + 1
-            }
-            
-            chapter_analyses.append(chapter_analysis)
-            
+        for chapter_analysis in chapter_analyses:
             # Mise à jour du résumé de conformité
             conformity = chapter_analysis.get('conformite', 'non_conforme')
             if conformity in conformity_summary:
                 conformity_summary[conformity] += 1
-            
-            # Délai entre les chapitres pour éviter les limites de taux
-            if i < len(chapters) - 1:
-                time.sleep(2)
-        
-        # 4. Analyse globale du document (méthode existante)
-        print("Analyse globale du document...")
-        global_audit = self.audit_pdf(pdf_path, filename)
         
         # 5. Calcul des scores moyens par critère
         criteria_averages = {
@@ -691,7 +1419,11 @@ FOCUS PÉDAGOGIQUE :
                 'grille_version': self.grille['metadata']['version'],
                 'total_pages': pdf_data.get('statistics', {}).get('page_count', 0),
                 'word_count': pdf_data.get('statistics', {}).get('word_count', 0),
-                'chapters_count': len(chapters)
+                'chapters_count': len(chapters),
+                'chapter_detection': chapter_detection,
+                'evaluation_mode': self.evaluation_mode,
+                'subject': subject,
+                'content_hash': pdf_data.get('content_hash')
             },
             'scores': {
                 'final_score': final_score,
@@ -728,6 +1460,106 @@ FOCUS PÉDAGOGIQUE :
         
         return audit_report
     
+    def _analyze_chapters(self, chapters: List[Dict], force_refresh: bool = False,
+                          progress: AuditProgress = None, budget: TokenBudget = None) -> List[Dict]:
+        """
+        Analyse la conformité de chaque chapitre, en parallèle si la concurrence le permet.
+        
+        Args:
+            chapters (List[Dict]): Chapitres issus de _detect_chapters
+            force_refresh (bool): Ignore le cache de réponses IA
+            progress (AuditProgress): Suivi de l'avancement (une unité par chapitre ou par extrait)
+            budget (TokenBudget): Budget de tokens de l'audit (mode "map_reduce")
+            
+        Returns:
+            List[Dict]: Analyses de conformité, dans l'ordre des chapitres
+        """
+        progress = progress or AuditProgress()
+        if self.evaluation_mode == "map_reduce":
+            chapter_analyses = self._analyze_chapters_map_reduce(chapters, force_refresh, progress, budget)
+            return [self._add_chapter_info(i, chapter, chapter_analysis)
+                    for i, (chapter, chapter_analysis) in enumerate(zip(chapters, chapter_analyses))]
+        
+        progress.add_work('chapters', len(chapters), f"Analyse de {len(chapters)} chapitre(s)...")
+        
+        def analyze(index: int, chapter: Dict) -> Dict:
+            print(f"Analyse du chapitre {index + 1}/{len(chapters)}: {chapter['title'][:50]}...")
+            chapter_analysis = self._analyze_chapter_conformity(chapter, force_refresh)
+            progress.advance('chapters', message=f"Chapitre analysé : {chapter['title'][:50]}")
+            return self._add_chapter_info(index, chapter, chapter_analysis)
+        
+        if self.max_concurrent_requests <= 1 or len(chapters) <= 1:
+            return [analyze(i, chapter) for i, chapter in enumerate(chapters)]
+        
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrent_requests, len(chapters))) as executor:
+            futures = [executor.submit(analyze, i, chapter) for i, chapter in enumerate(chapters)]
+            return [future.result() for future in futures]
+    
+    def _analyze_chapters_map_reduce(self, chapters: List[Dict], force_refresh: bool = False,
+                                     progress: AuditProgress = None, budget: TokenBudget = None) -> List[Dict]:
+        """
+        Analyse la conformité de chaque chapitre sur tout son contenu, extrait par extrait (mode "map_reduce").
+        
+        Le budget de tokens est réparti entre les chapitres au prorata de leur taille
+        (un chapitre sur plusieurs n'est analysé que s'il ne permet pas un extrait par
+        chapitre); tous les extraits sont analysés en parallèle puis fusionnés par
+        chapitre (reduce_chapter_results).
+        """
+        progress = progress or AuditProgress()
+        plans = self._plan_chapters_map_reduce(chapters, budget)
+        tasks = [(chapters, chapter_index, part, force_refresh)
+                 for chapter_index, parts in enumerate(plans) for part in parts]
+        progress.add_work('chapters', len(tasks), f"Analyse de {len(chapters)} chapitre(s) sur {len(tasks)} extrait(s)...")
+        results = self._run_concurrently(
+            self._analyze_chapter_part, tasks,
+            on_result=lambda _: progress.advance('chapters', message="Extrait de chapitre analysé")
+        )
+        return self._reduce_chapter_parts(plans, results)
+    
+    @staticmethod
+    def _add_chapter_info(index: int, chapter: Dict, chapter_analysis: Dict) -> Dict:
+        """Ajoute à l'analyse d'un chapitre son titre, sa taille, son numéro et ses pages."""
+        chapter_analysis['chapter_info'] = {
+            'title': chapter['title'],
+            'word_count': chapter['word_count'],
+            'chapter_number': index + 1
+        }
+        if 'page_start' in chapter:
+            chapter_analysis['chapter_info']['pages'] = [chapter['page_start'], chapter['page_end']]
+        return chapter_analysis
+    
+    def _plan_chapters_map_reduce(self, chapters: List[Dict], budget: TokenBudget = None) -> List[List[Dict]]:
+        """Découpe chaque chapitre en extraits pour le mode "map_reduce" (voir _plan_parts)."""
+        example_part = {'index': 1, 'count': 2, 'text': ''}
+        overhead_tokens = estimate_tokens(self._build_chapter_prompt("", "", example_part))
+        plans = self._plan_parts([chapter['content'] for chapter in chapters], overhead_tokens, budget=budget)
+        analysed = sum(1 for parts in plans if parts)
+        print(f"Analyse de {analysed}/{len(chapters)} chapitres sur {sum(len(parts) for parts in plans)} extraits "
+              f"(map-reduce)")
+        return plans
+    
+    def _analyze_chapter_part(self, chapters: List[Dict], chapter_index: int, part: Dict,
+                              force_refresh: bool = False) -> Dict:
+        """Analyse un extrait de chapitre (None si l'analyse a échoué)."""
+        try:
+            return self._request_chapter_conformity(chapters[chapter_index]['title'], part['text'], force_refresh, part)
+        except Exception as e:
+            print(f"Erreur lors de l'analyse du chapitre {chapter_index + 1} (extrait {part['index']}): {str(e)}")
+            return None
+    
+    def _reduce_chapter_parts(self, plans: List[List[Dict]], results: List[Dict]) -> List[Dict]:
+        """Fusionne chapitre par chapitre les analyses des extraits (résultats énumérés dans l'ordre des plans)."""
+        results = iter(results)
+        chapter_analyses = []
+        for parts in plans:
+            analysed = [(result, part) for part, result in zip(parts, results) if isinstance(result, dict)]
+            if not analysed:
+                reason = "aucun extrait exploitable" if parts else "chapitre non analysé, budget de tokens de l'audit atteint"
+                chapter_analyses.append(self._chapter_error_result(ValueError(reason)))
+                continue
+            chapter_analyses.append(reduce_chapter_results([result for result, _ in analysed], [part for _, part in analysed]))
+        return chapter_analyses
+    
     def _calculate_grade(self, score: float) -> Dict:
         """Calcule le grade basé sur le score."""
         for grade_key, grade_data in self.grille['grading_scale'].items():
@@ -764,7 +1596,9 @@ FOCUS PÉDAGOGIQUE :
         
         return averages
 
-    def audit_pdf_with_support(self, module_path: str, support_path: str, filename: str) -> Dict:
+    def audit_pdf_with_support(self, module_path: str, support_path: str, filename: str,
+                               force_refresh: bool = False, progress_callback: Callable[[Dict], None] = None,
+                               subject: str = None, support_filename: str = None) -> Dict:
         """
         Effectue un audit complet d'un fichier PDF module avec un document support.
         
@@ -772,26 +1606,25 @@ FOCUS PÉDAGOGIQUE :
             module_path (str): Chemin vers le fichier PDF module principal
             support_path (str): Chemin vers le fichier PDF de support
             filename (str): Nom du fichier module
+            force_refresh (bool): Ignore le cache de réponses IA (ré-audit forcé)
+            progress_callback (Callable): Reçoit les événements de progression (voir AuditProgress)
+            subject (str): Matière d'expertise (clé de config/subject_experts.json; None = générique)
+            support_filename (str): Nom du fichier support (par défaut celui de `support_path`)
             
         Returns:
             Dict: Rapport d'audit complet
         """
         
         print(f"Début de l'audit de {filename} avec document support...")
+        subject = self._begin_audit(subject)
+        progress = AuditProgress(progress_callback)
         
         # 1. Extraction du contenu des deux fichiers
+        progress.stage('extraction', "Extraction du contenu des deux PDF...")
         try:
-            # Contenu du module principal
-            module_data = self._extract_text_content(module_path)
-            module_content = module_data.get('content', '')
-            
-            # Contenu du document support
-            support_data = self._extract_text_content(support_path)
-            support_content = support_data.get('content', '')
-            
-            # Combinaison des contenus pour l'analyse
-            combined_content = f"CONTENU PRINCIPAL DU MODULE:\n{module_content}\n\nDOCUMENT SUPPORT COMPLÉMENTAIRE:\n{support_content}"
-            
+            module_data, support_data, combined_content = self._extract_module_with_support(
+                module_path, support_path, filename, support_filename
+            )
         except Exception as e:
             return {
                 'error': f"Erreur d'extraction PDF: {str(e)}",
@@ -800,21 +1633,46 @@ FOCUS PÉDAGOGIQUE :
             }
         
         # 2. Analyse par critère avec le contenu combiné
-        criterion_scores = {}
-        for i, (criterion_key, criterion_data) in enumerate(self.grille['criteria'].items()):
-            print(f"Analyse du critère: {criterion_data['name']} (avec support)")
-            criterion_scores[criterion_key] = self._analyze_criterion(
-                criterion_key, criterion_data, combined_content
-            )
-            # Délai entre les critères pour éviter les limites de taux
-            if i < len(self.grille['criteria']) - 1:  # Pas de délai après le dernier critère
-                time.sleep(1)  # 1 seconde entre chaque critère
+        criterion_scores = self._analyze_criteria(combined_content, label=" (avec support)", force_refresh=force_refresh,
+                                                  progress=progress, subject=subject)
+        progress.stage('report', "Génération du rapport...")
+        audit_report = self._build_support_report(filename, module_data, support_data, combined_content, criterion_scores,
+                                                  subject)
+        progress.finish()
+        return audit_report
+    
+    def _extract_module_with_support(self, module_path: str, support_path: str, filename: str = None,
+                                     support_filename: str = None) -> Tuple[Dict, Dict, str]:
+        """
+        Extrait le module et son document support.
         
-        # 3. Vérification des sections obligatoires sur le contenu combiné
-        sections_check = self._check_mandatory_sections(combined_content)
+        Returns:
+            Tuple[Dict, Dict, str]: Documents du module et du support, contenu combiné pour l'analyse
+        """
+        # Contenu du module principal
+        module_data = self._extract_text_content(module_path, filename)
+        module_content = module_data.get('content', '')
         
-        # 4. Comptage des éléments sur le contenu combiné
-        elements_count = self._count_elements(combined_content)
+        # Contenu du document support
+        support_data = self._extract_text_content(support_path, support_filename)
+        support_content = support_data.get('content', '')
+        
+        # Combinaison des contenus pour l'analyse
+        combined_content = f"CONTENU PRINCIPAL DU MODULE:\n{module_content}\n\nDOCUMENT SUPPORT COMPLÉMENTAIRE:\n{support_content}"
+        return module_data, support_data, combined_content
+    
+    def _build_support_report(self, filename: str, module_data: Dict, support_data: Dict, combined_content: str,
+                              criterion_scores: Dict, subject: str = None) -> Dict:
+        """Construit le rapport d'audit d'un module avec document support à partir des analyses par critère."""
+        # 3. Vérification des sections obligatoires sur les pages du module puis du support
+        sections_check = self._check_mandatory_sections(
+            chain(self._document_pages(module_data), self._document_pages(support_data))
+        )
+        
+        # 4. Comptage des éléments sur les pages du module puis du support
+        elements_count = self._count_elements(
+            chain(self._document_pages(module_data), self._document_pages(support_data))
+        )
         
         # 5. Calcul de la note finale
         final_score, grade = self._calculate_final_grade(criterion_scores)
@@ -835,7 +1693,11 @@ FOCUS PÉDAGOGIQUE :
                 'total_pages': total_pages,
                 'word_count': total_word_count,
                 'module_pages': module_data.get('statistics', {}).get('page_count', 0),
-                'support_pages': support_data.get('statistics', {}).get('page_count', 0)
+                'support_pages': support_data.get('statistics', {}).get('page_count', 0),
+                'evaluation_mode': self.evaluation_mode,
+                'subject': subject,
+                'content_hash': module_data.get('content_hash'),
+                'support_content_hash': support_data.get('content_hash')
             },
             'scores': {
                 'final_score': final_score,
@@ -875,13 +1737,23 @@ FOCUS PÉDAGOGIQUE :
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = audit_report['metadata']['filename']
         safe_filename = re.sub(r'[^\w\-_\.]', '_', filename)
-        json_filename = f"audit_{safe_filename}_{timestamp}.json"
-        json_path = os.path.join(output_dir, json_filename)
         
-        # Sauvegarde du rapport
+        # Sauvegarde du rapport au format compact (voir backend/report_storage.py).
+        # Création exclusive : deux workers sauvegardant le même document dans la même
+        # seconde obtiennent deux fichiers distincts au lieu de s'écraser.
         os.makedirs(output_dir, exist_ok=True)
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(audit_report, f, ensure_ascii=False, indent=2)
+        report_data = dumps_report(audit_report)
+        for attempt in range(100):
+            suffix = f"_{attempt + 1}" if attempt else ""
+            json_filename = f"audit_{safe_filename}_{timestamp}{suffix}{report_extension()}"
+            json_path = os.path.join(output_dir, json_filename)
+            try:
+                atomic_write_bytes(json_path, report_data, overwrite=False)
+                break
+            except FileExistsError:
+                continue
+        else:
+            raise FileExistsError(f"Impossible de créer un nom de rapport unique: {json_path}")
         
         # Mise à jour de l'index
         self._update_index(audit_report, json_path)
@@ -889,119 +1761,198 @@ FOCUS PÉDAGOGIQUE :
         return json_path
     
     def _update_index(self, audit_report: Dict, json_path: str):
-        """Met à jour l'index global des audits."""
-        index_path = "data/index.json"
-        
-        # Chargement de l'index existant
-        try:
-            with open(index_path, 'r', encoding='utf-8') as f:
-                index_data = json.load(f)
-        except FileNotFoundError:
-            index_data = {
-                'metadata': {
-                    'created_date': datetime.now().isoformat(),
-                    'total_audits': 0,
-                    'version': '1.0'
-                },
-                'audits': []
-            }
+        """Enregistre le rapport dans l'historique des audits."""
+        self.audit_store.add(AuditStore.entry_from_report(audit_report, json_path))
+    
+    def get_audit_history(self) -> Dict:
+        """
+        Récupère l'historique complet des audits (ordre chronologique).
         
-        # Ajout du nouvel audit
-        audit_entry = {
-            'id': len(index_data['audits']) + 1,
-            'filename': audit_report['metadata']['filename'],
-            'audit_date': audit_report['metadata']['audit_date'],
-            'final_score': audit_report['scores']['final_score'],
-            'grade': audit_report['scores']['grade'],
-            'json_file': json_path,
-            'word_count': audit_report['metadata']['word_count']
+        Pour un historique volumineux, préférer les requêtes paginées de `self.audit_store`.
+        """
+        audits = self.audit_store.query(limit=None, order_by='id', descending=False)
+        return {
+            'metadata': {
+                'total_audits': len(audits),
+                'last_updated': self.audit_store.stats()['last_updated'] or ''
+            },
+            'audits': audits
         }
+    
+    def get_pdf_metadata(self, pdf_path: str, content_hash: str = None) -> Dict:
+        """Retourne les métadonnées du PDF (titre, auteur, pages, taille), sans rendu ni extraction de texte.
         
-        index_data['audits'].append(audit_entry)
-        index_data['metadata']['total_audits'] = len(index_data['audits'])
-        index_data['metadata']['last_updated'] = datetime.now().isoformat()
-        
-        # Sauvegarde de l'index mis à jour
-        with open(index_path, 'w', encoding='utf-8') as f:
-            json.dump(index_data, f, ensure_ascii=False, indent=2)
+        Args:
+            pdf_path (str): Chemin vers le fichier PDF
+            content_hash (str): SHA-256 du fichier, s'il est déjà connu (sinon calculé)
+            
+        Returns:
+            Dict: {'title', 'author', 'page_count', 'file_size'}, ou {'error'} en cas d'échec
+        """
+        try:
+            content_hash = content_hash or compute_file_hash(pdf_path)
+            metadata = self.preview_cache.get_entry(content_hash, 'metadata')
+            if metadata is None:
+                # L'ouverture ne lit que la table des objets : son coût ne dépend pas du nombre de pages
+                with self._document_lock(content_hash):
+                    doc = fitz.open(pdf_path)
+                    try:
+                        metadata = {
+                            'title': doc.metadata.get('title', 'Sans titre'),
+                            'author': doc.metadata.get('author', 'Auteur inconnu'),
+                            'page_count': len(doc),
+                            'file_size': os.path.getsize(pdf_path)
+                        }
+                    finally:
+                        doc.close()
+                self.preview_cache.set_entry(content_hash, 'metadata', metadata)
+            return metadata
+        except Exception as e:
+            return {'error': f"Erreur lors de la lecture des métadonnées du PDF: {str(e)}"}
     
-    def get_audit_history(self) -> Dict:
-        """Récupère l'historique des audits depuis l'index."""
-        index_path = "data/index.json"
+    def render_preview_page(self, pdf_path: str, page: int, zoom: float = 0.5, content_hash: str = None) -> Dict:
+        """Rend une seule page de prévisualisation : extrait de texte et miniature (en cache disque).
         
+        Args:
+            pdf_path (str): Chemin vers le fichier PDF
+            page (int): Numéro de la page (à partir de 1)
+            zoom (float): Facteur d'échelle de la miniature
+            content_hash (str): SHA-256 du fichier, s'il est déjà connu (sinon calculé)
+            
+        Returns:
+            Dict: {'page', 'text', 'image_path'} (image_path vaut None si le rendu a échoué),
+                  ou {'page', 'error'} en cas d'échec
+        """
         try:
-            with open(index_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {
-                'metadata': {'total_audits': 0},
-                'audits': []
-            }
+            content_hash = content_hash or compute_file_hash(pdf_path)
+            excerpt = self.preview_cache.get_entry(content_hash, f"page{page}")
+            image_path = self.preview_cache.get_thumbnail(content_hash, page, zoom)
+            if excerpt is None or image_path is None:
+                # Un document ouvert par rendu; les rendus d'un même document (préchargement en
+                # arrière-plan et affichage) sont faits l'un après l'autre
+                with self._document_lock(content_hash):
+                    doc = fitz.open(pdf_path)
+                    try:
+                        pdf_page = doc[page - 1]
+                        if excerpt is None:
+                            text = pdf_page.get_text()
+                            
+                            # Nettoyer et limiter le texte
+                            clean_text = ' '.join(text.split())[:500] + '...' if len(text) > 500 else text
+                            excerpt = {'page': page, 'text': clean_text}
+                            self.preview_cache.set_entry(content_hash, f"page{page}", excerpt)
+                        if image_path is None:
+                            try:
+                                pix = pdf_page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+                                image_path = self.preview_cache.set_thumbnail(content_hash, page, zoom, pix)
+                            except Exception as e:
+                                print(f"Erreur lors de la génération de l'image pour la page {page}: {e}")
+                    finally:
+                        doc.close()
+            return {'page': page, 'text': excerpt['text'], 'image_path': image_path}
+        except Exception as e:
+            return {'page': page, 'error': f"Erreur lors du rendu de la page {page}: {str(e)}"}
+    
+    @contextmanager
+    def _document_lock(self, content_hash: str):
+        """Verrou des rendus d'un document, libéré de la table quand plus personne ne l'utilise."""
+        with self._document_locks_guard:
+            entry = self._document_locks.setdefault(content_hash, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._document_locks_guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._document_locks[content_hash]
+    
+    def prefetch_preview_pages(self, pdf_path: str, pages: Iterable[int], zoom: float = 0.5,
+                               content_hash: str = None, owner: Any = None):
+        """Prépare en arrière-plan les pages de prévisualisation absentes du cache (retour immédiat).
+        
+        Args:
+            pdf_path (str): Chemin vers le fichier PDF
+            pages (Iterable[int]): Numéros des pages à préparer (à partir de 1)
+            zoom (float): Facteur d'échelle des miniatures
+            content_hash (str): SHA-256 du fichier, s'il est déjà connu (sinon calculé)
+            owner: Demandeur (ex. session et aperçu) : ses préchargements pas encore
+                   commencés sont annulés par sa demande suivante, quand il change de page
+        """
+        content_hash = content_hash or compute_file_hash(pdf_path)
+        with self._prefetch_lock:
+            if owner is not None:
+                for future in self._prefetch_futures.pop(owner, []):
+                    future.cancel()
+            if self._preview_executor is None:
+                self._preview_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preview")
+            futures = []
+            for page in pages:
+                key = (content_hash, page, zoom)
+                if key in self._prefetching or self.preview_cache.get_thumbnail(content_hash, page, zoom):
+                    continue
+                self._prefetching.add(key)
+                future = self._preview_executor.submit(self.render_preview_page, pdf_path, page, zoom, content_hash)
+                futures.append(future)
+                future.add_done_callback(lambda future, key=key: self._prefetch_done(key, owner, future))
+            if owner is not None and futures:
+                self._prefetch_futures[owner] = futures
     
-    def generate_pdf_preview(self, pdf_path: str, max_pages: int = 3) -> Dict:
+    def _prefetch_done(self, key: Tuple, owner: Any, future):
+        # Appelé aussi pour un préchargement annulé
+        with self._prefetch_lock:
+            self._prefetching.discard(key)
+            futures = self._prefetch_futures.get(owner)
+            if futures is not None and future in futures:
+                futures.remove(future)
+                if not futures:
+                    del self._prefetch_futures[owner]
+    
+    def generate_pdf_preview(self, pdf_path: str, max_pages: int = 3, zoom: float = 0.5,
+                             content_hash: str = None) -> Dict:
         """Génère une prévisualisation du PDF avec les premières pages et extraits de texte.
         
+        Rend d'un coup les `max_pages` premières pages : pour un affichage à la demande,
+        utiliser get_pdf_metadata et render_preview_page.
+        
         Args:
             pdf_path (str): Chemin vers le fichier PDF
             max_pages (int): Nombre maximum de pages à prévisualiser
+            zoom (float): Facteur d'échelle des miniatures
+            content_hash (str): SHA-256 du fichier, s'il est déjà connu (sinon calculé)
             
         Returns:
-            Dict: Informations de prévisualisation incluant métadonnées, extraits de texte et images
+            Dict: Informations de prévisualisation incluant métadonnées, extraits de texte et
+                  chemins des miniatures ('page_images': [{'page', 'image_path'}])
         """
         try:
-            doc = fitz.open(pdf_path)
-            preview_data = {
-                'metadata': {
-                    'title': doc.metadata.get('title', 'Sans titre'),
-                    'author': doc.metadata.get('author', 'Auteur inconnu'),
-                    'page_count': len(doc),
-                    'file_size': os.path.getsize(pdf_path)
-                },
-                'text_excerpts': [],
-                'page_images': []
-            }
-            
-            # Extraire le texte des premières pages
-            for page_num in range(min(max_pages, len(doc))):
-                page = doc[page_num]
-                text = page.get_text()
-                
-                # Nettoyer et limiter le texte
-                clean_text = ' '.join(text.split())[:500] + '...' if len(text) > 500 else text
-                
-                preview_data['text_excerpts'].append({
-                    'page': page_num + 1,
-                    'text': clean_text
-                })
-                
-                # Générer une image de la page (optionnel, pour une vraie prévisualisation visuelle)
-                try:
-                    pix = page.get_pixmap(matrix=fitz.Matrix(0.5, 0.5))  # Réduire la taille
-                    img_data = pix.tobytes("png")
-                    img_base64 = base64.b64encode(img_data).decode()
-                    
-                    preview_data['page_images'].append({
-                        'page': page_num + 1,
-                        'image_base64': img_base64
-                    })
-                except Exception as e:
-                    print(f"Erreur lors de la génération de l'image pour la page {page_num + 1}: {e}")
-            
-            doc.close()
-            return preview_data
-            
+            content_hash = content_hash or compute_file_hash(pdf_path)
+            metadata = self.get_pdf_metadata(pdf_path, content_hash)
         except Exception as e:
+            metadata = {'error': f"Erreur lors de la prévisualisation du PDF: {str(e)}"}
+        if 'error' in metadata:
             return {
-                'error': f"Erreur lors de la prévisualisation du PDF: {str(e)}",
+                'error': metadata['error'],
                 'metadata': {'page_count': 0, 'file_size': 0},
                 'text_excerpts': [],
                 'page_images': []
             }
+        
+        preview_data = {'metadata': metadata, 'text_excerpts': [], 'page_images': []}
+        for page in range(1, min(max_pages, metadata['page_count']) + 1):
+            rendered = self.render_preview_page(pdf_path, page, zoom, content_hash)
+            if 'error' in rendered:
+                print(rendered['error'])
+                continue
+            preview_data['text_excerpts'].append({'page': page, 'text': rendered['text']})
+            if rendered['image_path']:
+                preview_data['page_images'].append({'page': page, 'image_path': rendered['image_path']})
+        return preview_data
     
     def load_audit_report(self, json_path: str) -> Dict:
-        """Charge un rapport d'audit spécifique."""
+        """Charge un rapport d'audit spécifique (format compact ou ancien JSON)."""
         try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return read_report(json_path)
         except FileNotFoundError:
             raise FileNotFoundError(f"Rapport d'audit non trouvé: {json_path}")
\ No newline at end of file
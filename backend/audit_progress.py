@@ -0,0 +1,75 @@
+import threading
+from typing import Callable, Dict
+
+
+class AuditProgress:
+    """
+    Suivi de l'avancement d'un audit.
+
+    Chaque étape déclare son volume de travail (`add_work`, en critères, chapitres
+    ou extraits) au moment où elle le connaît, puis le consomme (`advance`) au fil
+    des réponses de l'IA. Chaque changement est transmis au callback sous forme
+    d'événement :
+
+        {'stage': 'extraction' | 'chapters' | 'criteria' | 'report' | 'done',
+         'message': str, 'completed': int, 'total': int, 'progress': float (0 à 1)}
+
+    L'avancement publié ne recule jamais, même lorsqu'une étape déclare du
+    travail supplémentaire en cours de route. Les mises à jour peuvent venir de
+    plusieurs threads; une erreur du callback n'interrompt pas l'audit.
+    """
+
+    # Part de l'avancement réservée à l'extraction du PDF et à la construction du rapport
+    EXTRACTION_SHARE = 0.05
+    REPORT_SHARE = 0.05
+
+    def __init__(self, callback: Callable[[Dict], None] = None):
+        self.callback = callback
+        self.completed = 0
+        self.total = 0
+        self.progress = 0.0
+        self._lock = threading.Lock()
+
+    def stage(self, stage: str, message: str):
+        """Signale le début d'une étape sans travail à comptabiliser (extraction, rapport)."""
+        with self._lock:
+            if stage == 'report':
+                self.progress = max(self.progress, 1 - self.REPORT_SHARE)
+            self._emit(stage, message)
+
+    def add_work(self, stage: str, units: int, message: str = ""):
+        """Déclare `units` unités de travail supplémentaires pour une étape."""
+        with self._lock:
+            self.total += units
+            self._emit(stage, message)
+
+    def advance(self, stage: str, units: int = 1, message: str = ""):
+        """Comptabilise `units` unités de travail terminées."""
+        with self._lock:
+            self.completed += units
+            if self.total:
+                work_share = 1 - self.EXTRACTION_SHARE - self.REPORT_SHARE
+                fraction = self.EXTRACTION_SHARE + work_share * min(1.0, self.completed / self.total)
+                self.progress = max(self.progress, fraction)
+            self._emit(stage, message)
+
+    def finish(self, message: str = "Audit terminé"):
+        """Signale la fin de l'audit (avancement à 100 %)."""
+        with self._lock:
+            self.progress = 1.0
+            self._emit('done', message)
+
+    def _emit(self, stage: str, message: str):
+        if self.callback is None:
+            return
+        event = {
+            'stage': stage,
+            'message': message,
+            'completed': self.completed,
+            'total': self.total,
+            'progress': round(self.progress, 4)
+        }
+        try:
+            self.callback(event)
+        except Exception as e:
+            print(f"Erreur du suivi de progression: {str(e)}")
@@ -0,0 +1,423 @@
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from backend.report_storage import REPORT_EXTENSIONS, read_report
+
+
+# Colonnes de tri autorisées pour les requêtes paginées
+SORTABLE_COLUMNS = ('id', 'audit_date', 'filename', 'final_score', 'grade', 'word_count')
+
+
+class AuditStore:
+    """
+    Historique des audits stocké dans SQLite (mode WAL).
+
+    Chaque rapport sauvegardé y ajoute une ligne (insertion transactionnelle,
+    identifiant attribué par SQLite) : des sauvegardes simultanées, y compris
+    depuis plusieurs processus, ne perdent ni ne dupliquent d'entrées. Les
+    colonnes filtrées et triées par l'historique (fichier, date, grade, score)
+    sont indexées et les requêtes sont paginées, de sorte que la consultation
+    ne dépend pas du nombre total d'audits.
+
+    Les statistiques de l'historique (nombre d'audits, score moyen, répartition
+    des grades, évolution quotidienne) sont des agrégats tenus à jour par des
+    triggers à chaque insertion ou suppression : leur lecture ne parcourt pas
+    les audits.
+
+    L'ancien index (`data/index.json`) et les rapports de `data/audits/` sont
+    importés une seule fois, à la première ouverture (voir import_legacy).
+    """
+
+    # Version des agrégats : à incrémenter quand leur définition change, pour les recalculer
+    AGGREGATES_VERSION = "1"
+
+    def __init__(self, db_path: str = "data/audits.db"):
+        """
+        Args:
+            db_path (str): Chemin de la base SQLite de l'historique
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS audits (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                filename TEXT NOT NULL,
+                audit_date TEXT NOT NULL,
+                final_score REAL NOT NULL,
+                grade TEXT NOT NULL,
+                json_file TEXT NOT NULL UNIQUE,
+                word_count INTEGER NOT NULL DEFAULT 0,
+                audit_type TEXT NOT NULL DEFAULT 'standard',
+                subject TEXT,
+                content_hash TEXT,
+                support_content_hash TEXT
+            )
+        """)
+        for column in ('filename', 'audit_date', 'grade', 'final_score', 'content_hash', 'subject'):
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_audits_{column} ON audits({column})")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS store_metadata (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._create_aggregates()
+        self._conn.commit()
+
+    def _create_aggregates(self):
+        """Tables d'agrégats (par grade et par jour) et triggers qui les maintiennent."""
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS grade_totals (
+                grade TEXT PRIMARY KEY,
+                audits INTEGER NOT NULL,
+                score_sum REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS daily_totals (
+                day TEXT PRIMARY KEY,
+                audits INTEGER NOT NULL,
+                score_sum REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS audits_aggregates_insert AFTER INSERT ON audits
+            BEGIN
+                INSERT INTO grade_totals (grade, audits, score_sum) VALUES (NEW.grade, 1, NEW.final_score)
+                    ON CONFLICT(grade) DO UPDATE SET audits = audits + 1, score_sum = score_sum + NEW.final_score;
+                INSERT INTO daily_totals (day, audits, score_sum) VALUES (substr(NEW.audit_date, 1, 10), 1, NEW.final_score)
+                    ON CONFLICT(day) DO UPDATE SET audits = audits + 1, score_sum = score_sum + NEW.final_score;
+            END
+        """)
+        self._conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS audits_aggregates_delete AFTER DELETE ON audits
+            BEGIN
+                UPDATE grade_totals SET audits = audits - 1, score_sum = score_sum - OLD.final_score
+                    WHERE grade = OLD.grade;
+                UPDATE daily_totals SET audits = audits - 1, score_sum = score_sum - OLD.final_score
+                    WHERE day = substr(OLD.audit_date, 1, 10);
+                DELETE FROM grade_totals WHERE audits <= 0;
+                DELETE FROM daily_totals WHERE audits <= 0;
+            END
+        """)
+        if self._get_metadata('aggregates_version') != self.AGGREGATES_VERSION:
+            self._rebuild_aggregates()
+
+    def _rebuild_aggregates(self):
+        """Recalcule entièrement les agrégats (base créée avant eux ou changement de définition)."""
+        self._conn.execute("DELETE FROM grade_totals")
+        self._conn.execute("DELETE FROM daily_totals")
+        self._conn.execute(
+            "INSERT INTO grade_totals (grade, audits, score_sum) "
+            "SELECT grade, COUNT(*), SUM(final_score) FROM audits GROUP BY grade"
+        )
+        self._conn.execute(
+            "INSERT INTO daily_totals (day, audits, score_sum) "
+            "SELECT substr(audit_date, 1, 10), COUNT(*), SUM(final_score) FROM audits GROUP BY substr(audit_date, 1, 10)"
+        )
+        self._conn.execute(
+            "INSERT OR REPLACE INTO store_metadata (key, value) VALUES ('aggregates_version', ?)",
+            (self.AGGREGATES_VERSION,)
+        )
+
+    @staticmethod
+    def entry_from_report(audit_report: Dict, json_path: str) -> Dict:
+        """Ligne d'historique d'un rapport d'audit sauvegardé dans `json_path`."""
+        metadata = audit_report['metadata']
+        return {
+            'filename': metadata['filename'],
+            'audit_date': metadata['audit_date'],
+            'final_score': audit_report['scores']['final_score'],
+            'grade': audit_report['scores']['grade'],
+            'json_file': json_path,
+            'word_count': metadata.get('word_count', 0),
+            'audit_type': metadata.get('audit_type', 'standard'),
+            'subject': metadata.get('subject'),
+            'content_hash': metadata.get('content_hash'),
+            'support_content_hash': metadata.get('support_content_hash')
+        }
+
+    def _insert(self, entry: Dict) -> int:
+        cursor = self._conn.execute(
+            "INSERT INTO audits (filename, audit_date, final_score, grade, json_file, word_count, audit_type, "
+            "subject, content_hash, support_content_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(json_file) DO NOTHING",
+            (entry['filename'], entry['audit_date'], entry['final_score'], entry['grade'], entry['json_file'],
+             entry.get('word_count') or 0, entry.get('audit_type') or 'standard', entry.get('subject'),
+             entry.get('content_hash'), entry.get('support_content_hash'))
+        )
+        return cursor.lastrowid if cursor.rowcount else 0
+
+    def add(self, entry: Dict) -> int:
+        """
+        Ajoute une ligne à l'historique (voir entry_from_report).
+
+        Returns:
+            int: Identifiant attribué (0 si le rapport était déjà enregistré)
+        """
+        with self._lock, self._conn:
+            return self._insert(entry)
+
+    @staticmethod
+    def _where(filename: str = None, grades: List[str] = None, min_score: float = None, max_score: float = None,
+               date_from: str = None, date_to: str = None, audit_type: str = None,
+               subject: str = None) -> Tuple[str, List]:
+        """Clause WHERE des filtres de l'historique (dates au format ISO, bornes incluses)."""
+        clauses = []
+        args = []
+        if filename:
+            clauses.append("filename LIKE ? ESCAPE '\\'")
+            escaped = filename.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            args.append(f"%{escaped}%")
+        if grades:
+            clauses.append(f"grade IN ({', '.join('?' for _ in grades)})")
+            args.extend(grades)
+        if min_score is not None:
+            clauses.append("final_score >= ?")
+            args.append(min_score)
+        if max_score is not None:
+            clauses.append("final_score <= ?")
+            args.append(max_score)
+        if date_from:
+            clauses.append("audit_date >= ?")
+            args.append(date_from)
+        if date_to:
+            if len(date_to) == 10:
+                # Une date seule (AAAA-MM-JJ) inclut toute la journée
+                clauses.append("audit_date < ?")
+                args.append((date.fromisoformat(date_to) + timedelta(days=1)).isoformat())
+            else:
+                clauses.append("audit_date <= ?")
+                args.append(date_to)
+        if audit_type:
+            clauses.append("audit_type = ?")
+            args.append(audit_type)
+        if subject:
+            clauses.append("subject = ?")
+            args.append(subject)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def query(self, limit: Optional[int] = 50, offset: int = 0, order_by: str = 'audit_date',
+              descending: bool = True, after: Tuple = None, **filters) -> List[Dict]:
+        """
+        Retourne une page de l'historique.
+
+        Pour parcourir page par page sans que le coût dépende de la position, passer
+        dans `after` la clé de tri de la dernière ligne de la page précédente
+        (voir page_cursor) plutôt qu'un `offset`.
+
+        Args:
+            limit (int): Taille de la page (None = tout)
+            offset (int): Nombre de lignes sautées
+            order_by (str): Colonne de tri (voir SORTABLE_COLUMNS)
+            descending (bool): Tri décroissant
+            after (Tuple): Clé de tri (valeur, id) à partir de laquelle reprendre
+            **filters: Filtres de _where (filename, grades, min_score, max_score, date_from, date_to, ...)
+
+        Returns:
+            List[Dict]: Lignes de l'historique
+        """
+        if order_by not in SORTABLE_COLUMNS:
+            raise ValueError(f"Colonne de tri inconnue: {order_by}")
+        where, args = self._where(**filters)
+        direction = "DESC" if descending else "ASC"
+        if after is not None:
+            comparison = "<" if descending else ">"
+            key = f"({order_by}, id) {comparison} (?, ?)" if order_by != 'id' else f"id {comparison} ?"
+            where += (" AND " if where else " WHERE ") + key
+            args += list(after) if order_by != 'id' else [after[-1]]
+        query = f"SELECT * FROM audits{where} ORDER BY {order_by} {direction}, id {direction}"
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            args += [limit, offset]
+        with self._lock:
+            rows = self._conn.execute(query, args).fetchall()
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def page_cursor(row: Dict, order_by: str = 'audit_date') -> Tuple:
+        """Clé de tri d'une ligne, à passer en `after` pour obtenir la page suivante."""
+        return row[order_by], row['id']
+
+    def count(self, limit: int = None, **filters) -> int:
+        """
+        Nombre d'audits correspondant aux filtres.
+
+        Args:
+            limit (int): Arrête le décompte à `limit` (borne le coût d'un filtre peu sélectif)
+        """
+        where, args = self._where(**filters)
+        if not where:
+            return self.stats()['total_audits'] if limit is None else min(limit, self.stats()['total_audits'])
+        query = f"SELECT COUNT(*) FROM audits{where}"
+        if limit is not None:
+            query = f"SELECT COUNT(*) FROM (SELECT 1 FROM audits{where} LIMIT ?)"
+            args.append(limit)
+        with self._lock:
+            return self._conn.execute(query, args).fetchone()[0]
+
+    def stats(self) -> Dict:
+        """
+        Statistiques globales de l'historique, lues dans les agrégats.
+
+        Returns:
+            Dict: {'total_audits', 'average_score', 'grade_distribution' {grade: nombre}, 'last_updated'}
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT grade, audits, score_sum FROM grade_totals ORDER BY grade").fetchall()
+            last_updated = self._conn.execute("SELECT MAX(audit_date) FROM audits").fetchone()[0]
+        total = sum(row['audits'] for row in rows)
+        return {
+            'total_audits': total,
+            'average_score': round(sum(row['score_sum'] for row in rows) / total, 2) if total else 0,
+            'grade_distribution': {row['grade']: row['audits'] for row in rows},
+            'last_updated': last_updated
+        }
+
+    def daily_trend(self, days: int = 90) -> List[Dict]:
+        """
+        Évolution du score moyen, jour par jour, sur les `days` derniers jours d'activité.
+
+        Returns:
+            List[Dict]: {'day', 'audits', 'average_score'} par ordre chronologique
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT day, audits, score_sum FROM daily_totals ORDER BY day DESC LIMIT ?", (days,)
+            ).fetchall()
+        return [{'day': row['day'], 'audits': row['audits'], 'average_score': round(row['score_sum'] / row['audits'], 2)}
+                for row in reversed(rows)]
+
+    def get(self, audit_id: int) -> Optional[Dict]:
+        """Retourne une ligne de l'historique, ou None."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM audits WHERE id = ?", (audit_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def move_report(self, old_path: str, new_path: str) -> int:
+        """Met à jour le chemin d'un rapport déplacé ou converti (nombre de lignes modifiées)."""
+        with self._lock, self._conn:
+            return self._conn.execute("UPDATE audits SET json_file = ? WHERE json_file = ?",
+                                      (new_path, old_path)).rowcount
+
+    def audited_contents(self) -> set:
+        """Contenus déjà audités : ensemble de (audit_type, content_hash, support_content_hash)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT audit_type, content_hash, support_content_hash FROM audits "
+                "WHERE content_hash IS NOT NULL"
+            ).fetchall()
+        return {tuple(row) for row in rows}
+
+    def latest_for_content(self, content_hash: str, support_content_hash: str = None) -> Optional[Dict]:
+        """Dernier audit d'un contenu (avec ce document support, ou sans support), ou None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM audits WHERE content_hash = ? AND support_content_hash IS ? "
+                "ORDER BY audit_date DESC, id DESC LIMIT 1",
+                (content_hash, support_content_hash)
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def _get_metadata(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM store_metadata WHERE key = ?", (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def import_legacy(self, index_path: str = "data/index.json", audits_dir: str = "data/audits") -> int:
+        """
+        Importe l'ancien index JSON puis les rapports de `audits_dir` qu'il ne référence pas.
+
+        L'import se fait en une transaction et ignore les rapports déjà enregistrés :
+        il peut être relancé sans créer de doublons.
+
+        Returns:
+            int: Nombre d'audits importés
+        """
+        entries = []
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                legacy_entries = json.load(f).get('audits', [])
+        except FileNotFoundError:
+            legacy_entries = []
+        except (OSError, ValueError) as e:
+            print(f"Index des audits illisible ({index_path}): {str(e)}")
+            legacy_entries = []
+
+        indexed_files = set()
+        for legacy_entry in sorted(legacy_entries, key=lambda item: item.get('id', 0)):
+            try:
+                # Les anciens chemins peuvent avoir été écrits sous Windows
+                json_file = os.path.normpath(legacy_entry['json_file'].replace('\\', '/'))
+                entries.append({**legacy_entry, 'json_file': json_file})
+                indexed_files.add(json_file)
+            except (KeyError, AttributeError) as e:
+                print(f"Entrée d'index ignorée ({legacy_entry}): {str(e)}")
+
+        report_files = {path for extension in REPORT_EXTENSIONS
+                        for path in glob.glob(os.path.join(audits_dir, f"*{extension}"))}
+        for json_file in sorted(report_files):
+            json_file = os.path.normpath(json_file)
+            if json_file in indexed_files:
+                continue
+            try:
+                entries.append(self.entry_from_report(read_report(json_file), json_file))
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"Rapport ignoré ({json_file}): {str(e)}")
+
+        # Ordre chronologique : les identifiants suivent la date des audits
+        entries.sort(key=lambda entry: entry['audit_date'])
+        with self._lock, self._conn:
+            imported = sum(1 for entry in entries if self._insert(entry))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO store_metadata (key, value) VALUES ('legacy_import', ?)",
+                (datetime.now().isoformat(),)
+            )
+        return imported
+
+    def import_legacy_once(self, index_path: str = "data/index.json", audits_dir: str = "data/audits") -> int:
+        """Importe l'historique existant si cela n'a jamais été fait pour cette base."""
+        with self._lock:
+            if self._get_metadata('legacy_import') is not None:
+                return 0
+        imported = self.import_legacy(index_path, audits_dir)
+        if imported:
+            print(f"{imported} audit(s) importé(s) dans l'historique SQLite")
+        return imported
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def main():
+    """Commande d'administration de l'historique des audits."""
+    parser = argparse.ArgumentParser(description="Gestion de l'historique SQLite des audits")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--stats', action='store_true', help="Affiche le nombre d'audits enregistrés")
+    group.add_argument('--import-legacy', action='store_true',
+                       help="Importe data/index.json et les rapports de data/audits (sans doublons)")
+    parser.add_argument('--db', default="data/audits.db", help="Base SQLite de l'historique")
+    parser.add_argument('--index', default="data/index.json", help="Ancien index JSON")
+    parser.add_argument('--audits-dir', default="data/audits", help="Dossier des rapports")
+    args = parser.parse_args()
+
+    store = AuditStore(args.db)
+    try:
+        if args.stats:
+            stats = store.stats()
+            print(f"{stats['total_audits']} audit(s), score moyen {stats['average_score']}/100, "
+                  f"dernier le {stats['last_updated'] or '-'}")
+        else:
+            print(f"{store.import_legacy(args.index, args.audits_dir)} audit(s) importé(s)")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
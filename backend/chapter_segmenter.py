@@ -0,0 +1,230 @@
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# Titres de chapitres : une seule alternative par motif, testée en début de ligne
+# (espaces ignorés). Les groupes nommés indiquent quel motif a reconnu la ligne.
+# `[^\S\n]` (espace hors saut de ligne) garantit qu'une correspondance ne déborde
+# jamais sur la ligne suivante. Ces motifs ne servent qu'à la détection "regex",
+# activée explicitement : un élément de liste ou une ligne de table des matières
+# reconnus à tort deviendraient autant de chapitres, donc d'analyses IA.
+CHAPTER_TITLE_PATTERN = re.compile(r"""
+    ^[^\S\n]*
+    # Entrées de table des matières : points de conduite ou numéro de page final
+    (?![^\n]*(?:\.\.\.|…))
+    (?![^\n]*\S[^\S\n]+\d+[^\S\n]*$)
+    (?:
+        chapitre [^\S\n]+ (?P<chapitre_num>\d+|[ivx]+)\b [^\S\n]*[:.\-]?[^\S\n]* (?P<chapitre_titre>\S.*?)
+      | partie [^\S\n]+ (?P<partie_num>\d+|[ivx]+)\b [^\S\n]*[:.\-]?[^\S\n]* (?P<partie_titre>\S.*?)
+      | section [^\S\n]+ (?P<section_num>\d+(?:\.\d+)*)\b [^\S\n]*[:.\-]?[^\S\n]* (?P<section_titre>\S.*?)
+        # Titre numéroté de premier niveau (« 1. Introduction », « 2 Les boucles »,
+        # les sous-sections « 2.3 » restent dans leur chapitre) : intitulé court
+        # commençant par une majuscule et sans ponctuation finale
+      | (?P<numero>\d{1,2}) \.? [^\S\n]+
+        (?P<numero_titre>(?-i:[A-ZÀ-ÖØ-Þ])[^\n]{0,58}[^\s.:;,])
+    )
+    [^\S\n]*$
+""", re.IGNORECASE | re.MULTILINE | re.VERBOSE)
+
+# Groupes (numéro, intitulé) des motifs, dans l'ordre de l'alternance
+NUMBERED_TITLE_GROUPS = (
+    ('chapitre_num', 'chapitre_titre'),
+    ('partie_num', 'partie_titre'),
+    ('section_num', 'section_titre'),
+    ('numero', 'numero_titre'),
+)
+
+
+def format_chapter_title(match: re.Match) -> str:
+    """Construit le titre d'un chapitre (« numéro - intitulé ») à partir d'une correspondance."""
+    for number_group, title_group in NUMBERED_TITLE_GROUPS:
+        number = match.group(number_group)
+        if number is not None:
+            return f"{number} - {match.group(title_group)}"
+
+
+def whole_document_chapter(text_content: str) -> Dict:
+    """Chapitre unique couvrant tout le document (découpage par défaut sans structure)."""
+    return {
+        'title': 'Document complet',
+        'content': text_content,
+        'word_count': len(text_content.split()),
+        'start_offset': 0,
+        'end_offset': len(text_content)
+    }
+
+
+def detect_chapters(text_content: str, detection: str = "auto", page_offsets: List[int] = None,
+                    outline: Dict = None) -> Tuple[List[Dict], str]:
+    """
+    Découpe un document en chapitres.
+
+    En mode "auto", les titres situés par page (`outline`, voir
+    PDFProcessor.extract_outline) délimitent les chapitres; sans structure
+    exploitable, le document forme un seul chapitre. En mode "regex", les titres
+    sont recherchés dans le texte (CHAPTER_TITLE_PATTERN).
+
+    Returns:
+        Tuple[List[Dict], str]: Chapitres et méthode ('toc', 'fonts', 'regex' ou 'document')
+    """
+    if detection == "regex":
+        chapters = segment_by_titles(text_content)
+        if chapters:
+            return chapters, 'regex'
+    elif outline and page_offsets:
+        chapters = segment_by_pages(text_content, page_offsets, outline['headings'])
+        if chapters:
+            return chapters, outline['source']
+    return [whole_document_chapter(text_content)], 'document'
+
+
+def segment_by_titles(text_content: str) -> List[Dict]:
+    """Découpe le texte aux titres reconnus par CHAPTER_TITLE_PATTERN (liste vide si aucun)."""
+    segmenter = ChapterSegmenter()
+    chapters = list(segmenter.feed(text_content))
+    chapters.extend(segmenter.close())
+    return chapters
+
+
+def normalize_chapter_content(text: str) -> str:
+    """Supprime les espaces en début/fin de ligne et les lignes vides."""
+    return '\n'.join(filter(None, map(str.strip, text.split('\n'))))
+
+
+def segment_by_pages(text_content: str, page_offsets: List[int], headings: List[Dict]) -> List[Dict]:
+    """
+    Découpe le texte en chapitres d'après des titres situés par page (signet ou polices).
+
+    Chaque chapitre couvre les pages allant de son titre jusqu'à la page précédant
+    le titre suivant : le texte est découpé aux positions des pages, sans parcours
+    ligne par ligne. Les titres d'une même page sont regroupés et un titre répété
+    sur les pages suivantes (diapositive « suite ») prolonge le chapitre en cours.
+    Les pages précédant le premier titre sont ignorées, comme le contenu précédant
+    le premier titre dans le découpage par expressions régulières.
+
+    Args:
+        text_content (str): Texte extrait du document
+        page_offsets (List[int]): Position du début de chaque page dans `text_content`
+        headings (List[Dict]): Titres {'title', 'page_number'} triés par page
+
+    Returns:
+        List[Dict]: Chapitres avec titre, contenu, positions et pages couvertes
+    """
+    starts = []
+    for heading in headings:
+        page_index = heading['page_number'] - 1
+        if not 0 <= page_index < len(page_offsets):
+            continue
+        if starts and starts[-1]['page_index'] == page_index:
+            starts[-1]['title'] += " / " + heading['title']
+        elif not starts or starts[-1]['title'] != heading['title']:
+            starts.append({'title': heading['title'], 'page_index': page_index})
+
+    chapters = []
+    for index, start in enumerate(starts):
+        end_page = starts[index + 1]['page_index'] if index + 1 < len(starts) else len(page_offsets)
+        start_offset = page_offsets[start['page_index']]
+        end_offset = page_offsets[end_page] if end_page < len(page_offsets) else len(text_content)
+        content = normalize_chapter_content(text_content[start_offset:end_offset])
+        if content:
+            chapters.append({
+                'title': start['title'],
+                'content': content,
+                'word_count': len(content.split()),
+                'start_offset': start_offset,
+                'end_offset': end_offset,
+                'page_start': start['page_index'] + 1,
+                'page_end': end_page
+            })
+    return chapters
+
+
+class ChapterSegmenter:
+    """
+    Découpage d'un texte en chapitres à partir des titres détectés.
+
+    Le texte est parcouru par une seule expression régulière précompilée : entre
+    deux titres, le contenu est repéré par ses positions dans le texte puis extrait
+    en une fois, et le nombre de mots est cumulé au fil de l'eau. Le texte peut être
+    fourni d'un bloc ou par morceaux (`feed` puis `close`) : la dernière ligne non
+    vide reçue est conservée jusqu'au bloc suivant, car elle peut être incomplète.
+    Le contenu qui précède le premier titre est ignoré, de même que les titres sans
+    contenu. Un titre déjà rencontré (en-tête répété sur chaque page) ne commence
+    pas de nouveau chapitre : sa ligne est ignorée.
+
+    Les positions `start_offset`/`end_offset` de chaque chapitre désignent son
+    contenu (titre exclu) dans le texte reçu.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._buffer_offset = 0
+        self._title = None
+        self._seen_titles = set()
+        self._parts = []
+        self._word_count = 0
+        self._start_offset = 0
+        self._end_offset = 0
+
+    def feed(self, text: str) -> Iterator[Dict]:
+        """Ajoute un bloc de texte et produit les chapitres terminés."""
+        buffer = self._buffer + text
+        content_end = len(buffer.rstrip())
+        # Début de la dernière ligne non vide : elle sera analysée avec le bloc suivant
+        cut = buffer.rfind('\n', 0, content_end) + 1
+        yield from self._scan(buffer, cut)
+        self._buffer = buffer[cut:]
+        self._buffer_offset += cut
+
+    def close(self) -> Iterator[Dict]:
+        """Termine le découpage et produit le dernier chapitre."""
+        buffer = self._buffer.rstrip()
+        yield from self._scan(buffer, len(buffer))
+        self._buffer_offset += len(self._buffer)
+        self._buffer = ""
+        chapter = self._finish_chapter()
+        if chapter:
+            yield chapter
+
+    def _scan(self, buffer: str, end: int) -> Iterator[Dict]:
+        position = 0
+        for match in CHAPTER_TITLE_PATTERN.finditer(buffer):
+            if match.start() >= end:
+                break
+            self._add_content(buffer, position, match.start())
+            position = match.end()
+            title = format_chapter_title(match)
+            if title in self._seen_titles:
+                continue
+            self._seen_titles.add(title)
+            chapter = self._finish_chapter()
+            if chapter:
+                yield chapter
+            self._title = title
+            self._start_offset = self._end_offset = self._buffer_offset + match.end()
+        self._add_content(buffer, position, end)
+
+    def _add_content(self, buffer: str, start: int, end: int):
+        if self._title is None or start >= end:
+            return
+        part = buffer[start:end]
+        words = len(part.split())
+        if words:
+            self._parts.append(normalize_chapter_content(part))
+            self._word_count += words
+            self._end_offset = self._buffer_offset + start + len(part.rstrip())
+
+    def _finish_chapter(self) -> Optional[Dict]:
+        chapter = None
+        if self._title and self._parts:
+            chapter = {
+                'title': self._title,
+                'content': '\n'.join(self._parts),
+                'word_count': self._word_count,
+                'start_offset': self._start_offset,
+                'end_offset': self._end_offset
+            }
+        self._title = None
+        self._parts = []
+        self._word_count = 0
+        return chapter
@@ -0,0 +1,164 @@
+import os
+import struct
+from typing import Dict, Iterable, Iterator
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+from backend.atomic_io import atomic_write_chunks
+
+
+# En-tête : signature, version, taille des blocs, sel de la clé du fichier
+CHUNK_MAGIC = b'PAEC'
+CHUNK_FORMAT_VERSION = 1
+CHUNK_SALT_SIZE = 16
+CHUNK_HEADER = struct.Struct('>4sBI16s')
+# Étiquette d'authentification AES-GCM ajoutée à chaque bloc
+CHUNK_TAG_SIZE = 16
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def _blob_cipher(master_key: bytes, salt: bytes) -> AESGCM:
+    """Clé AES-256-GCM propre à un fichier, dérivée (HKDF-SHA256) de la clé maîtresse et du sel du fichier."""
+    key = HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=salt,
+        info=b"audit-pedagogique/chunked-encryption/v1",
+    ).derive(master_key)
+    return AESGCM(key)
+
+
+def _chunk_nonce(index: int, last: bool) -> bytes:
+    # Numéro du bloc et indicateur de dernier bloc : un bloc déplacé, supprimé ou
+    # une troncature en fin de fichier font échouer l'authentification
+    return struct.pack('>QI', index, 1 if last else 0)
+
+
+def _seal_chunks(source: Iterable[bytes], master_key: bytes, chunk_size: int, stats: Dict) -> Iterator[bytes]:
+    """Découpe un contenu en blocs de `chunk_size` octets et les chiffre un par un, en-tête compris."""
+    salt = os.urandom(CHUNK_SALT_SIZE)
+    header = CHUNK_HEADER.pack(CHUNK_MAGIC, CHUNK_FORMAT_VERSION, chunk_size, salt)
+    cipher = _blob_cipher(master_key, salt)
+    yield header
+
+    # Un bloc complet n'est chiffré qu'une fois le bloc suivant commencé : il faut
+    # savoir s'il est le dernier
+    buffer = bytearray()
+    pending = None
+    for data in source:
+        view = memoryview(data)
+        offset = 0
+        while offset < len(view):
+            take = min(chunk_size - len(buffer), len(view) - offset)
+            buffer += view[offset:offset + take]
+            offset += take
+            if len(buffer) == chunk_size:
+                if pending is not None:
+                    yield cipher.encrypt(_chunk_nonce(stats['chunks'], False), pending, header)
+                    stats['chunks'] += 1
+                pending = bytes(buffer)
+                stats['size'] += len(pending)
+                buffer.clear()
+
+    # Dernier bloc : le reste, ou le dernier bloc complet (un contenu vide donne un bloc vide)
+    if buffer or pending is None:
+        if pending is not None:
+            yield cipher.encrypt(_chunk_nonce(stats['chunks'], False), pending, header)
+            stats['chunks'] += 1
+        pending = bytes(buffer)
+        stats['size'] += len(pending)
+    yield cipher.encrypt(_chunk_nonce(stats['chunks'], True), pending, header)
+    stats['chunks'] += 1
+
+
+def write_encrypted_blob(path: str, source: Iterable[bytes], master_key: bytes,
+                         chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict:
+    """
+    Chiffre un contenu par blocs dans un fichier binaire (écriture atomique, voir atomic_write_chunks).
+
+    Le contenu est lu et chiffré au fil de l'eau : seul le bloc en cours est en
+    mémoire. Chaque bloc est chiffré avec AES-256-GCM (clé dérivée par fichier)
+    et peut être déchiffré seul (voir EncryptedBlob).
+
+    Args:
+        path (str): Fichier chiffré à écrire
+        source (Iterable[bytes]): Contenu en clair, par morceaux de taille quelconque
+        master_key (bytes): Clé maîtresse (32 octets)
+        chunk_size (int): Taille des blocs en clair
+
+    Returns:
+        Dict: {'size': taille en clair, 'chunks': nombre de blocs}
+    """
+    stats = {'size': 0, 'chunks': 0}
+    atomic_write_chunks(path, _seal_chunks(source, master_key, chunk_size, stats))
+    return stats
+
+
+class EncryptedBlob:
+    """
+    Lecture d'un fichier chiffré par write_encrypted_blob.
+
+    Les blocs sont à position fixe : `read_chunk(i)` ne lit et ne déchiffre que
+    le bloc demandé (ex. le premier pour un aperçu), l'itération déchiffre le
+    contenu bloc par bloc.
+    """
+
+    def __init__(self, path: str, master_key: bytes):
+        """
+        Raises:
+            ValueError: Si le fichier n'est pas au format attendu
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._header = self._file.read(CHUNK_HEADER.size)
+            if len(self._header) < CHUNK_HEADER.size:
+                raise ValueError(f"Fichier chiffré tronqué: {path}")
+            magic, version, self.chunk_size, salt = CHUNK_HEADER.unpack(self._header)
+            if magic != CHUNK_MAGIC or version != CHUNK_FORMAT_VERSION or self.chunk_size < 1:
+                raise ValueError(f"Format de fichier chiffré non reconnu: {path}")
+
+            body_size = os.fstat(self._file.fileno()).st_size - CHUNK_HEADER.size
+            # Le dernier bloc, éventuellement vide, occupe au moins son étiquette
+            if body_size < CHUNK_TAG_SIZE:
+                raise ValueError(f"Fichier chiffré tronqué: {path}")
+            self.chunk_count = (body_size - CHUNK_TAG_SIZE) // (self.chunk_size + CHUNK_TAG_SIZE) + 1
+            self.size = body_size - self.chunk_count * CHUNK_TAG_SIZE
+            self._cipher = _blob_cipher(master_key, salt)
+        except BaseException:
+            self._file.close()
+            raise
+
+    def read_chunk(self, index: int) -> bytes:
+        """
+        Déchiffre un bloc (numéroté à partir de 0).
+
+        Raises:
+            IndexError: Si le bloc n'existe pas
+            ValueError: Si le bloc a été altéré ou si la clé est incorrecte
+        """
+        if not 0 <= index < self.chunk_count:
+            raise IndexError(f"Bloc {index} inexistant ({self.chunk_count} bloc(s))")
+        sealed_size = self.chunk_size + CHUNK_TAG_SIZE
+        self._file.seek(CHUNK_HEADER.size + index * sealed_size)
+        sealed = self._file.read(sealed_size)
+        try:
+            return self._cipher.decrypt(_chunk_nonce(index, index == self.chunk_count - 1), sealed, self._header)
+        except InvalidTag:
+            raise ValueError(f"Bloc {index} altéré ou clé incorrecte: {self.path}")
+
+    def __iter__(self) -> Iterator[bytes]:
+        for index in range(self.chunk_count):
+            yield self.read_chunk(index)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
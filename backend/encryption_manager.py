@@ -1,26 +1,46 @@
 import os
 import json
+import codecs
+import hashlib
+import threading
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import base64
 from pathlib import Path
+from backend.atomic_io import atomic_write_bytes, atomic_write_json, file_lock
+from backend.chunked_encryption import DEFAULT_CHUNK_SIZE, EncryptedBlob, write_encrypted_blob
+
+# Itérations PBKDF2-HMAC-SHA256 de la dérivation de la clé
+KDF_ITERATIONS = 100000
+
+# Clés dérivées par le processus, indexées par (sel, empreinte du mot de passe) :
+# la dérivation PBKDF2 n'est calculée qu'une fois par processus, quel que soit
+# le nombre de gestionnaires créés (sessions, workers)
+_derived_keys = {}
+_derived_keys_lock = threading.Lock()
 
 class EncryptionManager:
     """
     Gestionnaire de chiffrement pour sécuriser les données sensibles
     """
     
-    def __init__(self, password: str = None):
+    def __init__(self, password: str = None, derived_key_file: str = None):
         """
         Initialise le gestionnaire de chiffrement
         
         Args:
             password (str): Mot de passe pour générer la clé de chiffrement
+            derived_key_file (str): Fichier local optionnel conservant la clé dérivée (droits 0o600),
+                                    pour que les nouveaux processus évitent la dérivation
+                                    (par défaut : variable ENCRYPTION_DERIVED_KEY_FILE, sinon aucun)
         """
         self.key_file = Path(".encryption_key")
         self.password = password or os.getenv('ENCRYPTION_PASSWORD', 'default_secure_password_2024!')
-        self.fernet = self._get_or_create_key()
+        derived_key_file = derived_key_file or os.getenv('ENCRYPTION_DERIVED_KEY_FILE')
+        self.derived_key_file = Path(derived_key_file) if derived_key_file else None
+        self._key = self._get_or_create_key()
+        self.fernet = Fernet(self._key)
     
     def _generate_key_from_password(self, password: str, salt: bytes = None) -> bytes:
         """Génère une clé de chiffrement à partir d'un mot de passe"""
@@ -31,31 +51,88 @@ class EncryptionManager:
             algorithm=hashes.SHA256(),
             length=32,
             salt=salt,
-            iterations=100000,
+            iterations=KDF_ITERATIONS,
         )
         key = base64.urlsafe_b64encode(kdf.derive(password.encode()))
         return key, salt
     
-    def _get_or_create_key(self) -> Fernet:
-        """Récupère ou crée une clé de chiffrement"""
+    def _password_fingerprint(self, salt: bytes) -> str:
+        """Empreinte salée du mot de passe : identifie la clé dérivée sans conserver le mot de passe"""
+        return hashlib.sha256(salt + self.password.encode()).hexdigest()
+    
+    def _read_derived_key_file(self, salt: bytes, fingerprint: str):
+        """Retourne la clé du fichier de clé dérivée si elle correspond au sel et au mot de passe, sinon None"""
+        if self.derived_key_file is None or not self.derived_key_file.exists():
+            return None
+        try:
+            if os.name == 'posix' and self.derived_key_file.stat().st_mode & 0o077:
+                print(f"Fichier de clé dérivée ignoré (accessible à d'autres utilisateurs): {self.derived_key_file}")
+                return None
+            with open(self.derived_key_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('salt') != base64.b64encode(salt).decode() or data.get('password_sha256') != fingerprint:
+                return None
+            return data['key'].encode()
+        except (OSError, ValueError, KeyError, AttributeError) as e:
+            print(f"Fichier de clé dérivée illisible: {e}")
+            return None
+    
+    def _write_derived_key_file(self, salt: bytes, fingerprint: str, key: bytes):
+        """Enregistre la clé dérivée, lisible par le seul propriétaire du fichier"""
+        if self.derived_key_file is None:
+            return
+        data = {'salt': base64.b64encode(salt).decode(), 'password_sha256': fingerprint, 'key': key.decode()}
         try:
-            if self.key_file.exists():
-                # Charger la clé existante
-                with open(self.key_file, 'rb') as f:
-                    data = f.read()
-                    salt = data[:16]
+            atomic_write_bytes(str(self.derived_key_file), json.dumps(data).encode(), mode=0o600)
+        except OSError as e:
+            print(f"Erreur lors de l'écriture du fichier de clé dérivée: {e}")
+    
+    def _derive_key(self, salt: bytes) -> bytes:
+        """
+        Clé Fernet du mot de passe pour un sel donné.
+        
+        Cherchée dans le cache du processus, puis dans le fichier de clé dérivée;
+        la dérivation PBKDF2 n'est calculée qu'en dernier recours.
+        """
+        fingerprint = self._password_fingerprint(salt)
+        # Verrou conservé pendant la dérivation : des sessions simultanées ne la calculent qu'une fois
+        with _derived_keys_lock:
+            key = _derived_keys.get((salt, fingerprint))
+            if key is None:
+                key = self._read_derived_key_file(salt, fingerprint)
+                if key is None:
                     key, _ = self._generate_key_from_password(self.password, salt)
-                    return Fernet(key)
-            else:
-                # Créer une nouvelle clé
-                key, salt = self._generate_key_from_password(self.password)
-                with open(self.key_file, 'wb') as f:
-                    f.write(salt)
-                return Fernet(key)
+                    self._write_derived_key_file(salt, fingerprint, key)
+                _derived_keys[(salt, fingerprint)] = key
+        return key
+    
+    def _get_or_create_key(self) -> bytes:
+        """Récupère ou crée la clé de chiffrement (clé Fernet encodée en base64)"""
+        try:
+            # Verrou : deux sessions démarrant ensemble ne doivent pas créer chacune leur sel
+            with file_lock(str(self.key_file)):
+                if self.key_file.exists():
+                    # Charger la clé existante
+                    with open(self.key_file, 'rb') as f:
+                        salt = f.read()[:16]
+                else:
+                    # Créer une nouvelle clé
+                    salt = os.urandom(16)
+                    atomic_write_bytes(str(self.key_file), salt)
+                return self._derive_key(salt)
         except Exception as e:
             print(f"Erreur lors de la gestion de la clé de chiffrement: {e}")
             # Fallback: générer une clé temporaire
-            return Fernet(Fernet.generate_key())
+            return Fernet.generate_key()
+    
+    def _blob_key(self) -> bytes:
+        """Clé maîtresse (32 octets) des fichiers chiffrés par blocs"""
+        return base64.urlsafe_b64decode(self._key)
+    
+    @staticmethod
+    def blob_path(file_path: str, field: str) -> str:
+        """Chemin du fichier chiffré d'un champ d'un fichier JSON (à côté de celui-ci)"""
+        return f"{file_path}.{field}.enc"
     
     def encrypt_data(self, data: str) -> str:
         """
@@ -92,13 +169,23 @@ class EncryptionManager:
             print(f"Erreur lors du déchiffrement: {e}")
             return encrypted_data  # Retourner les données telles quelles en cas d'erreur
     
-    def encrypt_json_file(self, file_path: str, sensitive_fields: list = None) -> bool:
+    def encrypt_json_file(self, file_path: str, sensitive_fields: list = None, chunked: bool = True,
+                          chunk_size: int = DEFAULT_CHUNK_SIZE) -> bool:
         """
         Chiffre les champs sensibles d'un fichier JSON
         
+        Par défaut, chaque champ est chiffré par blocs (AES-256-GCM) dans un fichier
+        binaire voisin `<fichier>.<champ>.enc` (voir backend/chunked_encryption.py) :
+        ni base64 ni copie complète supplémentaire du contenu, et les premiers blocs
+        d'un texte peuvent être déchiffrés seuls (voir read_encrypted_field). Le JSON
+        ne conserve que la description de ces fichiers.
+        
         Args:
             file_path (str): Chemin vers le fichier JSON
             sensitive_fields (list): Liste des champs à chiffrer
+            chunked (bool): Chiffrement par blocs dans des fichiers voisins; sinon ancien
+                            format (jeton Fernet en base64 dans le JSON)
+            chunk_size (int): Taille des blocs en clair
             
         Returns:
             bool: True si le chiffrement a réussi
@@ -107,24 +194,34 @@ class EncryptionManager:
             sensitive_fields = ['full_content', 'content_preview', 'emails', 'urls']
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Chiffrer les champs sensibles
-            for field in sensitive_fields:
-                if field in data:
-                    if isinstance(data[field], str):
-                        data[field] = self.encrypt_data(data[field])
-                    elif isinstance(data[field], list):
-                        data[field] = [self.encrypt_data(str(item)) for item in data[field]]
-            
-            # Marquer le fichier comme chiffré
-            data['_encrypted'] = True
-            data['_encrypted_fields'] = sensitive_fields
-            
-            # Sauvegarder le fichier chiffré
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            # Lecture-modification-écriture sous verrou : un fichier n'est jamais chiffré deux fois
+            with file_lock(file_path):
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                
+                if data.get('_encrypted', False):
+                    return True
+                
+                if chunked:
+                    # Fichiers des champs écrits avant le JSON : un arrêt entre les deux laisse le JSON en clair
+                    data['_encrypted_blobs'] = self._encrypt_fields_to_blobs(file_path, data, sensitive_fields,
+                                                                             chunk_size)
+                    sensitive_fields = list(data['_encrypted_blobs'])
+                else:
+                    # Chiffrer les champs sensibles (ancien format)
+                    for field in sensitive_fields:
+                        if field in data:
+                            if isinstance(data[field], str):
+                                data[field] = self.encrypt_data(data[field])
+                            elif isinstance(data[field], list):
+                                data[field] = [self.encrypt_data(str(item)) for item in data[field]]
+                
+                # Marquer le fichier comme chiffré
+                data['_encrypted'] = True
+                data['_encrypted_fields'] = sensitive_fields
+                
+                # Sauvegarder le fichier chiffré (écriture atomique)
+                atomic_write_json(file_path, data, indent=2)
             
             return True
             
@@ -132,6 +229,69 @@ class EncryptionManager:
             print(f"Erreur lors du chiffrement du fichier {file_path}: {e}")
             return False
     
+    def _encrypt_fields_to_blobs(self, file_path: str, data: dict, sensitive_fields: list, chunk_size: int) -> dict:
+        """Chiffre les champs texte ou liste dans leurs fichiers voisins et les retire du JSON"""
+        blobs = {}
+        for field in sensitive_fields:
+            value = data.get(field)
+            if isinstance(value, str):
+                payload, value_type = value.encode('utf-8'), 'text'
+            elif isinstance(value, list):
+                payload, value_type = json.dumps(value, ensure_ascii=False).encode('utf-8'), 'json'
+            else:
+                continue
+            blob_path = self.blob_path(file_path, field)
+            stats = write_encrypted_blob(blob_path, (payload,), self._blob_key(), chunk_size)
+            blobs[field] = {'file': os.path.basename(blob_path), 'type': value_type, **stats}
+            data[field] = None
+        return blobs
+    
+    def _read_blob(self, file_path: str, blob: dict, start_chunk: int = 0, max_chunks: int = None):
+        """Déchiffre tout ou partie du fichier d'un champ (texte, ou valeur JSON complète)"""
+        blob_path = os.path.join(os.path.dirname(file_path), blob['file'])
+        with EncryptedBlob(blob_path, self._blob_key()) as encrypted_blob:
+            if blob['type'] == 'json':
+                return json.loads(b''.join(encrypted_blob).decode('utf-8'))
+            
+            end_chunk = encrypted_blob.chunk_count if max_chunks is None else \
+                min(encrypted_blob.chunk_count, start_chunk + max_chunks)
+            partial = start_chunk > 0 or end_chunk < encrypted_blob.chunk_count
+            # Un bloc peut couper un caractère : les fragments en bord d'extrait sont ignorés
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore' if partial else 'strict')
+            parts = [decoder.decode(encrypted_blob.read_chunk(index)) for index in range(start_chunk, end_chunk)]
+            parts.append(decoder.decode(b'', final=not partial))
+            return ''.join(parts)
+    
+    def read_encrypted_field(self, file_path: str, field: str, start_chunk: int = 0, max_chunks: int = None) -> str:
+        """
+        Déchiffre un champ texte d'un fichier JSON chiffré par blocs, sans déchiffrer le reste
+        
+        Seuls les blocs demandés sont lus : `max_chunks=1` suffit pour un aperçu du
+        début d'un long contenu.
+        
+        Args:
+            file_path (str): Chemin vers le fichier JSON
+            field (str): Champ à déchiffrer (ex. 'full_content')
+            start_chunk (int): Premier bloc déchiffré
+            max_chunks (int): Nombre maximal de blocs déchiffrés (None = jusqu'à la fin)
+            
+        Returns:
+            str: Texte déchiffré (valeur en clair si le champ n'est pas chiffré par blocs, "" en cas d'erreur)
+        """
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            
+            blob = data.get('_encrypted_blobs', {}).get(field)
+            if blob is None:
+                value = data.get(field)
+                return value if isinstance(value, str) else ""
+            return self._read_blob(file_path, blob, start_chunk, max_chunks)
+            
+        except Exception as e:
+            print(f"Erreur lors du déchiffrement du champ {field} de {file_path}: {e}")
+            return ""
+    
     def decrypt_json_file(self, file_path: str) -> dict:
         """
         Déchiffre un fichier JSON et retourne les données déchiffrées
@@ -152,18 +312,24 @@ class EncryptionManager:
             
             encrypted_fields = data.get('_encrypted_fields', [])
             
-            # Déchiffrer les champs
-            for field in encrypted_fields:
-                if field in data:
-                    if isinstance(data[field], str):
-                        data[field] = self.decrypt_data(data[field])
-                    elif isinstance(data[field], list):
-                        data[field] = [self.decrypt_data(item) for item in data[field]]
+            if '_encrypted_blobs' in data:
+                # Champs chiffrés par blocs dans des fichiers voisins
+                for field, blob in data['_encrypted_blobs'].items():
+                    data[field] = self._read_blob(file_path, blob)
+            else:
+                # Déchiffrer les champs (ancien format)
+                for field in encrypted_fields:
+                    if field in data:
+                        if isinstance(data[field], str):
+                            data[field] = self.decrypt_data(data[field])
+                        elif isinstance(data[field], list):
+                            data[field] = [self.decrypt_data(item) for item in data[field]]
             
             # Nettoyer les métadonnées de chiffrement pour l'utilisation
             decrypted_data = data.copy()
             decrypted_data.pop('_encrypted', None)
             decrypted_data.pop('_encrypted_fields', None)
+            decrypted_data.pop('_encrypted_blobs', None)
             
             return decrypted_data
             
@@ -0,0 +1,152 @@
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+from backend.atomic_io import atomic_write_json
+
+
+def compute_file_hash(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Calcule le SHA-256 d'un fichier par blocs (sans le charger entièrement en mémoire)."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """
+    Cache disque des extractions PDF, adressé par le contenu du fichier.
+
+    Chaque entrée est un JSON rangé sous `<cache_dir>/<2 premiers caractères>/`
+    et nommé d'après le SHA-256 du PDF et la version de l'extracteur : un même
+    fichier ré-uploadé sous un autre nom retrouve son extraction, et un
+    changement d'extracteur invalide naturellement les anciennes entrées. Au-delà
+    de `max_size_bytes`, les entrées les moins récemment lues sont supprimées.
+    """
+
+    def __init__(self, cache_dir: str = "data/cache/extractions", max_size_bytes: int = 500 * 1024 * 1024):
+        """
+        Args:
+            cache_dir (str): Dossier racine du cache
+            max_size_bytes (int): Taille maximale cumulée des entrées
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_size_bytes = max_size_bytes
+
+    def _entry_path(self, content_hash: str, extractor_version: str) -> Path:
+        return self.cache_dir / content_hash[:2] / f"{content_hash}.v{extractor_version}.json"
+
+    def get(self, content_hash: str, extractor_version: str) -> Optional[Dict]:
+        """Retourne l'extraction en cache, ou None si absente ou illisible."""
+        entry_path = self._entry_path(content_hash, extractor_version)
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        # La date de modification sert d'horodatage LRU
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return data
+
+    def set(self, content_hash: str, extractor_version: str, data: Dict):
+        """Enregistre une extraction puis applique la limite de taille."""
+        entry_path = self._entry_path(content_hash, extractor_version)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            # Sans fsync : une entrée perdue lors d'un arrêt brutal est simplement recalculée
+            atomic_write_json(str(entry_path), data, fsync=False, separators=(',', ':'))
+        except Exception as e:
+            print(f"Erreur lors de l'écriture du cache d'extraction: {str(e)}")
+            return
+        self._evict()
+
+    def _entries(self):
+        if not self.cache_dir.exists():
+            return []
+        return [path for path in self.cache_dir.glob("*/*.json") if path.is_file()]
+
+    def _evict(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de la taille maximale."""
+        entries = []
+        total_size = 0
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_size += stat.st_size
+
+        if total_size <= self.max_size_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            try:
+                path.unlink()
+                total_size -= size
+            except OSError:
+                pass
+
+    def invalidate(self, content_hash: str = None) -> int:
+        """
+        Supprime les entrées d'un fichier (toutes versions confondues), ou tout le cache.
+
+        Returns:
+            int: Nombre d'entrées supprimées
+        """
+        if content_hash:
+            paths = list((self.cache_dir / content_hash[:2]).glob(f"{content_hash}.v*.json"))
+        else:
+            paths = self._entries()
+
+        removed = 0
+        for path in paths:
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def get_stats(self) -> Dict:
+        """Retourne le nombre d'entrées et l'occupation du cache."""
+        entries = self._entries()
+        return {
+            'entries': len(entries),
+            'size_bytes': sum(path.stat().st_size for path in entries),
+            'max_size_bytes': self.max_size_bytes
+        }
+
+
+def main():
+    """Commande d'administration du cache d'extraction."""
+    parser = argparse.ArgumentParser(description="Gestion du cache des extractions PDF")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--stats', action='store_true', help="Affiche l'occupation du cache")
+    group.add_argument('--clear', action='store_true', help="Vide entièrement le cache")
+    group.add_argument('--invalidate', metavar='PDF', help="Invalide les extractions d'un fichier PDF")
+    parser.add_argument('--cache-dir', default="data/cache/extractions", help="Dossier du cache")
+    args = parser.parse_args()
+
+    cache = ExtractionCache(args.cache_dir)
+    if args.stats:
+        stats = cache.get_stats()
+        print(f"{stats['entries']} extraction(s), {stats['size_bytes']:,} octets")
+    elif args.clear:
+        print(f"{cache.invalidate()} extraction(s) supprimée(s)")
+    else:
+        print(f"{cache.invalidate(compute_file_hash(args.invalidate))} extraction(s) supprimée(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+
+# États d'une tâche d'audit
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueue:
+    """
+    File persistante des audits à exécuter, partagée par l'application et les workers.
+
+    Les tâches sont stockées dans SQLite (mode WAL) : l'application y dépose un
+    audit (`enqueue`) puis interroge son état (`get`), tandis que des processus
+    workers réservent les tâches une à une (`claim`) et publient leur avancement.
+    Une tâche survit ainsi à la fermeture de la page; celle d'un worker arrêté
+    en cours de route est remise en file (`requeue_stale`) lorsque son signal de
+    vie n'est plus rafraîchi.
+    """
+
+    def __init__(self, db_path: str = "data/jobs.sqlite", stale_after: float = 120, max_attempts: int = 3):
+        """
+        Args:
+            db_path (str): Chemin de la base SQLite de la file
+            stale_after (float): Délai (secondes) sans signal de vie au-delà duquel une tâche ou un worker est abandonné
+            max_attempts (int): Nombre maximal d'exécutions d'une tâche (reprises comprises)
+        """
+        self.db_path = db_path
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        # Transactions explicites : la réservation d'une tâche doit être atomique entre processus
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                audit_type TEXT NOT NULL,
+                params TEXT NOT NULL,
+                status TEXT NOT NULL,
+                progress REAL NOT NULL DEFAULT 0,
+                message TEXT NOT NULL DEFAULT '',
+                report_path TEXT,
+                error TEXT,
+                worker_id TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                heartbeat_at REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS workers (
+                id TEXT PRIMARY KEY,
+                pid INTEGER NOT NULL,
+                host TEXT NOT NULL,
+                started_at REAL NOT NULL,
+                heartbeat_at REAL NOT NULL
+            )
+        """)
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict:
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        return job
+
+    def enqueue(self, audit_type: str, params: Dict) -> str:
+        """
+        Ajoute un audit à la file.
+
+        Args:
+            audit_type (str): "standard" ou "chapter_by_chapter"
+            params (Dict): Paramètres de l'audit (module_path, filename, support_path, support_filename, force_refresh, subject)
+
+        Returns:
+            str: Identifiant de la tâche
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, audit_type, params, status, message, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, audit_type, json.dumps(params, ensure_ascii=False), QUEUED, "En attente d'un worker...",
+                 time.time())
+            )
+        return job_id
+
+    def claim(self, worker_id: str) -> Optional[Dict]:
+        """Réserve la plus ancienne tâche en attente pour `worker_id` (None si la file est vide)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, worker_id = ?, attempts = attempts + 1, started_at = ?, "
+                        "heartbeat_at = ?, message = ? WHERE id = ?",
+                        (RUNNING, worker_id, now, now, "Audit démarré", row['id'])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row['id']) if row is not None else None
+
+    def update_progress(self, job_id: str, progress: float, message: str = ""):
+        """Publie l'avancement (0 à 1) d'une tâche en cours; vaut aussi signal de vie."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET progress = ?, message = ?, heartbeat_at = ? WHERE id = ? AND status = ?",
+                (progress, message, time.time(), job_id, RUNNING)
+            )
+
+    def touch(self, job_id: str):
+        """Rafraîchit le signal de vie d'une tâche en cours sans changer son avancement."""
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = ?",
+                               (time.time(), job_id, RUNNING))
+
+    def complete(self, job_id: str, report_path: str):
+        """Marque une tâche comme terminée avec le chemin de son rapport."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, progress = 1, message = ?, report_path = ?, finished_at = ?, "
+                "heartbeat_at = ? WHERE id = ?",
+                (DONE, "Audit terminé", report_path, now, now, job_id)
+            )
+
+    def fail(self, job_id: str, error: str):
+        """Marque une tâche comme échouée."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, message = ?, error = ?, finished_at = ?, heartbeat_at = ? WHERE id = ?",
+                (FAILED, "Échec de l'audit", error, now, now, job_id)
+            )
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Retourne une tâche (paramètres décodés), ou None si elle n'existe pas."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row is not None else None
+
+    def list_jobs(self, limit: int = 20, statuses: List[str] = None) -> List[Dict]:
+        """Retourne les tâches les plus récentes, éventuellement filtrées par état."""
+        query = "SELECT * FROM jobs"
+        args = []
+        if statuses:
+            query += f" WHERE status IN ({', '.join('?' for _ in statuses)})"
+            args.extend(statuses)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, args).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def queue_position(self, job_id: str) -> int:
+        """Nombre de tâches en attente devant `job_id` (0 si elle est la prochaine ou n'est plus en attente)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at < "
+                "(SELECT created_at FROM jobs WHERE id = ? AND status = ?)",
+                (QUEUED, job_id, QUEUED)
+            ).fetchone()
+        return row[0]
+
+    def requeue_stale(self) -> int:
+        """
+        Remet en file les tâches en cours dont le worker ne donne plus signe de vie.
+
+        Une tâche ayant déjà atteint `max_attempts` exécutions est marquée en échec.
+
+        Returns:
+            int: Nombre de tâches reprises ou abandonnées
+        """
+        now = time.time()
+        limit = now - self.stale_after
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                failed = self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, message = ?, finished_at = ? "
+                    "WHERE status = ? AND heartbeat_at < ? AND attempts >= ?",
+                    (FAILED, "Worker interrompu à plusieurs reprises", "Échec de l'audit", now,
+                     RUNNING, limit, self.max_attempts)
+                ).rowcount
+                requeued = self._conn.execute(
+                    "UPDATE jobs SET status = ?, worker_id = NULL, message = ? "
+                    "WHERE status = ? AND heartbeat_at < ?",
+                    (QUEUED, "Reprise après l'arrêt d'un worker...", RUNNING, limit)
+                ).rowcount
+                self._conn.execute("DELETE FROM workers WHERE heartbeat_at < ?", (limit,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return failed + requeued
+
+    def register_worker(self, worker_id: str):
+        """Enregistre (ou rafraîchit) le signal de vie d'un worker."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO workers (id, pid, host, started_at, heartbeat_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at",
+                (worker_id, os.getpid(), socket.gethostname(), now, now)
+            )
+
+    def unregister_worker(self, worker_id: str):
+        """Retire un worker arrêté proprement."""
+        with self._lock:
+            self._conn.execute("DELETE FROM workers WHERE id = ?", (worker_id,))
+
+    def active_workers(self) -> int:
+        """Nombre de workers ayant donné signe de vie récemment."""
+        with self._lock:
+            row = self._conn.execute("SELECT COUNT(*) FROM workers WHERE heartbeat_at >= ?",
+                                     (time.time() - self.stale_after,)).fetchone()
+        return row[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_audit_engine(groq_api_key: str = None, **overrides):
+    """
+    Crée le moteur d'audit configuré par les variables d'environnement (AUDIT_*),
+    tel qu'utilisé par l'application et par les workers.
+
+    Args:
+        groq_api_key (str): Clé API (GROQ_API_KEY par défaut)
+        **overrides: Options du moteur prioritaires sur l'environnement (ex. max_concurrent_requests)
+    """
+    # Import différé : la file elle-même ne dépend pas du moteur (ni du SDK OpenAI)
+    from backend.async_audit_engine import AsyncPedagogicalAuditEngine
+    from backend.audit_engine import PedagogicalAuditEngine
+
+    # AUDIT_ASYNC=1 : requêtes IA menées par une boucle asyncio plutôt que par un pool de threads
+    use_async_engine = os.getenv('AUDIT_ASYNC', '0') == '1'
+    engine_class = AsyncPedagogicalAuditEngine if use_async_engine else PedagogicalAuditEngine
+    options = {
+        'max_concurrent_requests': int(os.getenv('AUDIT_MAX_CONCURRENCY', '16' if use_async_engine else '4')),
+        'chapter_detection': os.getenv('AUDIT_CHAPTER_DETECTION', 'auto'),
+        'evaluation_mode': os.getenv('AUDIT_EVALUATION_MODE', 'excerpt'),
+        'token_budget': int(os.getenv('AUDIT_TOKEN_BUDGET', '250000')),
+        'criteria_batch_size': int(os.getenv('AUDIT_CRITERIA_BATCH_SIZE', '0')),
+        'preview_image_format': os.getenv('PREVIEW_IMAGE_FORMAT') or None,
+        'preview_quality': int(os.getenv('PREVIEW_QUALITY', '80'))
+    }
+    options.update({key: value for key, value in overrides.items() if value is not None})
+    return engine_class(groq_api_key or os.getenv('GROQ_API_KEY'), **options)
+
+
+class AuditWorker:
+    """
+    Worker exécutant les audits de la file, un à la fois.
+
+    Le worker publie l'avancement réel de l'audit (événements de progression du
+    moteur) et rafraîchit son signal de vie depuis un thread dédié, y compris
+    pendant les appels IA les plus longs.
+    """
+
+    def __init__(self, queue: JobQueue, engine=None, poll_interval: float = 1.0, heartbeat_interval: float = 10.0):
+        """
+        Args:
+            queue (JobQueue): File des audits
+            engine: Moteur d'audit (créé depuis l'environnement si absent)
+            poll_interval (float): Délai entre deux consultations de la file vide
+            heartbeat_interval (float): Période du signal de vie
+        """
+        self.queue = queue
+        self.engine = engine or create_audit_engine()
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._current_job_id = None
+        self._stop = threading.Event()
+
+    def run(self, exit_when_idle: bool = False):
+        """
+        Traite les tâches jusqu'à l'arrêt du worker.
+
+        Args:
+            exit_when_idle (bool): S'arrête dès que la file est vide
+        """
+        self.queue.register_worker(self.worker_id)
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="audit-worker-heartbeat", daemon=True)
+        heartbeat.start()
+        print(f"Worker {self.worker_id} démarré")
+
+        try:
+            while not self._stop.is_set():
+                self.queue.requeue_stale()
+                job = self.queue.claim(self.worker_id)
+                if job is None:
+                    if exit_when_idle:
+                        break
+                    self._stop.wait(self.poll_interval)
+                    continue
+                self.run_job(job)
+        finally:
+            self._stop.set()
+            self.queue.unregister_worker(self.worker_id)
+            print(f"Worker {self.worker_id} arrêté")
+
+    def stop(self):
+        self._stop.set()
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            self.queue.register_worker(self.worker_id)
+            if self._current_job_id:
+                self.queue.touch(self._current_job_id)
+
+    def run_job(self, job: Dict):
+        """Exécute un audit, sauvegarde son rapport et publie le résultat dans la file."""
+        params = job['params']
+        self._current_job_id = job['id']
+        print(f"Audit {job['id']} ({job['audit_type']}) : {params['filename']}")
+
+        def on_progress(event: Dict):
+            self.queue.update_progress(job['id'], event['progress'], event['message'])
+
+        try:
+            force_refresh = params.get('force_refresh', False)
+            subject = params.get('subject')
+            if job['audit_type'] == "chapter_by_chapter":
+                audit_report = self.engine.audit_pdf_chapter_by_chapter(
+                    params['module_path'], params['filename'],
+                    force_refresh=force_refresh, progress_callback=on_progress,
+                    subject=subject
+                )
+            elif params.get('support_path'):
+                audit_report = self.engine.audit_pdf_with_support(
+                    params['module_path'], params['support_path'], params['filename'],
+                    force_refresh=force_refresh, progress_callback=on_progress,
+                    subject=subject, support_filename=params.get('support_filename')
+                )
+            else:
+                audit_report = self.engine.audit_pdf(
+                    params['module_path'], params['filename'],
+                    force_refresh=force_refresh, progress_callback=on_progress,
+                    subject=subject
+                )
+
+            if 'error' in audit_report:
+                self.queue.fail(job['id'], audit_report['error'])
+            else:
+                self.queue.complete(job['id'], self.engine.save_audit_report(audit_report))
+        except Exception as e:
+            print(f"Erreur lors de l'audit {job['id']}: {str(e)}")
+            self.queue.fail(job['id'], str(e))
+        finally:
+            self._current_job_id = None
+
+
+def run_worker(db_path: str = "data/jobs.sqlite", exit_when_idle: bool = False):
+    """Point d'entrée d'un processus worker."""
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    queue = JobQueue(db_path)
+    try:
+        AuditWorker(queue).run(exit_when_idle=exit_when_idle)
+    finally:
+        queue.close()
+
+
+def start_worker_process(workers: int = 1, db_path: str = "data/jobs.sqlite") -> subprocess.Popen:
+    """Lance en arrière-plan `workers` workers (détachés de l'application)."""
+    return subprocess.Popen(
+        [sys.executable, "-m", "backend.job_queue", "--workers", str(workers), "--db", db_path],
+        start_new_session=True
+    )
+
+
+def main():
+    """Lance un ou plusieurs workers d'audit."""
+    parser = argparse.ArgumentParser(description="Workers d'exécution des audits en file d'attente")
+    parser.add_argument('--workers', type=int, default=1, help="Nombre de processus workers")
+    parser.add_argument('--db', default="data/jobs.sqlite", help="Base SQLite de la file")
+    parser.add_argument('--exit-when-idle', action='store_true', help="S'arrête lorsque la file est vide")
+    args = parser.parse_args()
+
+    if args.workers <= 1:
+        run_worker(args.db, args.exit_when_idle)
+        return
+
+    processes = [multiprocessing.Process(target=run_worker, args=(args.db, args.exit_when_idle))
+                 for _ in range(args.workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
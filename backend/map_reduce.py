@@ -0,0 +1,258 @@
+import threading
+from collections import defaultdict
+from typing import Dict, List
+
+from backend.rate_limiter import estimate_tokens
+
+
+# Nombre maximal d'éléments conservés par liste fusionnée (preuves, forces, ...)
+MAX_MERGED_ITEMS = 6
+CRITERION_LIST_FIELDS = ('preuves', 'forces', 'faiblesses', 'recommandations')
+CHAPTER_SECTIONS = ('objectifs', 'competences', 'contenu', 'references', 'volume')
+
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """
+    Découpe un texte en extraits d'au plus `max_tokens` tokens estimés.
+
+    Les coupures se font entre les lignes; une ligne trop longue est coupée au
+    dernier espace possible.
+    """
+    max_chars = max(1, max_tokens * 3)  # Inverse de estimate_tokens
+    chunks = []
+    current = []
+    current_size = 0
+
+    for line in text.split('\n'):
+        while len(line) > max_chars:
+            cut = line.rfind(' ', 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            if current:
+                chunks.append('\n'.join(current))
+                current, current_size = [], 0
+            chunks.append(line[:cut])
+            line = line[cut:].lstrip()
+
+        if current and current_size + len(line) + 1 > max_chars:
+            chunks.append('\n'.join(current))
+            current, current_size = [], 0
+        current.append(line)
+        current_size += len(line) + 1
+
+    if current:
+        chunks.append('\n'.join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def allocate_chunks(chunk_counts: List[int], max_total: int) -> List[int]:
+    """
+    Répartit un nombre maximal d'extraits entre plusieurs textes.
+
+    Chaque texte conserve au moins un extrait; au-delà, la répartition est
+    proportionnelle au nombre d'extraits de chaque texte. Si le maximum ne permet
+    pas un extrait par texte, seuls des textes régulièrement répartis en reçoivent un.
+    """
+    total = sum(chunk_counts)
+    if total <= max_total:
+        return list(chunk_counts)
+    non_empty = [index for index, count in enumerate(chunk_counts) if count]
+    if max_total < len(non_empty):
+        allocated = [0] * len(chunk_counts)
+        for position in spread_indices(len(non_empty), max_total):
+            allocated[non_empty[position]] = 1
+        return allocated
+    return [min(count, max(1, count * max_total // total)) for count in chunk_counts]
+
+
+def spread_indices(count: int, max_items: int) -> List[int]:
+    """Au plus `max_items` positions parmi `count`, régulièrement réparties (premier et dernier compris)."""
+    if max_items >= count:
+        return list(range(count))
+    if max_items <= 0:
+        return []
+    if max_items == 1:
+        return [0]
+    return sorted({round(i * (count - 1) / (max_items - 1)) for i in range(max_items)})
+
+
+def sample_chunks(chunks: List[str], max_chunks: int) -> List[Dict]:
+    """
+    Sélectionne au plus `max_chunks` extraits régulièrement répartis dans le texte.
+
+    Returns:
+        List[Dict]: Extraits retenus {'index' (à partir de 1), 'count', 'text'}
+    """
+    count = len(chunks)
+    return [{'index': i + 1, 'count': count, 'text': chunks[i]} for i in spread_indices(count, max_chunks)]
+
+
+class TokenBudget:
+    """
+    Budget de tokens d'entrée estimés d'un audit "map_reduce", partagé par toutes ses étapes.
+
+    Chaque étape réserve le coût des extraits retenus lors de sa planification
+    (`reserve`), dans la limite du budget restant divisé par le nombre d'étapes
+    encore à planifier : la part inutilisée d'une étape revient aux suivantes. Les
+    reprises (critères absents d'une réponse groupée) ne sont lancées que si le
+    budget restant les couvre (`try_spend`).
+    """
+
+    def __init__(self, total: int, stages: int = 1):
+        """
+        Args:
+            total (int): Plafond de tokens de l'audit (0 = sans plafond)
+            stages (int): Nombre d'étapes planifiées (ex. 2 : critères et chapitres)
+        """
+        self.total = max(0, int(total or 0))
+        self.stages = max(1, int(stages))
+        self.spent = 0
+        self._planned_stages = 0
+        self._lock = threading.Lock()
+
+    def allowance(self) -> float:
+        """Tokens que l'étape en cours de planification peut réserver (infini sans plafond)."""
+        if not self.total:
+            return float('inf')
+        with self._lock:
+            return max(0, (self.total - self.spent) / max(1, self.stages - self._planned_stages))
+
+    def reserve(self, tokens: float):
+        """Réserve le coût planifié d'une étape."""
+        with self._lock:
+            self.spent += tokens
+            self._planned_stages += 1
+
+    def try_spend(self, tokens: float) -> bool:
+        """Impute des tokens s'ils tiennent dans le budget restant."""
+        with self._lock:
+            if self.total and self.spent + tokens > self.total:
+                return False
+            self.spent += tokens
+            return True
+
+
+def merge_unique(item_lists: List[List], limit: int = MAX_MERGED_ITEMS) -> List:
+    """Fusionne des listes en supprimant les doublons (à la casse et aux espaces près)."""
+    merged = []
+    seen = set()
+    for items in item_lists:
+        for item in items or []:
+            key = " ".join(str(item).split()).casefold()
+            if key and key not in seen:
+                seen.add(key)
+                merged.append(item)
+                if len(merged) >= limit:
+                    return merged
+    return merged
+
+
+def _as_score(value) -> float:
+    """Convertit une note renvoyée par l'IA en nombre (0 si elle est inexploitable)."""
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _as_flag(value, default: bool = True) -> bool:
+    """Convertit un indicateur renvoyé par l'IA en booléen (« false », « non », 0 sont faux)."""
+    if isinstance(value, bool):
+        return value
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return value != 0
+    text = str(value).strip().lower()
+    if text in ('false', 'faux', 'non', 'no', '0', ''):
+        return False
+    if text in ('true', 'vrai', 'oui', 'yes', '1'):
+        return True
+    return default
+
+
+def _weighted_mean(values: List[float], weights: List[float]) -> float:
+    total_weight = sum(weights)
+    if not total_weight:
+        return 0
+    return round(sum(value * weight for value, weight in zip(values, weights)) / total_weight, 2)
+
+
+def reduce_criterion_results(results: List[Dict], parts: List[Dict], chunks_total: int, total_chars: int) -> Dict:
+    """
+    Fusionne les analyses d'un critère menées extrait par extrait.
+
+    La note est la moyenne des notes des extraits jugés pertinents pour le critère
+    (tous les extraits si aucun ne l'est), pondérée par leur taille. Les preuves,
+    forces, faiblesses et recommandations sont fusionnées sans doublons, en
+    commençant par les extraits les plus longs.
+
+    Args:
+        results (List[Dict]): Analyses normalisées des extraits
+        parts (List[Dict]): Extraits correspondants (voir sample_chunks)
+        chunks_total (int): Nombre total d'extraits du document
+        total_chars (int): Taille du texte analysé
+
+    Returns:
+        Dict: Analyse du critère, au format de _analyze_criterion, avec sa couverture
+    """
+    weights = [estimate_tokens(part['text']) for part in parts]
+    pertinent = [index for index, result in enumerate(results) if _as_flag(result.get('pertinent'))]
+    used = pertinent or list(range(len(results)))
+    used_by_weight = sorted(used, key=lambda index: weights[index], reverse=True)
+
+    comments = merge_unique([[results[index].get('commentaire', '')] for index in used_by_weight], limit=3)
+    reduced = {
+        'score': _weighted_mean([results[index]['score'] for index in used], [weights[index] for index in used]),
+        'commentaire': "\n".join(comments)
+    }
+    for field in CRITERION_LIST_FIELDS:
+        reduced[field] = merge_unique([results[index].get(field, []) for index in used_by_weight])
+
+    analysed_chars = sum(len(part['text']) for part in parts)
+    reduced['couverture'] = {
+        'extraits_analyses': len(parts),
+        'extraits_total': chunks_total,
+        'extraits_pertinents': len(pertinent),
+        'taux': round(min(100.0, analysed_chars / total_chars * 100), 1) if total_chars else 0
+    }
+    return reduced
+
+
+def reduce_chapter_results(results: List[Dict], parts: List[Dict]) -> Dict:
+    """
+    Fusionne les analyses de conformité d'un chapitre menées extrait par extrait.
+
+    Pour chaque critère, la note est la moyenne pondérée par la taille des extraits
+    et un indicateur (objectifs présents, références pertinentes, ...) est acquis
+    dès qu'un extrait le vérifie. La conformité retenue est celle qui représente le
+    plus de texte.
+    """
+    weights = [estimate_tokens(part['text']) for part in parts]
+    by_weight = sorted(range(len(results)), key=lambda index: weights[index], reverse=True)
+    reduced = {}
+
+    for section in CHAPTER_SECTIONS:
+        section_results = [(results[index].get(section), weights[index]) for index in by_weight]
+        section_results = [(data, weight) for data, weight in section_results if isinstance(data, dict)]
+        if not section_results:
+            continue
+        merged = {}
+        for data, _ in section_results:
+            for key, value in data.items():
+                if isinstance(value, bool):
+                    merged[key] = merged.get(key, False) or value
+        merged['score'] = _weighted_mean([_as_score(data.get('score')) for data, _ in section_results],
+                                         [weight for _, weight in section_results])
+        merged['commentaire'] = "\n".join(merge_unique([[data.get('commentaire', '')] for data, _ in section_results], limit=2))
+        reduced[section] = merged
+
+    reduced['score_global'] = _weighted_mean([_as_score(results[index].get('score_global')) for index in by_weight],
+                                             [weights[index] for index in by_weight])
+    conformity_weights = defaultdict(float)
+    for index in by_weight:
+        conformity_weights[results[index].get('conformite', 'non_conforme')] += weights[index]
+    reduced['conformite'] = max(conformity_weights, key=conformity_weights.get)
+    reduced['recommandations'] = merge_unique([results[index].get('recommandations', []) for index in by_weight])
+    reduced['couverture'] = {'extraits_analyses': len(parts), 'extraits_total': parts[0]['count'] if parts else 0}
+    return reduced
@@ -1,80 +1,334 @@
-import json
+import multiprocessing
 import os
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from pathlib import Path
 import fitz  # PyMuPDF - Plus sécurisé que PyPDF2
-import re
+from backend.atomic_io import atomic_write_json
+from backend.extraction_cache import ExtractionCache, compute_file_hash
+from backend.text_statistics import TextStatistics
+
+
+def _extract_page_range(pdf_path, start, end):
+    """
+    Extrait le texte des pages [start, end) d'un PDF (exécuté dans un processus du pool).
+    Chaque processus ouvre son propre document : les objets fitz ne sont pas partageables.
+    """
+    doc = fitz.open(pdf_path)
+    try:
+        return [doc.load_page(page_num).get_text() for page_num in range(start, end)]
+    finally:
+        doc.close()
+
+
+def process_pool_context():
+    """
+    Contexte multiprocessing des pools d'extraction.
+    
+    Les processus ne sont jamais créés par fork : le processus parent (Streamlit,
+    worker, audit par lot) exécute d'autres threads, dont un verrou détenu au
+    moment du fork resterait verrouillé à jamais dans l'enfant. forkserver (POSIX)
+    crée les processus depuis un serveur sans threads; spawn sinon.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+# Pool d'extraction unique du processus, partagé par toutes les extractions
+# simultanées (audits, sessions) : le nombre de processus reste borné
+_extraction_pool = None
+_extraction_pool_lock = threading.Lock()
+
+
+def get_extraction_pool():
+    """Retourne le pool d'extraction du processus (créé au premier PDF volumineux)."""
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is None:
+            workers = int(os.getenv('PDF_EXTRACTION_WORKERS', '0')) or os.cpu_count() or 1
+            _extraction_pool = ProcessPoolExecutor(max_workers=workers, mp_context=process_pool_context())
+        return _extraction_pool
+
+
+def _discard_extraction_pool(pool):
+    """Abandonne un pool devenu inutilisable (processus tué) : le suivant sera recréé."""
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is pool:
+            _extraction_pool = None
+    pool.shutdown(wait=False)
+
+
+def iter_text_pages(text, page_offsets=None):
+    """
+    Parcourt page par page le texte d'un document déjà extrait.
+    
+    Produit les mêmes enregistrements que PDFProcessor.iter_pages, à partir du
+    texte complet et des positions de pages (`page_offsets`) d'une extraction;
+    sans positions, le texte forme une seule page.
+    
+    Yields:
+        tuple: (page_number, text, start_offset, end_offset), positions dans `text`
+    """
+    if not page_offsets:
+        if text:
+            yield 1, text, 0, len(text)
+        return
+    ends = list(page_offsets[1:]) + [len(text)]
+    for page_number, (start_offset, end_offset) in enumerate(zip(page_offsets, ends), 1):
+        yield page_number, text[start_offset:end_offset], start_offset, end_offset
+
+
+# Rapport minimal entre la taille d'un titre et celle du corps de texte
+HEADING_SIZE_RATIO = 1.15
+# Longueur maximale d'un titre détecté par la police
+MAX_HEADING_LENGTH = 120
+
 
 class PDFProcessor:
-    def __init__(self):
+    # Version de l'extraction/analyse : à incrémenter quand leur résultat change,
+    # pour invalider les entrées du cache d'extraction
+    EXTRACTOR_VERSION = "4"
+    
+    def __init__(self, parallel_page_threshold=64, max_workers=None, use_extraction_cache=True):
+        """
+        Args:
+            parallel_page_threshold (int): Nombre de pages à partir duquel l'extraction est répartie sur plusieurs processus
+            max_workers (int): Nombre maximal de processus d'extraction utilisés pour un PDF
+                               (par défaut : nombre de CPU; le pool partagé est borné par
+                               PDF_EXTRACTION_WORKERS, par défaut le nombre de CPU)
+            use_extraction_cache (bool): Réutilise l'extraction d'un PDF au contenu identique
+        """
         self.data_dir = Path("data")
         self.data_dir.mkdir(exist_ok=True)
+        self.parallel_page_threshold = parallel_page_threshold
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.extraction_cache = ExtractionCache() if use_extraction_cache else None
         
     def extract_text_from_pdf(self, pdf_path):
         """
         Extrait le texte d'un fichier PDF en utilisant PyMuPDF (plus sécurisé)
         """
+        page_texts = self.extract_pages_from_pdf(pdf_path)
+        if page_texts is None:
+            return None
+        
+        # Assemblage unique dans l'ordre des pages
+        text = "".join(page_text + "\n" for page_text in page_texts)
+        return text.strip()
+    
+    def extract_pages_from_pdf(self, pdf_path):
+        """
+        Extrait le texte de chaque page d'un fichier PDF.
+        
+        Au-delà de `parallel_page_threshold` pages, les pages sont réparties sur un
+        pool de processus; le résultat est identique à l'extraction séquentielle.
+        
+        Returns:
+            list: Texte de chaque page, dans l'ordre (None en cas d'erreur)
+        """
         try:
-            # Ouverture du PDF avec PyMuPDF
-            doc = fitz.open(pdf_path)
-            text = ""
-            
-            # Extraction du texte de chaque page
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text += page.get_text() + "\n"
-            
-            doc.close()
-            return text.strip()
-            
+            return list(self._iter_page_texts(pdf_path))
         except Exception as e:
             print(f"Erreur lors de l'extraction du PDF {pdf_path}: {str(e)}")
             return None
+    
+    def iter_pages(self, pdf_path):
+        """
+        Parcourt un PDF page par page, sans construire le texte complet.
+        
+        Les pages sont produites au fil de l'extraction (par plages de pages quand
+        elle est répartie sur le pool de processus). Les positions désignent le
+        texte de la page dans la concaténation des pages, chacune suivie d'un saut
+        de ligne (texte d'extract_text_from_pdf avant suppression des espaces de
+        début et de fin).
+        
+        Yields:
+            tuple: (page_number, text, start_offset, end_offset), pages numérotées à partir de 1
+        
+        Raises:
+            Exception: Si le PDF ne peut pas être ouvert ou lu
+        """
+        offset = 0
+        for page_number, page_text in enumerate(self._iter_page_texts(pdf_path), 1):
+            yield page_number, page_text, offset, offset + len(page_text)
+            offset += len(page_text) + 1
+    
+    def _iter_page_texts(self, pdf_path):
+        """Texte de chaque page, dans l'ordre (en parallèle au-delà de `parallel_page_threshold` pages)."""
+        # Ouverture du PDF avec PyMuPDF
+        doc = fitz.open(pdf_path)
+        page_count = len(doc)
+        if page_count >= self.parallel_page_threshold and self.max_workers > 1:
+            doc.close()
+            yield from self._iter_pages_parallel(pdf_path, page_count)
+            return
+        
+        try:
+            for page_num in range(page_count):
+                yield doc.load_page(page_num).get_text()
+        finally:
+            doc.close()
+    
+    def _iter_pages_parallel(self, pdf_path, page_count):
+        """
+        Extrait le texte des pages en répartissant des plages contiguës sur le pool partagé.
+        
+        Les plages sont produites dans l'ordre dès qu'elles sont prêtes. Si le pool
+        ne peut pas être utilisé, les pages restantes sont extraites séquentiellement.
+        """
+        workers = min(self.max_workers, page_count)
+        # Plusieurs plages par processus pour équilibrer les pages de coût inégal
+        chunk_count = min(page_count, workers * 4)
+        bounds = [page_count * i // chunk_count for i in range(chunk_count + 1)]
+        ranges = list(zip(bounds[:-1], bounds[1:]))
+        
+        pool = None
+        next_page = 0
+        try:
+            pool = get_extraction_pool()
+            chunks = pool.map(_extract_page_range, [pdf_path] * len(ranges),
+                              [start for start, _ in ranges], [end for _, end in ranges])
+            for chunk in chunks:
+                for page_text in chunk:
+                    yield page_text
+                    next_page += 1
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool) and pool is not None:
+                _discard_extraction_pool(pool)
+            print(f"Extraction parallèle impossible ({str(e)}), extraction séquentielle...")
+            yield from _extract_page_range(pdf_path, next_page, page_count)
      
-    def analyze_pdf_content(self, text, filename):
+    def extract_outline(self, pdf_path):
+        """
+        Repère les titres de chapitres à partir de la structure du PDF.
+        
+        Le signet (table des matières intégrée) est utilisé s'il existe; sinon les
+        titres sont déduits des polices : lignes nettement plus grandes que le corps
+        de texte, ou à défaut entièrement en gras.
+        
+        Returns:
+            dict: {'source': 'toc' | 'fonts', 'headings': [{'title', 'page_number'}]}
+                  ou None si aucune structure exploitable n'est trouvée
+        """
+        try:
+            doc = fitz.open(pdf_path)
+        except Exception as e:
+            print(f"Erreur lors de l'ouverture du PDF {pdf_path}: {str(e)}")
+            return None
+        
+        try:
+            headings = self._outline_from_toc(doc)
+            if headings:
+                return {'source': 'toc', 'headings': headings}
+            headings = self._outline_from_fonts(doc)
+            if headings:
+                return {'source': 'fonts', 'headings': headings}
+            return None
+        except Exception as e:
+            print(f"Erreur lors de l'analyse de la structure du PDF {pdf_path}: {str(e)}")
+            return None
+        finally:
+            doc.close()
+    
+    def _outline_from_toc(self, doc):
+        """Titres du premier niveau du signet comportant au moins deux entrées."""
+        entries = [(level, " ".join(title.split()), page) for level, title, page in doc.get_toc(simple=True)
+                   if 1 <= page <= doc.page_count and title.strip()]
+        
+        for level in sorted({entry[0] for entry in entries}):
+            headings = [{'title': title, 'page_number': page}
+                        for entry_level, title, page in entries if entry_level == level]
+            if len(headings) >= 2:
+                return sorted(headings, key=lambda heading: heading['page_number'])
+        return []
+    
+    def _outline_from_fonts(self, doc):
+        """
+        Titres déduits de la taille et de la graisse des polices.
+        
+        Le niveau retenu est la plus grande taille de titre présente sur au moins
+        deux pages (le titre de couverture est ainsi écarté); à défaut, les lignes
+        entièrement en gras à la taille du corps, si elles restent rares.
+        """
+        size_chars = Counter()
+        lines = []
+        for page_index in range(doc.page_count):
+            page_dict = doc.load_page(page_index).get_text("dict", flags=fitz.TEXTFLAGS_TEXT)
+            for block in page_dict["blocks"]:
+                for line in block.get("lines", []):
+                    spans = [span for span in line["spans"] if span["text"].strip()]
+                    if not spans:
+                        continue
+                    for span in spans:
+                        size_chars[round(span["size"] * 2) / 2] += len(span["text"].strip())
+                    lines.append({
+                        'page_number': page_index + 1,
+                        'size': round(max(span["size"] for span in spans) * 2) / 2,
+                        'bold': all(span["flags"] & fitz.TEXT_FONT_BOLD for span in spans),
+                        'text': " ".join("".join(span["text"] for span in spans).split())
+                    })
+        
+        if not size_chars:
+            return []
+        body_size = size_chars.most_common(1)[0][0]
+        
+        def headings_for(is_heading):
+            headings = []
+            previous = None
+            for index, line in enumerate(lines):
+                if not is_heading(line):
+                    continue
+                # Titre sur plusieurs lignes consécutives
+                if previous is not None and previous == index - 1 and headings[-1]['page_number'] == line['page_number']:
+                    headings[-1]['title'] += " " + line['text']
+                else:
+                    headings.append({'title': line['text'], 'page_number': line['page_number']})
+                previous = index
+            return [heading for heading in headings
+                    if len(heading['title']) <= MAX_HEADING_LENGTH and any(c.isalpha() for c in heading['title'])]
+        
+        heading_sizes = sorted({line['size'] for line in lines if line['size'] >= body_size * HEADING_SIZE_RATIO},
+                               reverse=True)
+        for size in heading_sizes:
+            headings = headings_for(lambda line: line['size'] == size)
+            if len({heading['page_number'] for heading in headings}) >= 2:
+                return headings
+        
+        headings = headings_for(lambda line: line['bold'] and line['size'] == body_size)
+        if len({heading['page_number'] for heading in headings}) >= 2 and len(headings) <= doc.page_count:
+            return headings
+        return []
+    
+    def analyze_pdf_content(self, text, filename, page_texts=None):
         """
         Analyse le contenu du PDF et extrait des métadonnées
+        
+        Toutes les statistiques sont calculées en une seule passe (TextStatistics).
+        Si le texte de chaque page est fourni, il est parcouru à la place du texte
+        complet pour obtenir en plus le détail par page.
         """
         if not text:
             return None
-            
-        # Statistiques de base
-        word_count = len(text.split())
-        char_count = len(text)
-        line_count = len(text.split('\n'))
-        
-        # Extraction de mots-clés (mots de plus de 4 caractères, fréquents)
-        words = re.findall(r'\b\w{4,}\b', text.lower())
-        word_freq = {}
-        for word in words:
-            word_freq[word] = word_freq.get(word, 0) + 1
-        
-        # Top 10 des mots les plus fréquents
-        top_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:10]
-        
-        # Recherche de patterns spécifiques
-        emails = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text)
-        urls = re.findall(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\(\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', text)
-        dates = re.findall(r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b', text)
-        
-        return {
+        
+        statistics = TextStatistics()
+        for page_number, page_text in enumerate(page_texts if page_texts is not None else [text], 1):
+            statistics.add_page(page_text, page_number)
+        return self._analysis_from_statistics(statistics, text, filename)
+    
+    def _analysis_from_statistics(self, statistics, text, filename):
+        """Données d'analyse (format d'analyze_pdf_content) à partir des statistiques des pages."""
+        analysis_data = {
             'filename': filename,
-            'extraction_date': datetime.now().isoformat(),
-            'statistics': {
-                'word_count': word_count,
-                'character_count': char_count,
-                'line_count': line_count
-            },
-            'top_keywords': top_words,
-            'extracted_data': {
-                'emails': list(set(emails)),
-                'urls': list(set(urls)),
-                'dates': list(set(dates))
-            },
-            'content_preview': text[:500] + "..." if len(text) > 500 else text,
-            'full_content': text  # Ajout du contenu complet
+            'extraction_date': datetime.now().isoformat()
         }
-
+        analysis_data.update(statistics.result())
+        analysis_data['full_content'] = text  # Ajout du contenu complet
+        return analysis_data
+    
     def save_to_json(self, data, filename_prefix):
         """
         Sauvegarde les données extraites en format JSON
@@ -87,35 +341,81 @@ class PDFProcessor:
         json_path = self.data_dir / json_filename
         
         try:
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            atomic_write_json(str(json_path), data, indent=2)
             
             return str(json_path)
         except Exception as e:
             print(f"Erreur lors de la sauvegarde JSON: {str(e)}")
             return None
      
-    def process_pdf_file(self, pdf_path, file_type="document"):
+    def process_pdf_file(self, pdf_path, file_type="document", filename=None):
         """
         Traite un fichier PDF complet: extraction + analyse + sauvegarde JSON
+        
+        Si le même contenu (SHA-256 du fichier) a déjà été extrait par la même
+        version de l'extracteur, l'extraction en cache est retournée sans ouvrir
+        le PDF ni écrire de nouveau JSON.
+        
+        L'extraction comprend les positions des pages ('page_offsets') et la structure
+        du document ('outline', voir extract_outline) utilisées par le découpage en chapitres.
+        
+        `filename` est le nom du document affiché et enregistré (par défaut celui de
+        `pdf_path`, à préciser quand le PDF est lu depuis le stockage par contenu).
         """
-        filename = os.path.basename(pdf_path)
+        filename = filename or os.path.basename(pdf_path)
+        
+        # Recherche dans le cache d'extraction
+        content_hash = None
+        if self.extraction_cache is not None:
+            try:
+                content_hash = compute_file_hash(pdf_path)
+            except OSError as e:
+                print(f"Erreur lors du calcul de l'empreinte de {pdf_path}: {str(e)}")
+            
+            if content_hash:
+                cached_data = self.extraction_cache.get(content_hash, self.EXTRACTOR_VERSION)
+                if cached_data:
+                    cached_data.update({
+                        'filename': filename,
+                        'file_type': file_type,
+                        'original_path': pdf_path
+                    })
+                    return cached_data
         
-        # Extraction du texte
-        extracted_text = self.extract_text_from_pdf(pdf_path)
+        # Extraction et analyse au fil des pages : les statistiques (globales et par
+        # page) sont calculées pendant que les pages suivantes sont extraites
+        statistics = TextStatistics()
+        page_texts = []
+        page_starts = []
+        try:
+            for page_number, page_text, start_offset, _ in self.iter_pages(pdf_path):
+                statistics.add_page(page_text, page_number)
+                page_texts.append(page_text)
+                page_starts.append(start_offset)
+        except Exception as e:
+            print(f"Erreur lors de l'extraction du PDF {pdf_path}: {str(e)}")
+            return None
         
-        if not extracted_text:
+        if statistics.is_empty:
             return None
         
-        # Analyse du contenu
-        analysis_data = self.analyze_pdf_content(extracted_text, filename)
+        full_text = "".join(page_text + "\n" for page_text in page_texts)
+        extracted_text = full_text.strip()
+        analysis_data = self._analysis_from_statistics(statistics, extracted_text, filename)
         
-        if not analysis_data:
-            return None
+        # Position du début de chaque page dans le texte extrait (découpage par pages)
+        leading = len(full_text) - len(full_text.lstrip())
+        analysis_data['page_offsets'] = [min(max(start - leading, 0), len(extracted_text)) for start in page_starts]
+        
+        # Structure du PDF (signet ou titres repérés par leur police), calculée une seule
+        # fois par contenu : l'audit par chapitres la relit dans l'extraction en cache
+        analysis_data['outline'] = self.extract_outline(pdf_path)
         
         # Ajout du type de fichier
         analysis_data['file_type'] = file_type
         analysis_data['original_path'] = pdf_path
+        if content_hash:
+            analysis_data['content_hash'] = content_hash
         
         # Sauvegarde en JSON
         json_path = self.save_to_json(analysis_data, filename.replace('.pdf', ''))
@@ -123,4 +423,7 @@ class PDFProcessor:
         if json_path:
             analysis_data['json_path'] = json_path
         
+        if content_hash:
+            self.extraction_cache.set(content_hash, self.EXTRACTOR_VERSION, analysis_data)
+        
         return analysis_data
\ No newline at end of file
@@ -0,0 +1,207 @@
+import argparse
+import json
+import os
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Optional
+
+from backend.atomic_io import atomic_write_bytes, atomic_write_json
+
+try:
+    from PIL import Image  # Optionnel (installé avec Streamlit) : encodage WebP
+except ImportError:
+    Image = None
+
+
+# Formats d'image des miniatures
+PREVIEW_FORMATS = ('webp', 'jpeg')
+
+
+class PreviewCache:
+    """
+    Cache disque des prévisualisations PDF, adressé par le contenu du fichier.
+
+    Deux types d'entrées sont rangés sous `<cache_dir>/<2 premiers caractères>/` :
+    des entrées JSON (métadonnées du document, extrait de texte de chaque page)
+    et les miniatures des pages, nommées d'après le SHA-256 du PDF, la page, le
+    zoom, la qualité et le format. Les miniatures sont servies comme fichiers :
+    une page déjà rendue ne rouvre pas le PDF et ne garde aucune image en
+    mémoire. Au-delà de `max_size_bytes`, les entrées les moins récemment lues
+    sont supprimées.
+    """
+
+    # Version des entrées JSON : à incrémenter quand leur contenu change
+    ENTRY_VERSION = "2"
+
+    def __init__(self, cache_dir: str = "data/cache/previews", max_size_bytes: int = 100 * 1024 * 1024,
+                 image_format: str = None, quality: int = 80):
+        """
+        Args:
+            cache_dir (str): Dossier racine du cache
+            max_size_bytes (int): Taille maximale cumulée des entrées
+            image_format (str): "webp" (nécessite Pillow) ou "jpeg"; par défaut webp si Pillow est installé
+            quality (int): Qualité de compression des miniatures (1-100)
+
+        Raises:
+            ValueError: Si le format d'image n'est pas supporté
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_size_bytes = max_size_bytes
+        self.quality = max(1, min(100, int(quality)))
+
+        image_format = (image_format or ('webp' if Image is not None else 'jpeg')).lower()
+        if image_format == 'jpg':
+            image_format = 'jpeg'
+        if image_format not in PREVIEW_FORMATS:
+            raise ValueError(f"Format de miniature non supporté: {image_format} (formats: {', '.join(PREVIEW_FORMATS)})")
+        if image_format == 'webp' and Image is None:
+            print("Pillow non installé : miniatures enregistrées en JPEG")
+            image_format = 'jpeg'
+        self.image_format = image_format
+
+    def _entry_dir(self, content_hash: str) -> Path:
+        return self.cache_dir / content_hash[:2]
+
+    def thumbnail_path(self, content_hash: str, page: int, zoom: float) -> Path:
+        """Chemin de la miniature d'une page (numérotée à partir de 1)."""
+        extension = 'jpg' if self.image_format == 'jpeg' else self.image_format
+        return self._entry_dir(content_hash) / f"{content_hash}.p{page}.z{zoom:g}.q{self.quality}.{extension}"
+
+    def _entry_path(self, content_hash: str, key: str) -> Path:
+        return self._entry_dir(content_hash) / f"{content_hash}.v{self.ENTRY_VERSION}.{key}.json"
+
+    @staticmethod
+    def _touch(path: Path):
+        # La date de modification sert d'horodatage LRU
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def get_thumbnail(self, content_hash: str, page: int, zoom: float) -> Optional[str]:
+        """Retourne le chemin de la miniature en cache, ou None si absente."""
+        path = self.thumbnail_path(content_hash, page, zoom)
+        if not path.exists():
+            return None
+        self._touch(path)
+        return str(path)
+
+    def encode(self, pixmap) -> bytes:
+        """Encode une page rendue par PyMuPDF (Pixmap RVB sans transparence) dans le format du cache."""
+        if self.image_format == 'webp':
+            image = Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+            buffer = BytesIO()
+            image.save(buffer, format="WEBP", quality=self.quality)
+            return buffer.getvalue()
+        return pixmap.tobytes("jpeg", jpg_quality=self.quality)
+
+    def set_thumbnail(self, content_hash: str, page: int, zoom: float, pixmap) -> Optional[str]:
+        """Enregistre la miniature d'une page puis applique la limite de taille (chemin, ou None en cas d'échec)."""
+        path = self.thumbnail_path(content_hash, page, zoom)
+        try:
+            # Sans fsync : une miniature perdue lors d'un arrêt brutal est simplement recalculée
+            atomic_write_bytes(str(path), self.encode(pixmap), fsync=False)
+        except Exception as e:
+            print(f"Erreur lors de l'écriture de la miniature: {str(e)}")
+            return None
+        self._evict()
+        return str(path)
+
+    def get_entry(self, content_hash: str, key: str) -> Optional[Dict]:
+        """Retourne une entrée JSON en cache (ex. 'metadata', 'page3'), ou None si absente ou illisible."""
+        path = self._entry_path(content_hash, key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        self._touch(path)
+        return entry
+
+    def set_entry(self, content_hash: str, key: str, entry: Dict):
+        """Enregistre une entrée JSON d'un document."""
+        try:
+            atomic_write_json(str(self._entry_path(content_hash, key)), entry, fsync=False, separators=(',', ':'))
+        except Exception as e:
+            print(f"Erreur lors de l'écriture du cache de prévisualisation: {str(e)}")
+
+    def _entries(self):
+        if not self.cache_dir.exists():
+            return []
+        # Les fichiers temporaires d'une écriture en cours commencent par un point
+        return [path for path in self.cache_dir.glob("*/*") if path.is_file() and not path.name.startswith('.')]
+
+    def _evict(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de la taille maximale."""
+        entries = []
+        total_size = 0
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_size += stat.st_size
+
+        if total_size <= self.max_size_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            try:
+                path.unlink()
+                total_size -= size
+            except OSError:
+                pass
+
+    def invalidate(self, content_hash: str = None) -> int:
+        """
+        Supprime les prévisualisations d'un fichier, ou tout le cache.
+
+        Returns:
+            int: Nombre d'entrées supprimées
+        """
+        if content_hash:
+            paths = list(self._entry_dir(content_hash).glob(f"{content_hash}.*"))
+        else:
+            paths = self._entries()
+
+        removed = 0
+        for path in paths:
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def get_stats(self) -> Dict:
+        """Retourne le nombre d'entrées et l'occupation du cache."""
+        entries = self._entries()
+        return {
+            'entries': len(entries),
+            'size_bytes': sum(path.stat().st_size for path in entries),
+            'max_size_bytes': self.max_size_bytes
+        }
+
+
+def main():
+    """Commande d'administration du cache des prévisualisations."""
+    parser = argparse.ArgumentParser(description="Gestion du cache des prévisualisations PDF")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--stats', action='store_true', help="Affiche l'occupation du cache")
+    group.add_argument('--clear', action='store_true', help="Vide entièrement le cache")
+    parser.add_argument('--cache-dir', default="data/cache/previews", help="Dossier du cache")
+    args = parser.parse_args()
+
+    cache = PreviewCache(args.cache_dir)
+    if args.stats:
+        stats = cache.get_stats()
+        print(f"{stats['entries']} entrée(s), {stats['size_bytes']:,} octets")
+    else:
+        print(f"{cache.invalidate()} entrée(s) supprimée(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+# Quotas par défaut de l'API Groq (requêtes et tokens par minute), par modèle
+DEFAULT_MODEL_LIMITS = {
+    "llama-3.3-70b-versatile": {"requests_per_minute": 30, "tokens_per_minute": 12000},
+}
+DEFAULT_LIMITS = {"requests_per_minute": 30, "tokens_per_minute": 6000}
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation prudente du nombre de tokens d'un texte (≈ 3 caractères par token en français)."""
+    return len(text) // 3 + 1
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Indique si une exception de l'API correspond à un dépassement de quota (HTTP 429)."""
+    if getattr(error, 'status_code', None) == 429:
+        return True
+    message = str(error)
+    return "429" in message or "rate_limit" in message.lower()
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """Convertit une durée Groq ("7.66s", "2m59.56s", "120ms") ou un nombre de secondes en secondes."""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    matches = re.findall(r'(\d+(?:\.\d+)?)(ms|h|m|s)', value)
+    if not matches:
+        return None
+    factors = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+    return sum(float(amount) * factors[unit] for amount, unit in matches)
+
+
+def retry_after_from_error(error: Exception) -> Optional[float]:
+    """
+    Extrait le délai d'attente demandé par le fournisseur à partir d'une erreur 429.
+
+    Consulte les en-têtes `retry-after-ms`, `retry-after` (secondes ou date HTTP)
+    puis les en-têtes `x-ratelimit-reset-*` propres à Groq.
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get('retry-after')
+    if retry_after:
+        delay = _parse_duration(retry_after)
+        if delay is not None:
+            return delay
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+
+    resets = [_parse_duration(headers[name]) for name in ('x-ratelimit-reset-requests', 'x-ratelimit-reset-tokens')
+              if headers.get(name)]
+    resets = [delay for delay in resets if delay is not None]
+    return max(resets) if resets else None
+
+
+class TokenBucket:
+    """
+    Seau à jetons rechargé en continu : `capacity` jetons disponibles par minute.
+    """
+
+    def __init__(self, capacity: float):
+        self.capacity = float(capacity)
+        self.tokens = self.capacity
+        self.refill_rate = self.capacity / 60.0
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+            self.updated_at = now
+
+    def time_until_available(self, amount: float, now: float) -> float:
+        """Délai (en secondes) avant que `amount` jetons soient disponibles."""
+        self._refill(now)
+        amount = min(amount, self.capacity)  # Une requête plus grosse que le seau ne doit pas bloquer indéfiniment
+        missing = amount - self.tokens
+        return missing / self.refill_rate if missing > 0 else 0.0
+
+    def consume(self, amount: float, now: float):
+        """Retire `amount` jetons (le solde peut devenir négatif pour régulariser une sous-estimation)."""
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float, now: float):
+        """Corrige le solde après coup (delta positif = jetons rendus)."""
+        self._refill(now)
+        self.tokens = min(self.capacity, self.tokens + delta)
+
+
+class RateLimiter:
+    """
+    Limiteur de débit partagé par tous les appels `chat.completions.create`.
+
+    Chaque modèle dispose de deux seaux (requêtes/minute et tokens/minute).
+    Un appel réserve une requête et son estimation de tokens avant de partir;
+    un en-tête `Retry-After` reçu sur une erreur 429 suspend le modèle pour
+    tous les threads (et toutes les coroutines) jusqu'à l'échéance indiquée.
+    """
+
+    def __init__(self, model_limits: Dict[str, Dict] = None):
+        self._lock = threading.Lock()
+        self._limits = {model: dict(limits) for model, limits in DEFAULT_MODEL_LIMITS.items()}
+        self._buckets = {}
+        self._blocked_until = {}
+        for model, limits in (model_limits or {}).items():
+            self.configure(model, **limits)
+
+    def configure(self, model: str, requests_per_minute: float = None, tokens_per_minute: float = None):
+        """Définit les quotas d'un modèle (les seaux existants sont recréés)."""
+        with self._lock:
+            limits = self._limits.setdefault(model, dict(DEFAULT_LIMITS))
+            if requests_per_minute is not None:
+                limits['requests_per_minute'] = requests_per_minute
+            if tokens_per_minute is not None:
+                limits['tokens_per_minute'] = tokens_per_minute
+            self._buckets.pop(model, None)
+
+    def get_limits(self, model: str) -> Dict:
+        """Retourne les quotas appliqués à un modèle."""
+        with self._lock:
+            return dict(self._limits.get(model, DEFAULT_LIMITS))
+
+    def _get_buckets(self, model: str):
+        if model not in self._buckets:
+            limits = self._limits.get(model, DEFAULT_LIMITS)
+            self._buckets[model] = (
+                TokenBucket(limits['requests_per_minute']),
+                TokenBucket(limits['tokens_per_minute'])
+            )
+        return self._buckets[model]
+
+    def reserve(self, model: str, tokens: int) -> float:
+        """
+        Tente de réserver une requête de `tokens` tokens.
+
+        Returns:
+            float: 0 si la réservation est accordée, sinon le délai à attendre avant de réessayer
+        """
+        with self._lock:
+            now = time.monotonic()
+            blocked = self._blocked_until.get(model, 0) - now
+            if blocked > 0:
+                return blocked
+
+            request_bucket, token_bucket = self._get_buckets(model)
+            wait = max(request_bucket.time_until_available(1, now),
+                       token_bucket.time_until_available(tokens, now))
+            if wait > 0:
+                return wait
+
+            request_bucket.consume(1, now)
+            token_bucket.consume(tokens, now)
+            return 0.0
+
+    def acquire(self, model: str, tokens: int):
+        """Bloque jusqu'à obtenir une réservation pour `model`."""
+        while True:
+            wait = self.reserve(model, tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, model: str, tokens: int):
+        """Variante asynchrone d'acquire : l'attente ne bloque pas la boucle d'événements."""
+        while True:
+            wait = self.reserve(model, tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def record_usage(self, model: str, estimated_tokens: int, actual_tokens: int):
+        """Régularise le seau de tokens avec la consommation réelle renvoyée par l'API."""
+        with self._lock:
+            _, token_bucket = self._get_buckets(model)
+            token_bucket.adjust(estimated_tokens - actual_tokens, time.monotonic())
+
+    def record_rate_limit(self, model: str, retry_after: float):
+        """Suspend tous les appels au modèle pendant `retry_after` secondes (réponse 429)."""
+        with self._lock:
+            until = time.monotonic() + max(0.0, retry_after)
+            self._blocked_until[model] = max(self._blocked_until.get(model, 0), until)
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    Limiteur de débit dont les seaux sont partagés entre processus.
+
+    Les workers de la file, l'application et les audits par lot utilisent la même
+    clé API : chacun disposant de son propre limiteur, N processus consommeraient N
+    fois le quota. Ici, l'état des seaux de chaque modèle (soldes, dernière
+    recharge, suspension après une erreur 429) est conservé dans une base SQLite
+    et mis à jour dans une transaction exclusive. Les quotas restent ceux configurés
+    dans chaque processus; les horodatages sont ceux de l'horloge système, commune
+    à tous les processus.
+    """
+
+    def __init__(self, db_path: str = "data/rate_limits.sqlite", model_limits: Dict[str, Dict] = None):
+        """
+        Args:
+            db_path (str): Base SQLite de l'état partagé des seaux
+            model_limits (Dict): Quotas par modèle (voir RateLimiter)
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        # Transactions explicites : lecture et mise à jour d'un seau doivent être atomiques entre processus
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                model TEXT PRIMARY KEY,
+                requests REAL NOT NULL,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                blocked_until REAL NOT NULL DEFAULT 0
+            )
+        """)
+        super().__init__(model_limits)
+
+    def configure(self, model: str, requests_per_minute: float = None, tokens_per_minute: float = None):
+        """Définit les quotas d'un modèle dans ce processus (l'état partagé des seaux est conservé)."""
+        with self._lock:
+            limits = self._limits.setdefault(model, dict(DEFAULT_LIMITS))
+            if requests_per_minute is not None:
+                limits['requests_per_minute'] = requests_per_minute
+            if tokens_per_minute is not None:
+                limits['tokens_per_minute'] = tokens_per_minute
+
+    def _update(self, model: str, action):
+        """
+        Applique `action(request_bucket, token_bucket, state, now)` à l'état partagé d'un modèle.
+
+        Les seaux sont rechargés jusqu'à l'instant présent avant l'action, puis
+        l'état modifié est enregistré dans la même transaction.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                limits = self._limits.get(model, DEFAULT_LIMITS)
+                request_bucket = TokenBucket(limits['requests_per_minute'])
+                token_bucket = TokenBucket(limits['tokens_per_minute'])
+                state = {'blocked_until': 0.0}
+                row = self._conn.execute(
+                    "SELECT requests, tokens, updated_at, blocked_until FROM rate_limit_buckets WHERE model = ?",
+                    (model,)
+                ).fetchone()
+                if row is not None:
+                    request_bucket.tokens = min(request_bucket.capacity, row[0])
+                    token_bucket.tokens = min(token_bucket.capacity, row[1])
+                    request_bucket.updated_at = token_bucket.updated_at = row[2]
+                    state['blocked_until'] = row[3]
+                else:
+                    request_bucket.updated_at = token_bucket.updated_at = now
+                request_bucket._refill(now)
+                token_bucket._refill(now)
+
+                result = action(request_bucket, token_bucket, state, now)
+
+                self._conn.execute(
+                    "INSERT INTO rate_limit_buckets (model, requests, tokens, updated_at, blocked_until) "
+                    "VALUES (?, ?, ?, ?, ?) ON CONFLICT(model) DO UPDATE SET requests = excluded.requests, "
+                    "tokens = excluded.tokens, updated_at = excluded.updated_at, blocked_until = excluded.blocked_until",
+                    (model, request_bucket.tokens, token_bucket.tokens, now, state['blocked_until'])
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return result
+
+    def reserve(self, model: str, tokens: int) -> float:
+        def action(request_bucket, token_bucket, state, now):
+            blocked = state['blocked_until'] - now
+            if blocked > 0:
+                return blocked
+            wait = max(request_bucket.time_until_available(1, now),
+                       token_bucket.time_until_available(tokens, now))
+            if wait > 0:
+                return wait
+            request_bucket.consume(1, now)
+            token_bucket.consume(tokens, now)
+            return 0.0
+
+        return self._update(model, action)
+
+    def record_usage(self, model: str, estimated_tokens: int, actual_tokens: int):
+        self._update(model, lambda request_bucket, token_bucket, state, now:
+                     token_bucket.adjust(estimated_tokens - actual_tokens, now))
+
+    def record_rate_limit(self, model: str, retry_after: float):
+        def action(request_bucket, token_bucket, state, now):
+            state['blocked_until'] = max(state['blocked_until'], now + max(0.0, retry_after))
+
+        self._update(model, action)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_shared_rate_limiter = None
+_shared_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Retourne le limiteur de débit unique du processus.
+
+    Ses seaux sont partagés avec les autres processus (workers, application, audits
+    par lot) par la base RATE_LIMIT_DB (data/rate_limits.sqlite par défaut); avec
+    RATE_LIMIT_DB vide, les quotas ne sont suivis que dans le processus.
+    """
+    global _shared_rate_limiter
+    with _shared_rate_limiter_lock:
+        if _shared_rate_limiter is None:
+            db_path = os.getenv('RATE_LIMIT_DB', 'data/rate_limits.sqlite')
+            _shared_rate_limiter = SharedRateLimiter(db_path) if db_path else RateLimiter()
+        return _shared_rate_limiter
@@ -0,0 +1,165 @@
+import argparse
+import errno
+import glob
+import gzip
+import json
+import os
+from typing import Dict
+
+from backend.atomic_io import atomic_write_bytes
+
+try:
+    import zstandard  # Optionnel : meilleure compression que gzip, décompression plus rapide
+except ImportError:
+    zstandard = None
+
+
+# Version du format de stockage compact (les anciens rapports JSON n'en ont pas)
+REPORT_FORMAT_VERSION = 2
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+# Extensions des rapports sauvegardés, du format le plus récent au plus ancien
+REPORT_EXTENSIONS = ('.json.zst', '.json.gz', '.json')
+
+
+def report_extension() -> str:
+    """Extension des rapports écrits dans l'environnement courant (zstd si disponible, sinon gzip)."""
+    return '.json.zst' if zstandard is not None else '.json.gz'
+
+
+def pack_report(audit_report: Dict) -> Dict:
+    """
+    Prépare un rapport pour le stockage compact, sans ses sections dupliquées.
+
+    Les rapports chapitre par chapitre contiennent deux fois la liste des
+    chapitres (`chapters` et `chapter_analysis.chapters`) : la seconde est
+    remplacée par une référence, restaurée par unpack_report.
+
+    Returns:
+        Dict: Enveloppe {'format_version', 'report', 'shared'}
+    """
+    report = dict(audit_report)
+    shared = []
+    chapter_analysis = report.get('chapter_analysis')
+    if isinstance(chapter_analysis, dict) and 'chapters' in report and \
+            chapter_analysis.get('chapters') == report['chapters']:
+        report['chapter_analysis'] = {key: value for key, value in chapter_analysis.items() if key != 'chapters'}
+        shared.append('chapter_analysis.chapters')
+    return {'format_version': REPORT_FORMAT_VERSION, 'report': report, 'shared': shared}
+
+
+def unpack_report(stored: Dict) -> Dict:
+    """Reconstitue un rapport à partir de son enveloppe de stockage (voir pack_report)."""
+    report = stored['report']
+    if 'chapter_analysis.chapters' in stored.get('shared', []):
+        report['chapter_analysis'] = {'chapters': report['chapters'], **report['chapter_analysis']}
+    return report
+
+
+def dumps_report(audit_report: Dict) -> bytes:
+    """Sérialise un rapport au format compact : JSON sans indentation, sections dédupliquées, compressé."""
+    payload = json.dumps(pack_report(audit_report), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=10).compress(payload)
+    # mtime fixe : un même rapport produit toujours les mêmes octets
+    return gzip.compress(payload, compresslevel=6, mtime=0)
+
+
+def loads_report(data: bytes) -> Dict:
+    """
+    Désérialise un rapport, quel que soit son format.
+
+    Le format est reconnu au contenu et non à l'extension : rapport compact
+    compressé par zstd ou gzip, ou ancien rapport JSON indenté.
+    """
+    if data.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise ValueError("Rapport compressé avec zstd : installez le paquet `zstandard` pour le lire")
+        data = zstandard.ZstdDecompressor().decompress(data)
+    elif data.startswith(GZIP_MAGIC):
+        data = gzip.decompress(data)
+
+    stored = json.loads(data.decode('utf-8'))
+    if isinstance(stored, dict) and 'format_version' in stored and 'report' in stored:
+        return unpack_report(stored)
+    return stored
+
+
+def write_report(audit_report: Dict, path: str, overwrite: bool = True):
+    """Écrit un rapport au format compact dans `path` (écriture atomique, voir atomic_write_bytes)."""
+    atomic_write_bytes(path, dumps_report(audit_report), overwrite=overwrite)
+
+
+def read_report(path: str) -> Dict:
+    """
+    Lit un rapport sauvegardé, au format compact ou ancien.
+
+    Un fichier vide est un rapport dont l'écriture exclusive n'est pas terminée
+    (voir atomic_io._publish_exclusive) : il est traité comme absent.
+
+    Raises:
+        FileNotFoundError: Si le rapport n'existe pas ou n'est pas encore écrit
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data:
+        raise FileNotFoundError(errno.ENOENT, "Rapport pas encore écrit", path)
+    return loads_report(data)
+
+
+def is_audit_report(data) -> bool:
+    """Vérifie qu'un contenu lu est un rapport d'audit (et non, par ex., un export de comparaison)."""
+    return isinstance(data, dict) and isinstance(data.get('metadata'), dict) and isinstance(data.get('scores'), dict)
+
+
+def convert_reports(audits_dir: str = "data/audits", db_path: str = "data/audits.db") -> Dict:
+    """
+    Convertit au format compact les anciens rapports JSON d'un dossier.
+
+    Seuls les rapports d'audit (`audit_*.json`) sont convertis : les exports de
+    comparaison enregistrés dans le même dossier restent en JSON. Chaque rapport est réécrit sous la nouvelle extension, son chemin est mis à
+    jour dans l'historique, puis l'ancien fichier est supprimé.
+
+    Returns:
+        Dict: {'converted', 'bytes_before', 'bytes_after'}
+    """
+    from backend.audit_store import AuditStore  # Import différé : audit_store dépend de ce module
+
+    store = AuditStore(db_path)
+    store.import_legacy_once(audits_dir=audits_dir)
+    stats = {'converted': 0, 'bytes_before': 0, 'bytes_after': 0}
+    try:
+        for json_path in sorted(glob.glob(os.path.join(audits_dir, "audit_*.json"))):
+            try:
+                audit_report = read_report(json_path)
+            except (OSError, ValueError) as e:
+                print(f"Rapport ignoré ({json_path}): {str(e)}")
+                continue
+            if not is_audit_report(audit_report):
+                print(f"Fichier ignoré, ce n'est pas un rapport d'audit: {json_path}")
+                continue
+            compact_path = json_path[:-len('.json')] + report_extension()
+            write_report(audit_report, compact_path)
+            store.move_report(os.path.normpath(json_path), os.path.normpath(compact_path))
+            stats['bytes_before'] += os.path.getsize(json_path)
+            stats['bytes_after'] += os.path.getsize(compact_path)
+            stats['converted'] += 1
+            os.remove(json_path)
+    finally:
+        store.close()
+    return stats
+
+
+def main():
+    """Conversion des rapports d'audit au format compact."""
+    parser = argparse.ArgumentParser(description="Conversion des rapports d'audit au format compact")
+    parser.add_argument('--audits-dir', default="data/audits", help="Dossier des rapports")
+    parser.add_argument('--db', default="data/audits.db", help="Base SQLite de l'historique")
+    args = parser.parse_args()
+
+    stats = convert_reports(args.audits_dir, args.db)
+    print(f"{stats['converted']} rapport(s) converti(s) : {stats['bytes_before']:,} -> {stats['bytes_after']:,} octets")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import heapq
+import re
+from collections import Counter
+from operator import itemgetter
+
+
+# Mots de plus de 4 caractères (candidats mots-clés)
+WORD_PATTERN = re.compile(r'\b\w{4,}\b')
+
+# Données extraites : (catégorie, sous-chaîne obligatoire, pattern précompilé).
+# La sous-chaîne permet d'ignorer sans balayage regex les pages qui ne peuvent pas contenir de correspondance.
+DATA_PATTERNS = (
+    ('emails', '@', re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')),
+    ('urls', 'http', re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\(\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')),
+    ('dates', None, re.compile(r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b')),
+)
+
+
+class TextStatistics:
+    """
+    Statistiques textuelles calculées en une seule passe sur les pages d'un document.
+
+    Les pages sont ajoutées une à une (`add_page`) : comptages de mots, caractères
+    et lignes, fréquences des mots-clés (Counter) et extraction des emails, URLs
+    et dates sont mis à jour au fil de l'eau, sans conserver le texte complet.
+    Les totaux correspondent au texte concaténé (chaque page suivie d'un saut de
+    ligne) débarrassé de ses espaces de début et de fin, comme dans
+    PDFProcessor.extract_text_from_pdf.
+    """
+
+    def __init__(self, top_n: int = 10, preview_length: int = 500):
+        self.top_n = top_n
+        self.preview_length = preview_length
+
+        self.word_count = 0
+        self.total_length = 0
+        self.total_newlines = 0
+        self.word_freq = Counter()
+        self.extracted = {'emails': {}, 'urls': {}, 'dates': {}}
+        self.pages = []
+
+        # Espaces de début/fin du texte concaténé, exclus comme par str.strip()
+        self._content_started = False
+        self._leading_ws = 0
+        self._leading_newlines = 0
+        self._trailing_ws = 0
+        self._trailing_newlines = 0
+        self._preview = ""
+
+    def add_page(self, page_text: str, page_number: int = None):
+        """Intègre le texte d'une page aux statistiques."""
+        segment = page_text + "\n"
+        segment_words = len(segment.split())
+        segment_newlines = segment.count('\n')
+
+        self.word_count += segment_words
+        self.total_length += len(segment)
+        self.total_newlines += segment_newlines
+        self.pages.append({
+            'page': page_number if page_number is not None else len(self.pages) + 1,
+            'word_count': segment_words,
+            'character_count': len(page_text),
+            'line_count': len(page_text.splitlines())
+        })
+
+        stripped_right = segment.rstrip()
+        if not stripped_right:
+            self._trailing_ws += len(segment)
+            self._trailing_newlines += segment_newlines
+        else:
+            self._trailing_ws = len(segment) - len(stripped_right)
+            self._trailing_newlines = segment.count('\n', len(stripped_right))
+
+        if not self._content_started:
+            stripped_left = segment.lstrip()
+            leading = len(segment) - len(stripped_left)
+            self._leading_ws += leading
+            self._leading_newlines += segment.count('\n', 0, leading)
+            self._content_started = bool(stripped_left)
+            segment_for_preview = stripped_left
+        else:
+            segment_for_preview = segment
+        if len(self._preview) <= self.preview_length:
+            self._preview += segment_for_preview[:self.preview_length + 1 - len(self._preview)]
+
+        self.word_freq.update(WORD_PATTERN.findall(segment.lower()))
+
+        for kind, required, pattern in DATA_PATTERNS:
+            if required is None or required in segment:
+                self.extracted[kind].update(dict.fromkeys(pattern.findall(segment)))
+
+    @property
+    def is_empty(self) -> bool:
+        """Vrai si aucune page ne contient de texte."""
+        return not self._content_started
+
+    @property
+    def character_count(self) -> int:
+        return self.total_length - self._leading_ws - self._trailing_ws
+
+    @property
+    def line_count(self) -> int:
+        return self.total_newlines - self._leading_newlines - self._trailing_newlines + 1
+
+    def top_keywords(self):
+        """Mots-clés les plus fréquents (même ordre qu'un tri complet par fréquence décroissante)."""
+        return heapq.nlargest(self.top_n, self.word_freq.items(), key=itemgetter(1))
+
+    def content_preview(self) -> str:
+        preview = self._preview[:self.character_count]
+        if self.character_count > self.preview_length:
+            return preview[:self.preview_length] + "..."
+        return preview
+
+    def result(self) -> dict:
+        """Retourne les statistiques au format d'analyze_pdf_content."""
+        return {
+            'statistics': {
+                'word_count': self.word_count,
+                'character_count': self.character_count,
+                'line_count': self.line_count,
+                'page_count': len(self.pages)
+            },
+            'page_statistics': self.pages,
+            'top_keywords': self.top_keywords(),
+            'extracted_data': {kind: list(values) for kind, values in self.extracted.items()},
+            'content_preview': self.content_preview()
+        }
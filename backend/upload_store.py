@@ -0,0 +1,250 @@
+import argparse
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterator, List, Optional
+
+from backend.atomic_io import atomic_write_chunks
+from backend.extraction_cache import compute_file_hash
+
+
+class UploadStore:
+    """
+    Stockage des PDF téléchargés, adressé par leur contenu.
+
+    Chaque contenu est conservé une seule fois sous
+    `<uploads_dir>/blobs/<2 premiers caractères>/<sha256>.pdf`, et une table
+    SQLite associe chaque nom d'upload (`module_<nom>.pdf`, `support_<nom>.pdf`,
+    ...) à l'empreinte de son contenu. Le nom reste aussi présent dans
+    `uploads_dir` sous forme de lien physique vers le blob (copie à défaut) : les
+    outils qui parcourent ce dossier (audit par lot, benchmarks, comparaison de
+    fichiers existants) fonctionnent sans changement, sans doubler l'espace disque.
+
+    Le fichier reçu est lu par blocs : une première passe calcule l'empreinte
+    et, si ce contenu est déjà connu, rien n'est écrit. Comme le cache
+    d'extraction et l'historique sont eux aussi indexés par cette empreinte, un
+    ré-upload identique retrouve immédiatement extraction et audits existants.
+    """
+
+    def __init__(self, uploads_dir: str = "data/uploads", db_path: str = "data/uploads.db",
+                 chunk_size: int = 1024 * 1024):
+        """
+        Args:
+            uploads_dir (str): Dossier des uploads (les blobs sont rangés dans `blobs/`)
+            db_path (str): Base SQLite des noms d'upload
+            chunk_size (int): Taille des blocs de lecture et d'écriture
+        """
+        self.uploads_dir = uploads_dir
+        self.blobs_dir = os.path.join(uploads_dir, "blobs")
+        self.db_path = db_path
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS uploads (
+                name TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                uploaded_at TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_uploads_content_hash ON uploads(content_hash)")
+        self._conn.commit()
+
+    def blob_path(self, content_hash: str) -> str:
+        """Chemin du blob d'un contenu."""
+        return os.path.join(self.blobs_dir, content_hash[:2], f"{content_hash}.pdf")
+
+    def name_path(self, name: str) -> str:
+        """Chemin sous lequel un nom d'upload apparaît dans le dossier des uploads."""
+        return os.path.join(self.uploads_dir, os.path.basename(name))
+
+    def _chunks(self, fileobj: BinaryIO) -> Iterator[bytes]:
+        return iter(lambda: fileobj.read(self.chunk_size), b'')
+
+    def put(self, fileobj: BinaryIO, name: str, replace: bool = False) -> Dict:
+        """
+        Enregistre un fichier téléchargé sous `name`.
+
+        Le fichier doit permettre de revenir en arrière (seek) : c'est le cas des
+        fichiers téléchargés via Streamlit comme des fichiers ouverts sur disque.
+
+        Si `name` désigne déjà un autre contenu, le nouveau contenu est enregistré
+        mais le nom n'est pas modifié (sauf `replace`) : l'utilisateur choisit ensuite
+        entre les deux versions, et `bind` associe le nom à celle retenue.
+
+        Args:
+            fileobj (BinaryIO): Fichier à enregistrer, lu à partir de sa position courante
+            name (str): Nom d'upload (ex. `module_cours.pdf`)
+            replace (bool): Associe le nom au nouveau contenu même s'il en désignait un autre
+
+        Returns:
+            Dict: {'name', 'content_hash', 'size', 'blob_path'} du contenu reçu, complété de
+                  'new_content' (contenu jusqu'ici inconnu), 'previous_hash' (contenu
+                  précédemment associé au nom) et 'bound' (le nom désigne désormais ce contenu)
+        """
+        name = os.path.basename(name)
+        start = fileobj.tell()
+        digest = hashlib.sha256()
+        for chunk in self._chunks(fileobj):
+            digest.update(chunk)
+        content_hash = digest.hexdigest()
+
+        blob_path = self.blob_path(content_hash)
+        new_content = not os.path.exists(blob_path)
+        if new_content:
+            fileobj.seek(start)
+            try:
+                atomic_write_chunks(blob_path, self._chunks(fileobj), overwrite=False)
+            except FileExistsError:
+                # Même contenu enregistré entre-temps par un autre upload
+                new_content = False
+
+        previous = self.lookup(name) or self._import_file(name)
+        previous_hash = previous['content_hash'] if previous else None
+        bound = replace or previous_hash in (None, content_hash)
+        if bound:
+            self.bind(name, content_hash)
+        return {
+            'name': name,
+            'content_hash': content_hash,
+            'size': os.path.getsize(blob_path),
+            'blob_path': blob_path,
+            'new_content': new_content,
+            'previous_hash': previous_hash,
+            'bound': bound
+        }
+
+    def bind(self, name: str, content_hash: str) -> str:
+        """
+        Associe un nom d'upload à un contenu déjà enregistré.
+
+        Returns:
+            str: Chemin du nom dans le dossier des uploads
+        """
+        name = os.path.basename(name)
+        blob_path = self.blob_path(content_hash)
+        if not os.path.exists(blob_path):
+            raise FileNotFoundError(f"Contenu inconnu: {content_hash}")
+
+        name_path = self.name_path(name)
+        if not (os.path.exists(name_path) and os.path.samefile(name_path, blob_path)):
+            # Lien créé à côté puis renommé : le nom désigne toujours un fichier complet
+            temp_path = os.path.join(self.uploads_dir, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            try:
+                os.link(blob_path, temp_path)
+            except OSError:
+                shutil.copyfile(blob_path, temp_path)
+            os.replace(temp_path, name_path)
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO uploads (name, content_hash, size, uploaded_at) VALUES (?, ?, ?, ?)",
+                (name, content_hash, os.path.getsize(blob_path), datetime.now().isoformat())
+            )
+        return name_path
+
+    def lookup(self, name: str) -> Optional[Dict]:
+        """
+        Retourne l'upload enregistré sous `name`, ou None.
+
+        Returns:
+            Optional[Dict]: {'name', 'content_hash', 'size', 'uploaded_at', 'path', 'blob_path'}
+        """
+        name = os.path.basename(name)
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM uploads WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        return {**dict(row), 'path': self.name_path(name), 'blob_path': self.blob_path(row['content_hash'])}
+
+    def names_for(self, content_hash: str) -> List[str]:
+        """Noms d'upload associés à un contenu."""
+        with self._lock:
+            rows = self._conn.execute("SELECT name FROM uploads WHERE content_hash = ? ORDER BY name",
+                                      (content_hash,)).fetchall()
+        return [row['name'] for row in rows]
+
+    def _import_file(self, name: str) -> Optional[Dict]:
+        """Enregistre un fichier déposé directement dans le dossier des uploads (None s'il n'existe pas)."""
+        path = self.name_path(name)
+        if not os.path.isfile(path):
+            return None
+        content_hash = compute_file_hash(path, self.chunk_size)
+        blob_path = self.blob_path(content_hash)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            try:
+                os.link(path, blob_path)
+            except FileExistsError:
+                pass
+            except OSError:
+                with open(path, 'rb') as f:
+                    atomic_write_chunks(blob_path, self._chunks(f), overwrite=False)
+        self.bind(name, content_hash)
+        return self.lookup(name)
+
+    def import_legacy(self) -> int:
+        """
+        Enregistre les PDF déjà présents dans le dossier des uploads (antérieurs au stockage par contenu).
+
+        Les fichiers déjà enregistrés sont ignorés : l'import peut être relancé.
+
+        Returns:
+            int: Nombre de fichiers importés
+        """
+        imported = 0
+        for name in sorted(os.listdir(self.uploads_dir)):
+            if name.lower().endswith('.pdf') and not self.lookup(name) and self._import_file(name):
+                imported += 1
+        return imported
+
+    def stats(self) -> Dict:
+        """Retourne le nombre de noms, de contenus distincts et l'espace occupé par les blobs."""
+        with self._lock:
+            row = self._conn.execute("SELECT COUNT(*), COUNT(DISTINCT content_hash) FROM uploads").fetchone()
+        blobs_size = 0
+        for directory, _, files in os.walk(self.blobs_dir):
+            blobs_size += sum(os.path.getsize(os.path.join(directory, file)) for file in files if file.endswith('.pdf'))
+        return {'names': row[0], 'contents': row[1], 'blobs_size_bytes': blobs_size}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def main():
+    """Commande d'administration du stockage des uploads."""
+    parser = argparse.ArgumentParser(description="Gestion du stockage des PDF téléchargés")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--stats', action='store_true', help="Affiche le nombre d'uploads et l'espace occupé")
+    group.add_argument('--import-legacy', action='store_true',
+                       help="Enregistre les PDF déjà présents dans le dossier des uploads")
+    parser.add_argument('--uploads-dir', default="data/uploads", help="Dossier des uploads")
+    parser.add_argument('--db', default="data/uploads.db", help="Base SQLite des noms d'upload")
+    args = parser.parse_args()
+
+    store = UploadStore(args.uploads_dir, args.db)
+    try:
+        if args.stats:
+            stats = store.stats()
+            print(f"{stats['names']} upload(s), {stats['contents']} contenu(s) distinct(s), "
+                  f"{stats['blobs_size_bytes']:,} octets")
+        else:
+            print(f"{store.import_legacy()} fichier(s) importé(s)")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
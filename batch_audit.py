@@ -0,0 +1,317 @@
+"""
+Audit par lot des PDF d'un dossier, sans interface.
+
+Les PDF sont extraits dans un pool de processus (l'extraction alimente le cache
+d'extraction, relu ensuite par le moteur), puis audités en parallèle par un
+moteur unique : ses requêtes IA partagent la même limite de concurrence
+(AUDIT_MAX_CONCURRENCY ou --max-concurrency) et le même limiteur de débit.
+
+Modes :
+  standard  chaque PDF est audité seul
+  chapter   chaque PDF est audité chapitre par chapitre
+  support   seuls les modules accompagnés d'un support (`support_<nom>.pdf`,
+            à côté de `<nom>.pdf` ou `module_<nom>.pdf`) sont audités, avec leur support
+  auto      module + support s'il existe, sinon chapitre par chapitre si le PDF
+            comporte une table des matières intégrée, sinon audit standard
+
+Un document dont le contenu (empreinte SHA-256) a déjà été audité de la même
+façon, d'après l'historique des audits, est ignoré : un lot interrompu reprend là
+où il s'était arrêté.
+
+Usage :
+    python batch_audit.py data/uploads --mode auto --jobs 4
+    python batch_audit.py "data/uploads/*.pdf" --mode chapter --dry-run
+"""
+import argparse
+import glob
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from backend.extraction_cache import compute_file_hash
+from backend.job_queue import create_audit_engine
+from backend.pdf_processor import PDFProcessor, process_pool_context
+
+
+MODES = ("standard", "chapter", "support", "auto")
+MODULE_PREFIX = "module_"
+SUPPORT_PREFIX = "support_"
+
+
+def collect_pdfs(sources: List[str]) -> List[str]:
+    """Liste les PDF désignés par des dossiers ou des motifs glob (sans doublons, triés)."""
+    paths = set()
+    for source in sources:
+        if os.path.isdir(source):
+            matches = [os.path.join(source, name) for name in os.listdir(source)]
+        else:
+            matches = glob.glob(source, recursive=True)
+        paths.update(os.path.normpath(path) for path in matches
+                     if path.lower().endswith('.pdf') and os.path.isfile(path))
+    return sorted(paths)
+
+
+def _module_name(path: str) -> str:
+    """Nom du module tel qu'il apparaît dans les rapports (sans le préfixe d'upload)."""
+    name = os.path.basename(path)
+    return name[len(MODULE_PREFIX):] if name.startswith(MODULE_PREFIX) else name
+
+
+def plan_documents(pdf_paths: List[str], mode: str) -> List[Dict]:
+    """
+    Regroupe les PDF en documents à auditer.
+
+    Dans les modes "support" et "auto", un fichier `support_<nom>.pdf` est rattaché
+    au module `<nom>.pdf` (ou `module_<nom>.pdf`) du même dossier et n'est pas
+    audité seul.
+
+    Returns:
+        List[Dict]: Documents {'module_path', 'support_path', 'filename'}
+    """
+    supports = {}
+    modules = []
+    for path in pdf_paths:
+        name = os.path.basename(path)
+        if mode in ("support", "auto") and name.startswith(SUPPORT_PREFIX):
+            supports[(os.path.dirname(path), name[len(SUPPORT_PREFIX):])] = path
+        else:
+            modules.append(path)
+
+    documents = []
+    for path in modules:
+        support_path = supports.get((os.path.dirname(path), _module_name(path)))
+        if mode == "support" and support_path is None:
+            print(f"Ignoré (aucun support) : {path}")
+            continue
+        documents.append({'module_path': path, 'support_path': support_path, 'filename': _module_name(path)})
+    return documents
+
+
+def prepare_pdf(pdf_path: str, detect_outline: bool = False) -> Dict:
+    """
+    Extrait un PDF (processus du pool) pour alimenter le cache d'extraction.
+
+    Returns:
+        Dict: {'path', 'content_hash', 'has_toc'} ou {'path', 'error'}
+    """
+    try:
+        # Le lot est déjà réparti sur plusieurs processus : pas de second pool par document
+        processor = PDFProcessor(parallel_page_threshold=sys.maxsize)
+        result = processor.process_pdf_file(pdf_path)
+        if result is None:
+            return {'path': pdf_path, 'error': "Extraction impossible (PDF illisible ou sans texte)"}
+
+        prepared = {'path': pdf_path, 'content_hash': result.get('content_hash') or compute_file_hash(pdf_path)}
+        if detect_outline:
+            # Structure calculée avec l'extraction (et conservée dans le cache d'extraction)
+            outline = result.get('outline')
+            prepared['has_toc'] = bool(outline and outline['source'] == 'toc')
+        return prepared
+    except Exception as e:
+        return {'path': pdf_path, 'error': str(e)}
+
+
+def audit_key(audit_type: str, content_hash: str, support_hash: Optional[str]) -> Tuple:
+    """Identifie un audit par son type et le contenu audité."""
+    return audit_type, content_hash, support_hash
+
+
+def load_audited_keys(engine) -> set:
+    """Audits déjà réalisés d'après l'historique (entrées comportant une empreinte de contenu)."""
+    return {audit_key(*contents) for contents in engine.audit_store.audited_contents()}
+
+
+def choose_audit_type(document: Dict, mode: str, module_info: Dict) -> str:
+    """Type d'audit d'un document selon le mode du lot."""
+    if mode == "chapter":
+        return "chapter_by_chapter"
+    if mode == "auto" and not document['support_path'] and module_info.get('has_toc'):
+        return "chapter_by_chapter"
+    return "standard"
+
+
+class BatchAuditor:
+    """
+    Exécute les audits d'un lot et tient le compte des résultats.
+
+    Les documents sont audités dès que leur extraction est terminée, au plus
+    `jobs` à la fois.
+    """
+
+    def __init__(self, engine, jobs: int = 2, force_refresh: bool = False, output_dir: str = "data/audits",
+                 subject: str = None):
+        self.engine = engine
+        self.subject = subject
+        self.jobs = max(1, jobs)
+        self.force_refresh = force_refresh
+        self.output_dir = output_dir
+        self.results = {'audited': 0, 'skipped': 0, 'failed': 0}
+        self._print_lock = threading.Lock()
+
+    def _log(self, message: str):
+        with self._print_lock:
+            print(message, flush=True)
+
+    def audit_document(self, document: Dict, audit_type: str) -> Dict:
+        """Audite un document et sauvegarde son rapport."""
+        started = time.time()
+        try:
+            if audit_type == "chapter_by_chapter":
+                audit_report = self.engine.audit_pdf_chapter_by_chapter(
+                    document['module_path'], document['filename'], force_refresh=self.force_refresh,
+                    subject=self.subject
+                )
+            elif document['support_path']:
+                audit_report = self.engine.audit_pdf_with_support(
+                    document['module_path'], document['support_path'], document['filename'],
+                    force_refresh=self.force_refresh, subject=self.subject
+                )
+            else:
+                audit_report = self.engine.audit_pdf(
+                    document['module_path'], document['filename'], force_refresh=self.force_refresh,
+                    subject=self.subject
+                )
+            if 'error' in audit_report:
+                return {'error': audit_report['error'], 'duration': time.time() - started}
+
+            json_path = self.engine.save_audit_report(audit_report, self.output_dir)
+            return {
+                'json_path': json_path,
+                'final_score': audit_report['scores']['final_score'],
+                'grade': audit_report['scores']['grade'],
+                'duration': time.time() - started
+            }
+        except Exception as e:
+            return {'error': str(e), 'duration': time.time() - started}
+
+    def run(self, documents: List[Dict], mode: str, extract_workers: int, force: bool = False,
+            dry_run: bool = False) -> Dict:
+        """
+        Extrait puis audite les documents du lot.
+
+        Args:
+            documents (List[Dict]): Documents produits par plan_documents
+            mode (str): Mode du lot (voir MODES)
+            extract_workers (int): Nombre de processus d'extraction
+            force (bool): Ré-audite les documents déjà audités
+            dry_run (bool): Affiche le plan sans lancer d'audit
+
+        Returns:
+            Dict: Compteurs {'audited', 'skipped', 'failed'}
+        """
+        audited_keys = set() if force else load_audited_keys(self.engine)
+        scheduled_keys = set()
+        total = len(documents)
+        done = 0
+
+        # Processus d'extraction créés sans fork : les threads d'audit tournent déjà
+        with ProcessPoolExecutor(max_workers=max(1, extract_workers), mp_context=process_pool_context()) as extract_pool, \
+                ThreadPoolExecutor(max_workers=self.jobs) as audit_pool:
+            support_futures = {}
+            module_futures = {}
+            for document in documents:
+                support_path = document['support_path']
+                if support_path and support_path not in support_futures:
+                    support_futures[support_path] = extract_pool.submit(prepare_pdf, support_path)
+                detect_outline = mode == "auto" and not support_path
+                module_futures[extract_pool.submit(prepare_pdf, document['module_path'], detect_outline)] = document
+
+            audit_futures = {}
+            for future in as_completed(module_futures):
+                document = module_futures[future]
+                module_info = future.result()
+                support_info = support_futures[document['support_path']].result() if document['support_path'] else {}
+                error = module_info.get('error') or support_info.get('error')
+                if error:
+                    done += 1
+                    self.results['failed'] += 1
+                    self._log(f"[{done}/{total}] ÉCHEC {document['filename']} : {error}")
+                    continue
+
+                audit_type = choose_audit_type(document, mode, module_info)
+                key = audit_key(audit_type, module_info['content_hash'], support_info.get('content_hash'))
+                if key in audited_keys or key in scheduled_keys:
+                    done += 1
+                    self.results['skipped'] += 1
+                    reason = "déjà audité" if key in audited_keys else "contenu identique à un autre document du lot"
+                    self._log(f"[{done}/{total}] {reason} ({audit_type}) : {document['module_path']}")
+                    continue
+                scheduled_keys.add(key)
+
+                if dry_run:
+                    done += 1
+                    support_label = f" + {os.path.basename(document['support_path'])}" if document['support_path'] else ""
+                    self._log(f"[{done}/{total}] à auditer ({audit_type}) : {document['module_path']}{support_label}")
+                    continue
+                audit_futures[audit_pool.submit(self.audit_document, document, audit_type)] = (document, audit_type)
+
+            for future in as_completed(audit_futures):
+                document, audit_type = audit_futures[future]
+                result = future.result()
+                done += 1
+                if 'error' in result:
+                    self.results['failed'] += 1
+                    self._log(f"[{done}/{total}] ÉCHEC {document['filename']} ({audit_type}) : {result['error']}")
+                else:
+                    self.results['audited'] += 1
+                    self._log(f"[{done}/{total}] {document['filename']} ({audit_type}) : "
+                              f"{result['final_score']}/100 ({result['grade']}) en {result['duration']:.1f} s "
+                              f"-> {result['json_path']}")
+        return self.results
+
+
+def main():
+    """Audite par lot les PDF d'un dossier ou d'un motif glob."""
+    parser = argparse.ArgumentParser(description="Audit par lot des PDF d'un dossier")
+    parser.add_argument('sources', nargs='+', help="Dossiers ou motifs glob (ex. \"data/uploads/*.pdf\")")
+    parser.add_argument('--mode', choices=MODES, default="auto", help="Type d'audit des documents")
+    parser.add_argument('--jobs', type=int, default=2, help="Nombre de documents audités simultanément")
+    parser.add_argument('--extract-workers', type=int, default=os.cpu_count() or 1,
+                        help="Nombre de processus d'extraction PDF")
+    parser.add_argument('--max-concurrency', type=int, default=None,
+                        help="Nombre maximal de requêtes IA simultanées, tous documents confondus")
+    parser.add_argument('--subject', default=None, help="Matière d'expertise (clé de config/subject_experts.json)")
+    parser.add_argument('--force', action='store_true', help="Ré-audite les documents déjà audités")
+    parser.add_argument('--force-refresh', action='store_true', help="Ignore le cache de réponses IA")
+    parser.add_argument('--output-dir', default="data/audits", help="Dossier des rapports")
+    parser.add_argument('--dry-run', action='store_true', help="Affiche les audits prévus sans les lancer")
+    args = parser.parse_args()
+
+    load_dotenv()
+    if not os.getenv('GROQ_API_KEY'):
+        print("Clé API GROQ non configurée. Veuillez définir GROQ_API_KEY dans le fichier .env")
+        sys.exit(2)
+
+    pdf_paths = collect_pdfs(args.sources)
+    documents = plan_documents(pdf_paths, args.mode)
+    if not documents:
+        print("Aucun PDF à auditer.")
+        return
+    print(f"{len(documents)} document(s) à traiter ({len(pdf_paths)} PDF, mode {args.mode})")
+
+    engine = create_audit_engine(max_concurrent_requests=args.max_concurrency)
+    auditor = BatchAuditor(engine, jobs=args.jobs, force_refresh=args.force_refresh, output_dir=args.output_dir,
+                           subject=args.subject)
+
+    started = time.time()
+    try:
+        results = auditor.run(documents, args.mode, args.extract_workers, force=args.force, dry_run=args.dry_run)
+    finally:
+        if hasattr(engine, 'close'):
+            engine.close()
+    elapsed = time.time() - started
+
+    throughput = results['audited'] / elapsed * 60 if elapsed else 0
+    print(f"\n{results['audited']} audité(s), {results['skipped']} déjà audité(s), {results['failed']} échec(s) "
+          f"en {elapsed:.1f} s ({throughput:.2f} document(s)/min)")
+    if results['failed']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
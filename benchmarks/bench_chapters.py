@@ -0,0 +1,257 @@
+"""
+Mesure du découpage en chapitres sur les PDF de data/uploads.
+
+La référence est _extract_chapters tel qu'il était à l'origine, recopié sans
+modification (ses motifs passés en paramètre, BASELINE_CHAPTER_PATTERNS). Ses motifs se terminent par `(?=\\n)` ou `(?=\\n\\n)` alors qu'ils
+sont appliqués à des lignes déjà découpées : aucun titre n'est jamais reconnu et
+chaque document forme un seul chapitre « Document complet », soit une seule
+analyse IA par document.
+
+La comparaison utile porte donc sur une référence corrigée : mêmes motifs, seule
+la fin de ligne `(?=\\n)` devenant `$` (FIXED_CHAPTER_PATTERNS). Pour chaque
+fichier sont affichés :
+- le nombre de chapitres et le temps de la référence corrigée et de
+  segment_by_titles (découpage "regex" du moteur), et le gain de temps;
+- les débuts de chapitre communs aux deux et les écarts, listés ensuite ligne par
+  ligne avec leur cause : motif resserré (sous-section, élément de liste ou entrée
+  de table des matières que CHAPTER_TITLE_PATTERN ne retient plus), titre répété
+  ignoré (en-tête de page déjà rencontré), motif élargi (titre sans ponctuation
+  après le numéro) ou intitulé différent pour une même ligne;
+- le découpage par défaut du moteur, d'après la structure du PDF (signet ou
+  polices).
+Chaque chapitre correspondant à au moins une analyse IA, leur nombre est affiché.
+
+Usage : python benchmarks/bench_chapters.py [--repeat N] [dossier]
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.chapter_segmenter import (  # noqa: E402
+    CHAPTER_TITLE_PATTERN, detect_chapters, format_chapter_title, segment_by_titles
+)
+from backend.pdf_processor import PDFProcessor  # noqa: E402
+
+
+# Patterns pour identifier les chapitres
+BASELINE_CHAPTER_PATTERNS = [
+    r'(?i)chapitre\s+(\d+|[ivx]+)\s*[:.\-]?\s*(.+?)(?=\n)',
+    r'(?i)partie\s+(\d+|[ivx]+)\s*[:.\-]?\s*(.+?)(?=\n)',
+    r'(?i)section\s+(\d+(?:\.\d+)*)\s*[:.\-]?\s*(.+?)(?=\n)',
+    r'(?i)^(\d+(?:\.\d+)*)\s*[:.\-]\s*(.+?)(?=\n)',
+    r'(?i)^([A-Z][^\n]{10,80})(?=\n\n)'
+]
+
+# Mêmes motifs, la fin de ligne `(?=\n)` remplacée par `$` : ils reconnaissent alors
+# les titres des lignes découpées. `(?=\n\n)` (ligne suivie d'une ligne vide) reste
+# inchangé et ne reconnaît toujours rien : corrigé en `$`, il ferait de toute ligne
+# de 11 à 81 caractères commençant par une lettre un titre de chapitre.
+FIXED_CHAPTER_PATTERNS = [pattern.replace(r'(?=\n)', '$') for pattern in BASELINE_CHAPTER_PATTERNS]
+
+
+def baseline_extract_chapters(text_content, chapter_patterns=BASELINE_CHAPTER_PATTERNS):
+    """_extract_chapters d'origine (méthode du moteur, sans `self`, motifs en paramètre)."""
+    chapters = []
+
+    text_lines = text_content.split('\n')
+    current_chapter = None
+    chapter_content = []
+
+    for i, line in enumerate(text_lines):
+        line = line.strip()
+        if not line:
+            continue
+
+        # Vérifier si la ligne correspond à un titre de chapitre
+        is_chapter_title = False
+        chapter_title = ""
+
+        for pattern in chapter_patterns:
+            match = re.match(pattern, line)
+            if match:
+                is_chapter_title = True
+                if len(match.groups()) >= 2:
+                    chapter_title = f"{match.group(1)} - {match.group(2)}"
+                else:
+                    chapter_title = match.group(1) if match.group(1) else line
+                break
+
+        if is_chapter_title:
+            # Sauvegarder le chapitre précédent
+            if current_chapter and chapter_content:
+                chapters.append({
+                    'title': current_chapter,
+                    'content': '\n'.join(chapter_content),
+                    'word_count': len(' '.join(chapter_content).split())
+                })
+
+            # Commencer un nouveau chapitre
+            current_chapter = chapter_title
+            chapter_content = []
+        else:
+            if current_chapter:
+                chapter_content.append(line)
+
+    # Ajouter le dernier chapitre
+    if current_chapter and chapter_content:
+        chapters.append({
+            'title': current_chapter,
+            'content': '\n'.join(chapter_content),
+            'word_count': len(' '.join(chapter_content).split())
+        })
+
+    # Si aucun chapitre n'est détecté, traiter tout le contenu comme un seul chapitre
+    if not chapters:
+        chapters.append({
+            'title': 'Document complet',
+            'content': text_content,
+            'word_count': len(text_content.split())
+        })
+
+    return chapters
+
+
+def baseline_line_title(line, chapter_patterns):
+    """Titre reconnu par la référence sur une ligne déjà nettoyée (None si aucun)."""
+    for pattern in chapter_patterns:
+        match = re.match(pattern, line)
+        if match:
+            if len(match.groups()) >= 2:
+                return f"{match.group(1)} - {match.group(2)}"
+            return match.group(1) if match.group(1) else line
+    return None
+
+
+def regex_line_title(line):
+    """Titre reconnu par CHAPTER_TITLE_PATTERN sur une ligne (None si aucun)."""
+    match = CHAPTER_TITLE_PATTERN.match(line)
+    return format_chapter_title(match) if match else None
+
+
+def boundary_differences(text_content):
+    """
+    Compare, ligne par ligne, les débuts de chapitre de la référence corrigée et
+    de segment_by_titles.
+
+    Une ligne reconnue comme titre par la référence commence toujours un chapitre;
+    pour segment_by_titles, seulement si ce titre n'a pas déjà été rencontré.
+
+    Returns:
+        Tuple[int, List[Dict]]: Nombre de débuts communs et écarts (ligne, texte, cause, titres)
+    """
+    common = 0
+    differences = []
+    seen_titles = set()
+    for line_number, raw_line in enumerate(text_content.split('\n'), 1):
+        line = raw_line.strip()
+        if not line:
+            continue
+        baseline_title = baseline_line_title(line, FIXED_CHAPTER_PATTERNS)
+        regex_title = regex_line_title(line)
+        repeated = regex_title in seen_titles
+        if regex_title:
+            seen_titles.add(regex_title)
+        regex_starts = regex_title is not None and not repeated
+
+        if baseline_title is None and not regex_starts:
+            continue
+        if baseline_title is not None and regex_starts:
+            if baseline_title == regex_title:
+                common += 1
+                continue
+            cause = "intitulé différent"
+        elif baseline_title is not None:
+            cause = "titre répété ignoré" if repeated else "motif resserré"
+        else:
+            cause = "motif élargi"
+        differences.append({'line': line_number, 'text': line, 'cause': cause,
+                             'baseline': baseline_title, 'regex': regex_title})
+    return common, differences
+
+
+def best_time(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du découpage en chapitres")
+    parser.add_argument('directory', nargs='?', default="data/uploads", help="Dossier des PDF")
+    parser.add_argument('--repeat', type=int, default=5, help="Nombre de mesures par fichier (meilleur temps retenu)")
+    args = parser.parse_args()
+
+    processor = PDFProcessor(use_extraction_cache=False)
+    pdf_paths = sorted(Path(args.directory).glob("*.pdf"))
+    if not pdf_paths:
+        print(f"Aucun PDF dans {args.directory}")
+        return 1
+
+    print(f"{'Fichier':<40} {'Origine':>7} {'Corrigée':>8} {'ms':>7} {'Regex':>6} {'ms':>7} {'Gain':>6} "
+          f"{'Communs':>7} {'Écarts':>6} {'Structure':>13}")
+    totals = {'baseline': 0, 'fixed': 0, 'fixed_time': 0.0, 'regex': 0, 'regex_time': 0.0,
+              'common': 0, 'structure': 0}
+    causes = {}
+    details = []
+    for pdf_path in pdf_paths:
+        page_texts = processor.extract_pages_from_pdf(str(pdf_path))
+        if not page_texts:
+            continue
+        full_text = "".join(page_text + "\n" for page_text in page_texts)
+        text_content = full_text.strip()
+        if not text_content:
+            continue
+
+        baseline_chapters = baseline_extract_chapters(text_content)
+        fixed_time, fixed_chapters = best_time(
+            lambda: baseline_extract_chapters(text_content, FIXED_CHAPTER_PATTERNS), args.repeat)
+        regex_time, regex_chapters = best_time(lambda: segment_by_titles(text_content), args.repeat)
+        common, differences = boundary_differences(text_content)
+
+        # Découpage du moteur avec la structure du PDF (positions des pages comme process_pdf_file)
+        page_offsets = []
+        offset = -(len(full_text) - len(full_text.lstrip()))
+        for page_text in page_texts:
+            page_offsets.append(min(max(offset, 0), len(text_content)))
+            offset += len(page_text) + 1
+        outline = processor.extract_outline(str(pdf_path))
+        structure_chapters, method = detect_chapters(text_content, "auto", page_offsets, outline)
+
+        totals['baseline'] += len(baseline_chapters)
+        totals['fixed'] += len(fixed_chapters)
+        totals['fixed_time'] += fixed_time
+        totals['regex'] += len(regex_chapters)
+        totals['regex_time'] += regex_time
+        totals['common'] += common
+        totals['structure'] += len(structure_chapters)
+        for difference in differences:
+            causes[difference['cause']] = causes.get(difference['cause'], 0) + 1
+            details.append((pdf_path.name, difference))
+        print(f"{pdf_path.name[:40]:<40} {len(baseline_chapters):>7} {len(fixed_chapters):>8} "
+              f"{fixed_time * 1000:>7.2f} {len(regex_chapters):>6} {regex_time * 1000:>7.2f} "
+              f"{fixed_time / regex_time:>5.1f}x {common:>7} {len(differences):>6} "
+              f"{f'{len(structure_chapters)} ({method})':>13}")
+
+    gain = totals['fixed_time'] / totals['regex_time'] if totals['regex_time'] else 0
+    print(f"{'Total':<40} {totals['baseline']:>7} {totals['fixed']:>8} {totals['fixed_time'] * 1000:>7.2f} "
+          f"{totals['regex']:>6} {totals['regex_time'] * 1000:>7.2f} {gain:>5.1f}x {totals['common']:>7} "
+          f"{len(details):>6} {totals['structure']:>13}")
+
+    if details:
+        print("\nDébuts de chapitre différents (référence corrigée -> segment_by_titles) :")
+        for filename, difference in details:
+            print(f"- {filename[:40]} l.{difference['line']} [{difference['cause']}] "
+                  f"« {difference['text'][:70]} » : {difference['baseline']!r} -> {difference['regex']!r}")
+        print("\nÉcarts par cause : " + ", ".join(f"{cause} {count}" for cause, count in sorted(causes.items())))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
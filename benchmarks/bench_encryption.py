@@ -0,0 +1,87 @@
+"""
+Mesure du coût de création d'un EncryptionManager (démarrage d'une session ou d'un worker).
+
+Trois situations sont comparées :
+- dérivation à chaque création (comportement d'origine : PBKDF2 recalculé par
+  session), simulée en vidant le cache du processus avant chaque création;
+- nouveau processus avec le fichier de clé dérivée (ENCRYPTION_DERIVED_KEY_FILE) :
+  cache du processus vide, clé lue sur disque;
+- sessions suivantes d'un même processus : clé servie par le cache du processus.
+
+Les mesures sont faites dans un dossier temporaire : la clé du projet n'est ni lue
+ni modifiée. Le chiffrement et le déchiffrement sont vérifiés dans chaque cas.
+
+Usage : python benchmarks/bench_encryption.py [--repeat N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend import encryption_manager  # noqa: E402
+from backend.encryption_manager import EncryptionManager  # noqa: E402
+
+
+def measure(create, repeat):
+    """Temps moyen et meilleur temps de création, et vérification de la clé obtenue."""
+    durations = []
+    roundtrip_ok = True
+    for _ in range(repeat):
+        start = time.perf_counter()
+        manager = create()
+        durations.append(time.perf_counter() - start)
+        roundtrip_ok &= manager.decrypt_data(manager.encrypt_data("contrôle")) == "contrôle"
+    return sum(durations) / len(durations), min(durations), roundtrip_ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la création du gestionnaire de chiffrement")
+    parser.add_argument('--repeat', type=int, default=20, help="Nombre de créations mesurées par situation")
+    args = parser.parse_args()
+
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        try:
+            derived_key_file = os.path.join(work_dir, "derived_key")
+            # Sel de la clé créé une fois, comme au premier lancement de l'application
+            EncryptionManager("mot de passe")
+
+            def without_cache():
+                encryption_manager._derived_keys.clear()
+                return EncryptionManager("mot de passe")
+
+            def new_process_with_key_file():
+                encryption_manager._derived_keys.clear()
+                return EncryptionManager("mot de passe", derived_key_file=derived_key_file)
+
+            def same_process():
+                return EncryptionManager("mot de passe")
+
+            # Création du fichier de clé dérivée
+            new_process_with_key_file()
+
+            results = [
+                ("Dérivation à chaque session (origine)", measure(without_cache, args.repeat)),
+                ("Nouveau processus, fichier de clé", measure(new_process_with_key_file, args.repeat)),
+                ("Même processus, cache", measure(same_process, args.repeat)),
+            ]
+            key_file_mode = oct(os.stat(derived_key_file).st_mode & 0o777)
+        finally:
+            os.chdir(previous_dir)
+
+    reference = results[0][1][0]
+    print(f"{'Situation':<40} {'Moyenne (ms)':>13} {'Meilleur (ms)':>14} {'Gain':>8}  Clé valide")
+    for label, (mean, best, roundtrip_ok) in results:
+        print(f"{label:<40} {mean * 1000:>13.3f} {best * 1000:>14.3f} {reference / mean:>7.0f}x  "
+              f"{'oui' if roundtrip_ok else 'NON'}")
+    print(f"Droits du fichier de clé dérivée : {key_file_mode}")
+    return 0 if all(result[2] for _, result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
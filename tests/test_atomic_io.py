@@ -0,0 +1,104 @@
+import errno
+import os
+import threading
+
+import pytest
+
+from backend import atomic_io
+from backend.atomic_io import atomic_write_bytes, atomic_write_chunks, atomic_write_json, file_lock
+
+
+@pytest.fixture
+def umask_022():
+    previous = os.umask(0o022)
+    yield
+    os.umask(previous)
+
+
+def test_new_file_gets_the_process_creation_mode(tmp_path, umask_022):
+    path = tmp_path / "rapport.json"
+    atomic_write_json(str(path), {'score': 12})
+    assert path.read_text(encoding='utf-8') == '{"score": 12}'
+    assert path.stat().st_mode & 0o777 == 0o644
+    os.umask(0o077)
+    atomic_write_bytes(str(tmp_path / "autre.bin"), b"x")
+    assert (tmp_path / "autre.bin").stat().st_mode & 0o777 == 0o600
+
+
+def test_existing_mode_is_kept_unless_a_mode_is_given(tmp_path, umask_022):
+    path = tmp_path / "fichier.bin"
+    path.write_bytes(b"ancien")
+    os.chmod(path, 0o640)
+    atomic_write_bytes(str(path), b"nouveau")
+    assert (path.read_bytes(), path.stat().st_mode & 0o777) == (b"nouveau", 0o640)
+    atomic_write_bytes(str(path), b"secret", mode=0o600)
+    assert path.stat().st_mode & 0o777 == 0o600
+
+
+def test_failed_write_keeps_the_old_content_and_no_temporary_file(tmp_path):
+    path = tmp_path / "fichier.bin"
+    path.write_bytes(b"ancien")
+
+    def chunks():
+        yield b"debut"
+        raise RuntimeError("interrompu")
+
+    with pytest.raises(RuntimeError):
+        atomic_write_chunks(str(path), chunks())
+    assert path.read_bytes() == b"ancien"
+    assert os.listdir(tmp_path) == ["fichier.bin"]
+
+
+def test_exclusive_write_refuses_an_existing_file(tmp_path):
+    path = tmp_path / "audit.json.gz"
+    atomic_write_bytes(str(path), b"premier", overwrite=False)
+    with pytest.raises(FileExistsError):
+        atomic_write_bytes(str(path), b"second", overwrite=False)
+    assert path.read_bytes() == b"premier"
+    assert os.listdir(tmp_path) == ["audit.json.gz"]
+
+
+@pytest.mark.parametrize("error", [errno.EPERM, errno.ENOTSUP])
+def test_exclusive_write_without_hard_links(tmp_path, monkeypatch, error):
+    def link(source, target):
+        raise OSError(error, os.strerror(error))
+
+    monkeypatch.setattr(atomic_io.os, "link", link)
+    path = tmp_path / "audit.json.gz"
+    atomic_write_bytes(str(path), b"premier", overwrite=False)
+    assert path.read_bytes() == b"premier"
+    with pytest.raises(FileExistsError):
+        atomic_write_bytes(str(path), b"second", overwrite=False)
+    assert path.read_bytes() == b"premier"
+    assert os.listdir(tmp_path) == ["audit.json.gz"]
+
+
+def test_concurrent_exclusive_writes_have_a_single_winner(tmp_path):
+    path = str(tmp_path / "audit.json")
+    winners = []
+
+    def write(number):
+        try:
+            atomic_write_bytes(path, str(number).encode(), overwrite=False)
+            winners.append(number)
+        except FileExistsError:
+            pass
+
+    threads = [threading.Thread(target=write, args=(number,)) for number in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(winners) == 1
+    assert open(path, 'rb').read() == str(winners[0]).encode()
+
+
+def test_file_lock_is_exclusive(tmp_path):
+    path = str(tmp_path / "sel.json")
+    with file_lock(path):
+        with pytest.raises(TimeoutError):
+            # Un second descripteur ouvert sur le même fichier n'obtient pas le verrou
+            with file_lock(path, timeout=0.1):
+                pass
+    with file_lock(path, timeout=0.1):
+        pass
@@ -0,0 +1,135 @@
+import json
+
+import pytest
+
+from backend.audit_store import AuditStore
+
+
+def make_entry(number, audit_date, score=50.0, grade="C", **extra):
+    return {'filename': f"module_{number}.pdf", 'audit_date': audit_date, 'final_score': score, 'grade': grade,
+            'json_file': f"data/audits/audit_{number}.json", **extra}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = AuditStore(str(tmp_path / "audits.db"))
+    yield store
+    store.close()
+
+
+def test_add_assigns_ids_and_ignores_a_report_saved_twice(store):
+    first = store.add(make_entry(1, "2026-01-01T10:00:00"))
+    second = store.add(make_entry(2, "2026-01-02T10:00:00"))
+    assert 0 < first < second
+    assert store.add(make_entry(1, "2026-01-01T10:00:00")) == 0
+    assert store.count() == 2
+    assert store.get(first)['filename'] == "module_1.pdf"
+
+
+def test_filters(store):
+    store.add(make_entry(1, "2026-01-01T10:00:00", score=80, grade="A", subject="java"))
+    store.add(make_entry(2, "2026-01-02T10:00:00", score=40, grade="D", subject="python"))
+    store.add({**make_entry(3, "2026-01-03T10:00:00", score=60, grade="B"), 'filename': "cours_100%.pdf"})
+
+    assert [row['grade'] for row in store.query(grades=["A", "B"], order_by='grade', descending=False)] == ["A", "B"]
+    assert store.count(min_score=50, max_score=70) == 1
+    assert store.count(subject="java") == 1
+    # Les caractères génériques de LIKE sont cherchés littéralement
+    assert [row['filename'] for row in store.query(filename="100%")] == ["cours_100%.pdf"]
+    assert store.count(filename="modul__") == 0
+
+
+def test_date_to_includes_the_whole_day(store):
+    store.add(make_entry(1, "2026-03-01T00:00:00"))
+    store.add(make_entry(2, "2026-03-01T23:59:59.999999"))
+    store.add(make_entry(3, "2026-03-02T00:00:00"))
+    assert store.count(date_from="2026-03-01", date_to="2026-03-01") == 2
+    assert store.count(date_to="2026-03-01T12:00:00") == 1
+    assert store.count(date_from="2026-03-02") == 1
+
+
+def test_latest_for_content_distinguishes_support_documents(store):
+    store.add(make_entry(1, "2026-01-01T10:00:00", content_hash="h1"))
+    store.add(make_entry(2, "2026-01-02T10:00:00", content_hash="h1", support_content_hash="s1"))
+    store.add(make_entry(3, "2026-01-03T10:00:00", content_hash="h1"))
+    assert store.latest_for_content("h1")['json_file'] == "data/audits/audit_3.json"
+    assert store.latest_for_content("h1", "s1")['json_file'] == "data/audits/audit_2.json"
+    assert store.latest_for_content("h2") is None
+    assert ('standard', 'h1', 's1') in store.audited_contents()
+
+
+def test_import_legacy_reads_the_index_and_unindexed_reports(store, tmp_path):
+    audits_dir = tmp_path / "audits"
+    audits_dir.mkdir()
+    indexed = audits_dir / "audit_a.json"
+    index = {'audits': [{'id': 1, **make_entry(1, "2026-01-02T10:00:00"),
+                         'json_file': str(indexed).replace('/', '\\')}]}
+    (tmp_path / "index.json").write_text(json.dumps(index), encoding='utf-8')
+    report = {'metadata': {'filename': "b.pdf", 'audit_date': "2026-01-01T10:00:00", 'subject': "java"},
+              'scores': {'final_score': 70, 'grade': "B"}}
+    (audits_dir / "audit_b.json").write_text(json.dumps(report), encoding='utf-8')
+    (audits_dir / "audit_c.json").write_text("{tronqué", encoding='utf-8')
+
+    assert store.import_legacy(str(tmp_path / "index.json"), str(audits_dir)) == 2
+    rows = store.query(order_by='id', descending=False)
+    # Identifiants attribués dans l'ordre chronologique, chemins Windows normalisés
+    assert [row['filename'] for row in rows] == ["b.pdf", "module_1.pdf"]
+    assert rows[1]['json_file'] == str(indexed)
+    assert store.import_legacy(str(tmp_path / "index.json"), str(audits_dir)) == 0
+    assert store.import_legacy_once(str(tmp_path / "index.json"), str(audits_dir)) == 0
+
+
+def test_keyset_pages_cover_every_row_once(store):
+    # Scores répétés : la pagination départage les égalités par identifiant
+    for number in range(25):
+        store.add(make_entry(number, f"2026-02-{number % 5 + 1:02d}T10:00:00", score=number % 3))
+
+    for order_by in ('final_score', 'audit_date', 'id'):
+        expected = store.query(limit=None, order_by=order_by)
+        pages, after = [], None
+        while True:
+            page = store.query(limit=7, order_by=order_by, after=after)
+            if not page:
+                break
+            pages.extend(page)
+            after = store.page_cursor(page[-1], order_by)
+        assert [row['id'] for row in pages] == [row['id'] for row in expected]
+
+
+def test_keyset_pages_keep_the_filters(store):
+    for number in range(10):
+        store.add(make_entry(number, f"2026-02-{number + 1:02d}T10:00:00", grade="A" if number % 2 else "B"))
+    first = store.query(limit=3, descending=False, grades=["A"])
+    second = store.query(limit=3, descending=False, grades=["A"], after=store.page_cursor(first[-1]))
+    assert [row['filename'] for row in first + second] == [f"module_{number}.pdf" for number in (1, 3, 5, 7, 9)]
+
+
+def test_aggregates_follow_inserts_and_deletes(store):
+    store.add(make_entry(1, "2026-01-01T09:00:00", score=80, grade="A"))
+    store.add(make_entry(2, "2026-01-01T18:00:00", score=60, grade="B"))
+    store.add(make_entry(3, "2026-01-02T10:00:00", score=90, grade="A"))
+    assert store.stats() == {'total_audits': 3, 'average_score': 76.67,
+                             'grade_distribution': {'A': 2, 'B': 1}, 'last_updated': "2026-01-02T10:00:00"}
+    assert store.daily_trend() == [{'day': "2026-01-01", 'audits': 2, 'average_score': 70.0},
+                                   {'day': "2026-01-02", 'audits': 1, 'average_score': 90.0}]
+    assert store.daily_trend(days=1) == [{'day': "2026-01-02", 'audits': 1, 'average_score': 90.0}]
+
+    with store._conn:
+        store._conn.execute("DELETE FROM audits WHERE grade = 'B'")
+    assert store.stats()['grade_distribution'] == {'A': 2}
+    assert store.daily_trend()[0] == {'day': "2026-01-01", 'audits': 1, 'average_score': 80.0}
+
+
+def test_aggregates_are_rebuilt_for_an_older_database(tmp_path):
+    path = str(tmp_path / "audits.db")
+    store = AuditStore(path)
+    store.add(make_entry(1, "2026-01-01T09:00:00", score=80, grade="A"))
+    with store._conn:
+        store._conn.execute("DELETE FROM grade_totals")
+        store._conn.execute("DELETE FROM store_metadata WHERE key = 'aggregates_version'")
+    store.close()
+
+    reopened = AuditStore(path)
+    assert reopened.stats()['grade_distribution'] == {'A': 1}
+    assert reopened.count(limit=10) == 1
+    reopened.close()
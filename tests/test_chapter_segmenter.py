@@ -0,0 +1,55 @@
+from backend.chapter_segmenter import detect_chapters, segment_by_titles
+
+TEXT = """Introduction générale
+Chapitre 1 : Les bases
+Le langage est présenté ici.
+1. Créez un fichier nommé test.java.
+Prix : 399.99
+2012-10-23
+Chapitre 1 : Les bases
+Suite du premier chapitre.
+Partie visible de l'interface
+Chapitre 2 : Les boucles
+Une boucle répète des instructions.
+"""
+
+
+def test_default_detection_keeps_the_whole_document_without_structure():
+    chapters, method = detect_chapters(TEXT)
+    assert method == 'document'
+    assert chapters == [{
+        'title': 'Document complet',
+        'content': TEXT,
+        'word_count': len(TEXT.split()),
+        'start_offset': 0,
+        'end_offset': len(TEXT)
+    }]
+
+
+def test_default_detection_uses_the_pdf_structure():
+    page_offsets = [0, TEXT.index("Chapitre 2")]
+    outline = {'source': 'toc', 'headings': [{'title': "Bases", 'page_number': 1},
+                                             {'title': "Boucles", 'page_number': 2}]}
+    chapters, method = detect_chapters(TEXT, "auto", page_offsets, outline)
+    assert method == 'toc'
+    assert [chapter['title'] for chapter in chapters] == ["Bases", "Boucles"]
+
+
+def test_regex_detection_ignores_list_items_numbers_and_repeated_headers():
+    chapters, method = detect_chapters(TEXT, "regex")
+    assert method == 'regex'
+    assert [chapter['title'] for chapter in chapters] == ["1 - Les bases", "2 - Les boucles"]
+    assert "1. Créez un fichier" in chapters[0]['content']
+    assert "Suite du premier chapitre." in chapters[0]['content']
+    assert "Partie visible de l'interface" in chapters[0]['content']
+    assert chapters[1]['content'] == "Une boucle répète des instructions."
+
+
+def test_regex_detection_skips_table_of_contents_entries():
+    text = "Chapitre 1 Introduction ........ 5\n1 Installation 12\n1 Installation\nTexte du chapitre.\n"
+    assert [chapter['title'] for chapter in segment_by_titles(text)] == ["1 - Installation"]
+
+
+def test_regex_detection_without_titles_falls_back_to_one_chapter():
+    chapters, method = detect_chapters("texte sans titre\n", "regex")
+    assert (method, len(chapters), chapters[0]['title']) == ('document', 1, 'Document complet')
@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from backend.chunked_encryption import (
+    CHUNK_HEADER, CHUNK_TAG_SIZE, EncryptedBlob, _chunk_nonce, write_encrypted_blob
+)
+
+KEY = bytes(range(32))
+
+
+def write_blob(tmp_path, content, chunk_size=16, pieces=7):
+    path = str(tmp_path / "champ.enc")
+    source = (content[i:i + pieces] for i in range(0, len(content), pieces))
+    return path, write_encrypted_blob(path, source, KEY, chunk_size=chunk_size)
+
+
+def sealed_chunk_size(chunk_size):
+    return chunk_size + CHUNK_TAG_SIZE
+
+
+@pytest.mark.parametrize("size", [0, 1, 15, 16, 17, 48, 100])
+def test_round_trip_whatever_the_size(tmp_path, size):
+    content = os.urandom(size)
+    path, stats = write_blob(tmp_path, content)
+    assert stats == {'size': size, 'chunks': max(1, -(-size // 16))}
+    with EncryptedBlob(path, KEY) as blob:
+        assert (blob.size, blob.chunk_count) == (size, stats['chunks'])
+        assert b"".join(blob) == content
+
+
+def test_chunks_can_be_read_alone(tmp_path):
+    content = bytes(range(50))
+    path, _ = write_blob(tmp_path, content)
+    with EncryptedBlob(path, KEY) as blob:
+        assert blob.read_chunk(2) == content[32:48]
+        assert blob.read_chunk(0) == content[:16]
+        assert blob.read_chunk(3) == content[48:]
+        with pytest.raises(IndexError):
+            blob.read_chunk(4)
+
+
+def test_nonce_encodes_the_index_and_the_last_flag():
+    nonces = {_chunk_nonce(index, last) for index in range(3) for last in (False, True)}
+    assert len(nonces) == 6
+    assert all(len(nonce) == 12 for nonce in nonces)
+
+
+def test_each_file_uses_its_own_key(tmp_path):
+    first, _ = write_blob(tmp_path, b"x" * 40)
+    second = str(tmp_path / "autre.enc")
+    write_encrypted_blob(second, [b"x" * 40], KEY, chunk_size=16)
+    with open(first, 'rb') as f1, open(second, 'rb') as f2:
+        assert f1.read()[CHUNK_HEADER.size:] != f2.read()[CHUNK_HEADER.size:]
+
+
+def test_wrong_key_or_tampered_chunk_is_rejected(tmp_path):
+    path, _ = write_blob(tmp_path, bytes(40))
+    with EncryptedBlob(path, bytes(32)) as blob:
+        with pytest.raises(ValueError):
+            blob.read_chunk(0)
+
+    data = bytearray(open(path, 'rb').read())
+    data[CHUNK_HEADER.size + 3] ^= 1
+    open(path, 'wb').write(bytes(data))
+    with EncryptedBlob(path, KEY) as blob:
+        with pytest.raises(ValueError):
+            blob.read_chunk(0)
+        assert blob.read_chunk(1) == bytes(16)
+
+
+def test_swapped_chunks_are_rejected(tmp_path):
+    path, _ = write_blob(tmp_path, bytes(16) + b"\x01" * 16 + b"\x02" * 8)
+    data = open(path, 'rb').read()
+    sealed = sealed_chunk_size(16)
+    start = CHUNK_HEADER.size
+    first, second = data[start:start + sealed], data[start + sealed:start + 2 * sealed]
+    open(path, 'wb').write(data[:start] + second + first + data[start + 2 * sealed:])
+    with EncryptedBlob(path, KEY) as blob:
+        for index in (0, 1):
+            with pytest.raises(ValueError):
+                blob.read_chunk(index)
+
+
+def test_truncation_at_a_chunk_boundary_is_detected(tmp_path):
+    # Sans l'indicateur de dernier bloc, retirer les derniers blocs donnerait un fichier valide
+    path, _ = write_blob(tmp_path, bytes(48))
+    data = open(path, 'rb').read()
+    open(path, 'wb').write(data[:CHUNK_HEADER.size + 2 * sealed_chunk_size(16)])
+    with EncryptedBlob(path, KEY) as blob:
+        assert blob.chunk_count == 2
+        assert blob.read_chunk(0) == bytes(16)
+        with pytest.raises(ValueError):
+            blob.read_chunk(1)
+
+
+def test_header_changes_are_detected(tmp_path):
+    path, _ = write_blob(tmp_path, bytes(20))
+    data = bytearray(open(path, 'rb').read())
+    data[0:4] = b"XXXX"
+    open(path, 'wb').write(bytes(data))
+    with pytest.raises(ValueError):
+        EncryptedBlob(path, KEY)
+
+    open(path, 'wb').write(bytes(CHUNK_HEADER.size - 1))
+    with pytest.raises(ValueError):
+        EncryptedBlob(path, KEY)
@@ -0,0 +1,90 @@
+import hashlib
+import os
+
+import fitz
+import pytest
+
+from backend.extraction_cache import ExtractionCache, compute_file_hash
+from backend.pdf_processor import PDFProcessor
+
+
+def test_compute_file_hash_reads_by_chunks(tmp_path):
+    path = tmp_path / "fichier.bin"
+    content = os.urandom(10_000)
+    path.write_bytes(content)
+    assert compute_file_hash(str(path), chunk_size=1000) == hashlib.sha256(content).hexdigest()
+
+
+def test_entries_are_keyed_by_hash_and_extractor_version(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    assert cache.get("ab" * 32, "1") is None
+    cache.set("ab" * 32, "1", {'content': "texte"})
+    assert cache.get("ab" * 32, "1") == {'content': "texte"}
+    assert cache.get("ab" * 32, "2") is None
+    assert (tmp_path / "ab" / f"{'ab' * 32}.v1.json").is_file()
+
+
+def test_unreadable_entry_is_a_miss(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    cache.set("cd" * 32, "1", {'content': "texte"})
+    (tmp_path / "cd" / f"{'cd' * 32}.v1.json").write_text("{tronqué", encoding='utf-8')
+    assert cache.get("cd" * 32, "1") is None
+
+
+def test_least_recently_read_entries_are_evicted(tmp_path):
+    cache = ExtractionCache(str(tmp_path), max_size_bytes=10 ** 9)
+    for index, content_hash in enumerate(("aa" * 32, "bb" * 32, "cc" * 32)):
+        cache.set(content_hash, "1", {'content': "x" * 100})
+        os.utime(cache._entry_path(content_hash, "1"), (1000 + index, 1000 + index))
+    # Lire la plus ancienne entrée la rend la plus récente
+    assert cache.get("aa" * 32, "1") is not None
+
+    cache.max_size_bytes = 2 * cache._entry_path("aa" * 32, "1").stat().st_size
+    cache._evict()
+    assert cache.get("bb" * 32, "1") is None
+    assert cache.get("aa" * 32, "1") is not None
+    assert cache.get("cc" * 32, "1") is not None
+
+
+def test_invalidate_one_file_or_everything(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    cache.set("aa" * 32, "1", {})
+    cache.set("aa" * 32, "2", {})
+    cache.set("bb" * 32, "1", {})
+    assert cache.invalidate("aa" * 32) == 2
+    assert cache.get_stats()['entries'] == 1
+    assert cache.invalidate() == 1
+    assert cache.get_stats()['entries'] == 0
+
+
+@pytest.fixture
+def sample_pdf(tmp_path):
+    path = tmp_path / "cours.pdf"
+    doc = fitz.open()
+    for text in ("Introduction au cours", "Exemple : une boucle"):
+        doc.new_page().insert_text((72, 72), text)
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+def test_identical_content_is_not_extracted_again(tmp_path, sample_pdf, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    processor = PDFProcessor()
+    first = processor.process_pdf_file(str(sample_pdf))
+    assert "Introduction au cours" in first['full_content']
+
+    copy = tmp_path / "copie.pdf"
+    copy.write_bytes(sample_pdf.read_bytes())
+
+    def fail(*args, **kwargs):
+        raise AssertionError("le PDF ne doit pas être ré-extrait")
+
+    monkeypatch.setattr(processor, "iter_pages", fail)
+    monkeypatch.setattr(processor, "extract_outline", fail)
+    second = processor.process_pdf_file(str(copy))
+    assert second['filename'] == "copie.pdf"
+    assert second['original_path'] == str(copy)
+    assert second['content_hash'] == first['content_hash']
+    assert second['statistics'] == first['statistics']
+    assert second['outline'] == first['outline']
@@ -0,0 +1,115 @@
+import threading
+
+import pytest
+
+from backend.job_queue import DONE, FAILED, QUEUED, RUNNING, AuditWorker, JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), stale_after=60, max_attempts=2)
+    yield queue
+    queue.close()
+
+
+def make_stale(queue, job_id):
+    """Simule un worker arrêté : signal de vie plus ancien que `stale_after`."""
+    queue._conn.execute("UPDATE jobs SET heartbeat_at = heartbeat_at - ? WHERE id = ?",
+                        (queue.stale_after + 1, job_id))
+
+
+def test_claim_takes_the_oldest_queued_job(queue):
+    first = queue.enqueue("standard", {'filename': "a.pdf"})
+    second = queue.enqueue("standard", {'filename': "b.pdf"})
+    assert queue.queue_position(second) == 1
+
+    job = queue.claim("w1")
+    assert (job['id'], job['status'], job['worker_id'], job['attempts']) == (first, RUNNING, "w1", 1)
+    assert job['params'] == {'filename': "a.pdf"}
+    assert queue.queue_position(second) == 0
+    assert queue.claim("w2")['id'] == second
+    assert queue.claim("w3") is None
+
+
+def test_concurrent_claims_never_share_a_job(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    producer = JobQueue(path)
+    job_ids = {producer.enqueue("standard", {'filename': f"{i}.pdf"}) for i in range(20)}
+    claimed = []
+
+    def consume(worker_id):
+        # Une connexion par worker, comme des processus distincts
+        consumer = JobQueue(path)
+        try:
+            while (job := consumer.claim(worker_id)) is not None:
+                claimed.append(job['id'])
+        finally:
+            consumer.close()
+
+    threads = [threading.Thread(target=consume, args=(f"w{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    producer.close()
+    assert sorted(claimed) == sorted(job_ids)
+
+
+def test_stale_job_is_requeued_then_failed_after_max_attempts(queue):
+    job_id = queue.enqueue("standard", {'filename': "a.pdf"})
+    queue.claim("w1")
+    assert queue.requeue_stale() == 0
+
+    make_stale(queue, job_id)
+    assert queue.requeue_stale() == 1
+    job = queue.get(job_id)
+    assert (job['status'], job['worker_id']) == (QUEUED, None)
+
+    assert queue.claim("w2")['attempts'] == 2
+    make_stale(queue, job_id)
+    assert queue.requeue_stale() == 1
+    job = queue.get(job_id)
+    assert job['status'] == FAILED
+    assert job['error'] == "Worker interrompu à plusieurs reprises"
+
+
+def test_workers_are_counted_while_alive(queue):
+    queue.register_worker("w1")
+    queue.register_worker("w2")
+    assert queue.active_workers() == 2
+    queue.unregister_worker("w1")
+    assert queue.active_workers() == 1
+
+
+class FakeEngine:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+
+    def audit_pdf(self, module_path, filename, force_refresh=False, progress_callback=None, subject=None):
+        self.calls.append((module_path, subject))
+        progress_callback({'progress': 0.5, 'message': "Critère 1/2"})
+        if self.error:
+            return {'error': self.error}
+        return {'filename': filename}
+
+    def save_audit_report(self, audit_report):
+        return f"reports/audit_{audit_report['filename']}.json"
+
+
+def test_worker_runs_queued_jobs_until_idle(queue):
+    job_id = queue.enqueue("standard", {'module_path': "data/a.pdf", 'filename': "a.pdf", 'subject': "java"})
+    engine = FakeEngine()
+    AuditWorker(queue, engine=engine, heartbeat_interval=60).run(exit_when_idle=True)
+
+    job = queue.get(job_id)
+    assert (job['status'], job['progress'], job['report_path']) == (DONE, 1, "reports/audit_a.pdf.json")
+    assert engine.calls == [("data/a.pdf", "java")]
+    assert queue.active_workers() == 0
+
+
+def test_worker_records_audit_errors(queue):
+    job_id = queue.enqueue("standard", {'module_path': "data/a.pdf", 'filename': "a.pdf"})
+    AuditWorker(queue, engine=FakeEngine(error="PDF illisible"), heartbeat_interval=60).run(exit_when_idle=True)
+    job = queue.get(job_id)
+    assert (job['status'], job['error']) == (FAILED, "PDF illisible")
@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from backend.llm_cache import LLMResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite"))
+    yield cache
+    cache._conn.close()
+
+
+def test_make_key_depends_on_every_request_field():
+    key = LLMResponseCache.make_key("m", 0.3, "système", "prompt")
+    assert key == LLMResponseCache.make_key("m", 0.3, "système", "prompt")
+    assert len({
+        key,
+        LLMResponseCache.make_key("autre", 0.3, "système", "prompt"),
+        LLMResponseCache.make_key("m", 0.2, "système", "prompt"),
+        LLMResponseCache.make_key("m", 0.3, "autre", "prompt"),
+        LLMResponseCache.make_key("m", 0.3, "système", "autre"),
+    }) == 5
+
+
+def test_get_set_and_stats(cache):
+    assert cache.get("k") is None
+    cache.set("k", '{"score": 4}')
+    assert cache.get("k") == '{"score": 4}'
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+    assert stats['hit_rate'] == 50.0
+    assert stats['size_bytes'] == len('{"score": 4}')
+
+
+def test_entries_persist_across_instances(tmp_path):
+    first = LLMResponseCache(str(tmp_path / "llm.sqlite"))
+    first.set("k", "réponse")
+    first._conn.close()
+    second = LLMResponseCache(str(tmp_path / "llm.sqlite"))
+    assert second.get("k") == "réponse"
+    second._conn.close()
+
+
+def test_expired_entries_are_misses(tmp_path, monkeypatch):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite"), ttl_seconds=60)
+    cache.set("k", "v")
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 61)
+    assert cache.get("k") is None
+    assert cache.get_stats()['entries'] == 0
+    cache._conn.close()
+
+
+def test_eviction_removes_least_recently_used(tmp_path, monkeypatch):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite"), max_size_bytes=25, ttl_seconds=0)
+    clock = [1000.0]
+    monkeypatch.setattr(time, 'time', lambda: clock[0])
+    for key in ("a", "b"):
+        cache.set(key, "x" * 10)
+        clock[0] += 1
+    cache.get("a")  # "b" devient la moins récemment utilisée
+    clock[0] += 1
+    cache.set("c", "x" * 10)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.get_stats()['size_bytes'] <= 25
+    cache._conn.close()
+
+
+def test_clear(cache):
+    cache.set("k", "v")
+    cache.clear()
+    assert cache.get("k") is None
@@ -0,0 +1,51 @@
+from backend.map_reduce import TokenBudget, allocate_chunks, reduce_criterion_results, sample_chunks, split_into_chunks
+
+
+def test_split_into_chunks_respects_the_size():
+    text = "\n".join(f"ligne {i} " + "mot " * 20 for i in range(50))
+    chunks = split_into_chunks(text, max_tokens=100)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    assert "\n".join(chunks).split() == text.split()
+
+
+def test_sample_chunks_spreads_the_selection():
+    chunks = [str(i) for i in range(10)]
+    assert [part['index'] for part in sample_chunks(chunks, 4)] == [1, 4, 7, 10]
+    assert sample_chunks(chunks, 0) == []
+    assert len(sample_chunks(chunks, 20)) == 10
+
+
+def test_allocate_chunks_keeps_one_chunk_per_text_when_possible():
+    assert allocate_chunks([4, 2, 6], 20) == [4, 2, 6]
+    assert allocate_chunks([10, 1, 10], 6) == [2, 1, 2]
+
+
+def test_allocate_chunks_samples_texts_below_one_chunk_each():
+    assert allocate_chunks([3, 0, 2, 5, 1], 2) == [1, 0, 0, 0, 1]
+    assert allocate_chunks([3, 2], 0) == [0, 0]
+
+
+def test_token_budget_shares_unused_allowance_between_stages():
+    budget = TokenBudget(1000, stages=2)
+    assert budget.allowance() == 500
+    budget.reserve(200)
+    assert budget.allowance() == 800
+    budget.reserve(700)
+    assert not budget.try_spend(200)
+    assert budget.try_spend(100)
+    assert budget.spent == 1000
+
+
+def test_token_budget_without_limit():
+    budget = TokenBudget(0)
+    assert budget.allowance() == float('inf')
+    assert budget.try_spend(10 ** 9)
+
+
+def test_reduce_criterion_results_reads_pertinent_as_a_flag():
+    parts = [{'index': 1, 'count': 2, 'text': "a" * 300}, {'index': 2, 'count': 2, 'text': "b" * 300}]
+    results = [{'score': 1, 'pertinent': "false"}, {'score': 5, 'pertinent': "true"}]
+    reduced = reduce_criterion_results(results, parts, chunks_total=2, total_chars=600)
+    assert reduced['score'] == 5
+    assert reduced['couverture']['extraits_pertinents'] == 1
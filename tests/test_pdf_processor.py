@@ -0,0 +1,123 @@
+import os
+from types import SimpleNamespace
+
+import fitz
+import pytest
+
+from backend.audit_engine import PedagogicalAuditEngine
+from backend.pdf_processor import PDFProcessor, iter_text_pages
+
+PAGES = ["", "Introduction : objectifs du cours", "Exemple 1 : une boucle\nExercice 1", "", "Conclusion"]
+
+
+@pytest.fixture
+def sample_pdf(tmp_path):
+    path = tmp_path / "cours.pdf"
+    doc = fitz.open()
+    for text in PAGES * 3:
+        page = doc.new_page()
+        for line_number, line in enumerate(text.splitlines()):
+            page.insert_text((72, 72 + 20 * line_number), line)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+@pytest.fixture
+def processor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return PDFProcessor(use_extraction_cache=False)
+
+
+def test_iter_pages_yields_page_records_with_offsets(processor, sample_pdf):
+    records = list(processor.iter_pages(sample_pdf))
+    full_text = "".join(text + "\n" for _, text, _, _ in records)
+    assert [number for number, _, _, _ in records] == list(range(1, 16))
+    for _, text, start_offset, end_offset in records:
+        assert full_text[start_offset:end_offset] == text
+    assert [text for _, text, _, _ in records] == processor.extract_pages_from_pdf(sample_pdf)
+    assert full_text.strip() == processor.extract_text_from_pdf(sample_pdf)
+
+
+def test_parallel_extraction_yields_the_same_pages(tmp_path, monkeypatch, sample_pdf):
+    monkeypatch.chdir(tmp_path)
+    sequential = PDFProcessor(use_extraction_cache=False)
+    parallel = PDFProcessor(parallel_page_threshold=4, max_workers=2, use_extraction_cache=False)
+    assert list(parallel.iter_pages(sample_pdf)) == list(sequential.iter_pages(sample_pdf))
+
+
+def test_process_pdf_file_matches_the_whole_text_analysis(processor, sample_pdf):
+    result = processor.process_pdf_file(sample_pdf)
+    page_texts = processor.extract_pages_from_pdf(sample_pdf)
+    expected = processor.analyze_pdf_content(processor.extract_text_from_pdf(sample_pdf), "cours.pdf", page_texts)
+    for key in ('statistics', 'page_statistics', 'top_keywords', 'extracted_data', 'content_preview', 'full_content'):
+        assert result[key] == expected[key]
+    # Les positions de pages redécoupent le texte extrait
+    pages = [text.strip() for _, text, _, _ in iter_text_pages(result['full_content'], result['page_offsets'])]
+    assert pages == [text.strip() for text in page_texts]
+
+
+def test_process_pdf_file_without_text(processor, tmp_path):
+    path = tmp_path / "vide.pdf"
+    doc = fitz.open()
+    doc.new_page()
+    doc.save(str(path))
+    doc.close()
+    assert processor.process_pdf_file(str(path)) is None
+    assert processor.process_pdf_file(str(tmp_path / "absent.pdf")) is None
+
+
+def test_counters_read_the_document_page_by_page():
+    engine = SimpleNamespace(grille={'mandatory_sections': ['introduction', 'objectifs', 'conclusion', 'annexes']})
+    content = "Introduction\nExemple 1 : boucle\n\nExercice 2\nConclusion"
+    pages = list(iter_text_pages(content, [0, content.index("Exercice")]))
+    assert pages[1] == (2, "Exercice 2\nConclusion", content.index("Exercice"), len(content))
+
+    sections = PedagogicalAuditEngine._check_mandatory_sections(engine, iter(pages))
+    assert sections['found_sections'] == ['introduction', 'conclusion']
+    assert sections['missing_sections'] == ['objectifs', 'annexes']
+    assert PedagogicalAuditEngine._count_elements(engine, iter(pages)) == \
+        PedagogicalAuditEngine._count_elements(engine, iter_text_pages(content))
+
+
+def test_outline_is_extracted_once_with_the_text(processor, sample_pdf):
+    doc = fitz.open(sample_pdf)
+    doc.set_toc([[1, "Bases", 1], [1, "Boucles", 6], [1, "Synthèse", 11]])
+    doc.saveIncr()
+    doc.close()
+
+    result = processor.process_pdf_file(sample_pdf)
+    assert result['outline'] == {'source': 'toc', 'headings': [
+        {'title': "Bases", 'page_number': 1}, {'title': "Boucles", 'page_number': 6},
+        {'title': "Synthèse", 'page_number': 11}]}
+
+    def fail(*args, **kwargs):
+        raise AssertionError("le PDF ne doit pas être rouvert")
+
+    engine = SimpleNamespace(chapter_detection="auto", pdf_processor=SimpleNamespace(extract_outline=fail))
+    pdf_data = {'content': result['full_content'], 'page_offsets': result['page_offsets'], 'outline': result['outline']}
+    chapters, method = PedagogicalAuditEngine._detect_chapters(engine, pdf_data)
+    assert method == 'toc'
+    assert [chapter['title'] for chapter in chapters] == ["Bases", "Boucles", "Synthèse"]
+
+
+def test_display_names_reach_the_extraction(processor, sample_pdf, tmp_path, monkeypatch):
+    # Les PDF uploadés sont lus depuis le stockage par contenu, nommés par leur empreinte
+    blob_path = str(tmp_path / ("ab" * 32))
+    with open(sample_pdf, 'rb') as source, open(blob_path, 'wb') as blob:
+        blob.write(source.read())
+    saved = []
+    process_pdf_file = processor.process_pdf_file
+
+    def spy(pdf_path, filename=None):
+        result = process_pdf_file(pdf_path, filename=filename)
+        saved.append(os.path.basename(result['json_path']))
+        return result
+
+    monkeypatch.setattr(processor, "process_pdf_file", spy)
+    engine = SimpleNamespace(pdf_processor=processor)
+    engine._extract_text_content = lambda pdf_path, filename=None: \
+        PedagogicalAuditEngine._extract_text_content(engine, pdf_path, filename)
+    PedagogicalAuditEngine._extract_module_with_support(engine, blob_path, blob_path,
+                                                        "module_cours.pdf", "support_cours.pdf")
+    assert [name.rsplit('_', 2)[0] for name in saved] == ["module_cours", "support_cours"]
@@ -0,0 +1,168 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from backend.rate_limiter import (
+    RateLimiter, SharedRateLimiter, TokenBucket, _parse_duration, estimate_tokens, is_rate_limit_error,
+    retry_after_from_error
+)
+
+
+def rate_limit_error(headers=None, status_code=429):
+    return SimpleNamespace(status_code=status_code, response=SimpleNamespace(headers=headers or {}))
+
+
+def test_estimate_tokens_is_conservative():
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("a" * 300) == 101
+
+
+def test_parse_duration_formats():
+    assert _parse_duration("12") == 12
+    assert _parse_duration("7.66s") == 7.66
+    assert _parse_duration("120ms") == 0.12
+    assert abs(_parse_duration("2m59.56s") - 179.56) < 1e-9
+    assert _parse_duration("bientôt") is None
+
+
+def test_is_rate_limit_error():
+    assert is_rate_limit_error(rate_limit_error())
+    assert is_rate_limit_error(Exception("Error code: 429 - rate_limit_exceeded"))
+    assert not is_rate_limit_error(Exception("Error code: 500"))
+
+
+def test_retry_after_header_precedence():
+    assert retry_after_from_error(rate_limit_error({'retry-after-ms': '1500', 'retry-after': '9'})) == 1.5
+    assert retry_after_from_error(rate_limit_error({'retry-after': '3'})) == 3
+    assert retry_after_from_error(rate_limit_error({'x-ratelimit-reset-requests': '2s',
+                                                    'x-ratelimit-reset-tokens': '1m'})) == 60
+    assert retry_after_from_error(rate_limit_error()) is None
+    assert retry_after_from_error(Exception("sans réponse")) is None
+
+
+def test_token_bucket_refills_continuously():
+    bucket = TokenBucket(60)  # 1 jeton par seconde
+    now = bucket.updated_at
+    assert bucket.time_until_available(60, now) == 0
+    bucket.consume(60, now)
+    assert abs(bucket.time_until_available(1, now) - 1.0) < 1e-9
+    assert bucket.time_until_available(1, now + 1.0) == 0
+
+
+def test_token_bucket_oversized_request_waits_for_full_bucket_only():
+    bucket = TokenBucket(60)
+    now = bucket.updated_at
+    bucket.consume(60, now)
+    # Plus gros que le seau : attend un seau plein (60 s), pas indéfiniment
+    assert abs(bucket.time_until_available(10_000, now) - 60.0) < 1e-9
+
+
+def test_reserve_enforces_requests_per_minute():
+    limiter = RateLimiter({"m": {"requests_per_minute": 2, "tokens_per_minute": 10_000}})
+    assert limiter.reserve("m", 10) == 0
+    assert limiter.reserve("m", 10) == 0
+    wait = limiter.reserve("m", 10)
+    assert 0 < wait <= 30
+
+
+def test_reserve_enforces_tokens_per_minute_and_usage_correction():
+    limiter = RateLimiter({"m": {"requests_per_minute": 100, "tokens_per_minute": 1000}})
+    assert limiter.reserve("m", 900) == 0
+    assert limiter.reserve("m", 500) > 0
+    # Consommation réelle bien inférieure à l'estimation : les jetons sont rendus
+    limiter.record_usage("m", estimated_tokens=900, actual_tokens=100)
+    assert limiter.reserve("m", 500) == 0
+
+
+def test_models_have_independent_buckets():
+    limiter = RateLimiter({"a": {"requests_per_minute": 1}, "b": {"requests_per_minute": 1}})
+    assert limiter.reserve("a", 1) == 0
+    assert limiter.reserve("a", 1) > 0
+    assert limiter.reserve("b", 1) == 0
+
+
+def test_record_rate_limit_blocks_the_model():
+    limiter = RateLimiter({"m": {"requests_per_minute": 100, "tokens_per_minute": 10_000}})
+    limiter.record_rate_limit("m", 5)
+    assert 4 < limiter.reserve("m", 1) <= 5
+    assert limiter.reserve("autre", 1) == 0
+
+
+def test_configure_replaces_limits():
+    limiter = RateLimiter()
+    limiter.configure("m", requests_per_minute=5)
+    assert limiter.get_limits("m")['requests_per_minute'] == 5
+    assert limiter.get_limits("m")['tokens_per_minute'] > 0
+
+
+def test_acquire_waits_for_refill():
+    limiter = RateLimiter({"m": {"requests_per_minute": 600, "tokens_per_minute": 100_000}})
+    for _ in range(600):
+        assert limiter.reserve("m", 1) == 0
+    started = time.monotonic()
+    limiter.acquire("m", 1)  # 10 requêtes par seconde : ~0,1 s d'attente
+    assert 0.05 < time.monotonic() - started < 1
+
+
+def test_acquire_async_waits_without_blocking_the_loop():
+    limiter = RateLimiter({"m": {"requests_per_minute": 600, "tokens_per_minute": 100_000}})
+    for _ in range(600):
+        limiter.reserve("m", 1)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        await limiter.acquire_async("m", 1)
+        task.cancel()
+        return ticks
+
+    assert asyncio.run(scenario()) > 2
+
+
+@pytest.fixture
+def shared_limiters(tmp_path):
+    """Deux limiteurs sur la même base, comme deux processus workers."""
+    limits = {"m": {"requests_per_minute": 3, "tokens_per_minute": 1000}}
+    limiters = [SharedRateLimiter(str(tmp_path / "rate_limits.sqlite"), limits) for _ in range(2)]
+    yield limiters
+    for limiter in limiters:
+        limiter.close()
+
+
+def test_shared_limiters_split_one_quota(shared_limiters):
+    first, second = shared_limiters
+    assert first.reserve("m", 10) == 0
+    assert second.reserve("m", 10) == 0
+    assert first.reserve("m", 10) == 0
+    assert second.reserve("m", 10) > 0
+    assert first.reserve("m", 10) > 0
+
+
+def test_shared_limiters_share_token_usage_and_suspensions(shared_limiters):
+    first, second = shared_limiters
+    assert first.reserve("m", 900) == 0
+    assert second.reserve("m", 200) > 0
+    first.record_usage("m", 900, 500)
+    assert second.reserve("m", 200) == 0
+
+    second.record_rate_limit("m", 30)
+    assert 25 < first.reserve("m", 1) <= 30
+
+
+def test_shared_limiter_state_survives_a_restart(tmp_path):
+    path = str(tmp_path / "rate_limits.sqlite")
+    limiter = SharedRateLimiter(path, {"m": {"requests_per_minute": 1, "tokens_per_minute": 1000}})
+    assert limiter.reserve("m", 1) == 0
+    limiter.close()
+    restarted = SharedRateLimiter(path, {"m": {"requests_per_minute": 1, "tokens_per_minute": 1000}})
+    assert restarted.reserve("m", 1) > 0
+    restarted.close()
@@ -0,0 +1,84 @@
+import gzip
+import json
+
+import pytest
+
+from backend.audit_store import AuditStore
+from backend.report_storage import (
+    convert_reports, dumps_report, loads_report, pack_report, read_report, report_extension, write_report
+)
+
+CHAPTERS = [{'title': "Bases", 'score': 12}, {'title': "Boucles", 'score': 15}]
+REPORT = {
+    'metadata': {'filename': "cours.pdf", 'audit_date': "2026-01-01T10:00:00", 'audit_type': "chapter_by_chapter"},
+    'scores': {'final_score': 72.5, 'grade': "B"},
+    'chapters': CHAPTERS,
+    'chapter_analysis': {'chapters': CHAPTERS, 'average': 13.5}
+}
+
+
+def test_chapters_are_stored_once_and_restored():
+    packed = pack_report(REPORT)
+    assert packed['shared'] == ['chapter_analysis.chapters']
+    assert 'chapters' not in packed['report']['chapter_analysis']
+    assert loads_report(dumps_report(REPORT)) == REPORT
+
+
+def test_compact_reports_are_deterministic():
+    assert dumps_report(REPORT) == dumps_report(REPORT)
+
+
+def test_legacy_and_gzip_reports_are_recognised_by_content():
+    legacy = json.dumps(REPORT, indent=2).encode('utf-8')
+    assert loads_report(legacy) == REPORT
+    assert loads_report(gzip.compress(legacy)) == REPORT
+
+
+def test_write_and_read_report(tmp_path):
+    path = tmp_path / f"audit_cours{report_extension()}"
+    write_report(REPORT, str(path))
+    assert read_report(str(path)) == REPORT
+
+
+def test_convert_reports_leaves_comparison_exports_alone(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    audits_dir = tmp_path / "audits"
+    audits_dir.mkdir()
+    report_path = audits_dir / "audit_cours.pdf_20260101_100000.json"
+    report_path.write_text(json.dumps(REPORT, indent=2), encoding='utf-8')
+    comparison_path = audits_dir / "comparison_a.pdf_b.pdf_20260101_100000.json"
+    comparison_path.write_text(json.dumps({'comparison_date': "2026-01-01"}), encoding='utf-8')
+    # Nommé comme un rapport mais sans sa structure
+    other_path = audits_dir / "audit_export.json"
+    other_path.write_text(json.dumps([1, 2]), encoding='utf-8')
+    db_path = str(tmp_path / "audits.db")
+
+    stats = convert_reports(str(audits_dir), db_path)
+
+    compact_path = str(report_path)[:-len('.json')] + report_extension()
+    assert stats['converted'] == 1
+    assert not report_path.exists()
+    assert read_report(compact_path) == REPORT
+    assert comparison_path.exists() and other_path.exists()
+    store = AuditStore(db_path)
+    try:
+        assert [row['json_file'] for row in store.query()] == [compact_path]
+    finally:
+        store.close()
+
+
+def test_empty_report_is_not_yet_written(tmp_path):
+    # Nom réservé par une écriture exclusive sans liens physiques, contenu pas encore publié
+    audits_dir = tmp_path / "audits"
+    audits_dir.mkdir()
+    pending_path = audits_dir / f"audit_cours.pdf_20260101_100000{report_extension()}"
+    pending_path.write_bytes(b"")
+    with pytest.raises(FileNotFoundError):
+        read_report(str(pending_path))
+
+    store = AuditStore(str(tmp_path / "audits.db"))
+    try:
+        assert store.import_legacy(str(tmp_path / "index.json"), str(audits_dir)) == 0
+    finally:
+        store.close()
+    assert pending_path.exists()
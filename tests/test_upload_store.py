@@ -0,0 +1,70 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+from backend.upload_store import UploadStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = UploadStore(str(tmp_path / "uploads"), str(tmp_path / "uploads.db"), chunk_size=4)
+    yield store
+    store.close()
+
+
+def test_put_stores_each_content_once(store):
+    first = store.put(io.BytesIO(b"%PDF-contenu"), "module_cours.pdf")
+    assert first['content_hash'] == hashlib.sha256(b"%PDF-contenu").hexdigest()
+    assert (first['new_content'], first['previous_hash'], first['bound']) == (True, None, True)
+
+    second = store.put(io.BytesIO(b"%PDF-contenu"), "support_cours.pdf")
+    assert (second['new_content'], second['bound']) == (False, True)
+    assert store.names_for(first['content_hash']) == ["module_cours.pdf", "support_cours.pdf"]
+    assert os.path.samefile(store.lookup("support_cours.pdf")['path'], first['blob_path'])
+    assert store.stats() == {'names': 2, 'contents': 1, 'blobs_size_bytes': len(b"%PDF-contenu")}
+
+
+def test_put_reads_from_the_current_position(store):
+    fileobj = io.BytesIO(b"entete%PDF-contenu")
+    fileobj.seek(len(b"entete"))
+    stored = store.put(fileobj, "module_cours.pdf")
+    assert open(stored['blob_path'], 'rb').read() == b"%PDF-contenu"
+
+
+def test_another_version_keeps_the_name_until_it_is_bound(store):
+    old = store.put(io.BytesIO(b"version 1"), "module_cours.pdf")
+    new = store.put(io.BytesIO(b"version 2"), "module_cours.pdf")
+    assert (new['previous_hash'], new['bound']) == (old['content_hash'], False)
+    assert open(new['blob_path'], 'rb').read() == b"version 2"
+    assert store.lookup("module_cours.pdf")['content_hash'] == old['content_hash']
+    assert open(store.name_path("module_cours.pdf"), 'rb').read() == b"version 1"
+
+    store.bind("module_cours.pdf", new['content_hash'])
+    assert store.lookup("module_cours.pdf")['content_hash'] == new['content_hash']
+    assert open(store.name_path("module_cours.pdf"), 'rb').read() == b"version 2"
+
+    replaced = store.put(io.BytesIO(b"version 3"), "module_cours.pdf", replace=True)
+    assert replaced['bound']
+    assert open(store.name_path("module_cours.pdf"), 'rb').read() == b"version 3"
+
+
+def test_bind_requires_a_known_content(store):
+    with pytest.raises(FileNotFoundError):
+        store.bind("module_cours.pdf", "ab" * 32)
+
+
+def test_files_dropped_in_the_uploads_directory_are_imported(store):
+    with open(store.name_path("module_ancien.pdf"), 'wb') as f:
+        f.write(b"ancien PDF")
+    with open(store.name_path("notes.txt"), 'wb') as f:
+        f.write(b"texte")
+    assert store.import_legacy() == 1
+    assert store.import_legacy() == 0
+    entry = store.lookup("module_ancien.pdf")
+    assert open(entry['blob_path'], 'rb').read() == b"ancien PDF"
+
+    # Un upload sous ce nom le compare à la version déposée
+    stored = store.put(io.BytesIO(b"nouveau PDF"), "module_ancien.pdf")
+    assert (stored['previous_hash'], stored['bound']) == (entry['content_hash'], False)